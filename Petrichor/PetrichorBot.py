@@ -4,6 +4,7 @@ Contains a class that represents the Petrichor bot.
 """
 from __future__ import annotations
 
+import asyncio
 import os
 
 import discord
@@ -11,10 +12,14 @@ from discord.ext import commands
 
 from util.printing import print_petrichor_msg
 from Petrichor.cogs import EXTENSIONS
+from Petrichor.message_pipeline import MessagePipeline
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 if TYPE_CHECKING:
+    from discord import Message
+
     from util.db_connection_manager import DatabaseConnectionManager
+    from util.in_memory_db import InMemoryDatabaseManager
 
 
 
@@ -24,13 +29,15 @@ class PetrichorBot(commands.Bot):
 
     Attributes
     ----------
-    db_conn : DatabaseConnectionManager
+    db_conn : DatabaseConnectionManager | InMemoryDatabaseManager
         class that manages the connection to the database
+    message_pipeline : MessagePipeline
+        pipeline that runs the message handlers of the cogs for every message
     """
 
     def __init__(
         self, 
-        db_conn : DatabaseConnectionManager, 
+        db_conn : DatabaseConnectionManager | InMemoryDatabaseManager, 
         *args, **kwargs
     ):
         """
@@ -38,7 +45,7 @@ class PetrichorBot(commands.Bot):
 
         Parameters
         ----------
-        db_conn : DatabaseConnectionManager
+        db_conn : DatabaseConnectionManager | InMemoryDatabaseManager
             the database connection object
         """
 
@@ -52,6 +59,7 @@ class PetrichorBot(commands.Bot):
         )
         self.db = db_conn
         self.euoh_locked = False
+        self.message_pipeline = MessagePipeline()
 
 
     
@@ -62,6 +70,69 @@ class PetrichorBot(commands.Bot):
 
         print_petrichor_msg(f'User {self.user} online')
 
+
+    async def on_message(self, message : Message) -> None:
+        """
+        Processes any command in every message, alongside the message handlers
+        of the cogs, so that commands are never held up by slow handlers. This
+        is the only `on_message` listener, so that commands are processed
+        exactly once per message.
+
+        Parameters
+        ----------
+        message : Message
+            the message that was sent
+        """
+
+        # started eagerly, so commands run up to their first await right away
+        commands_task = asyncio.Task(
+            self.process_commands(message),
+            loop=asyncio.get_running_loop(),
+            name='process commands',
+            eager_start=True
+        )
+
+        try:
+            await self.message_pipeline.dispatch(message)
+        finally:
+            await commands_task
+
+
+    async def add_cog(self, cog : commands.Cog, /, **kwargs : Any) -> None:
+        """
+        Adds a cog to the bot, and registers its message handlers.
+
+        Parameters
+        ----------
+        cog : commands.Cog
+            the cog to add
+        """
+
+        await super().add_cog(cog, **kwargs)
+        self.message_pipeline.register_cog(cog)
+
+
+    async def remove_cog(self, name : str, /, **kwargs : Any) -> commands.Cog | None:
+        """
+        Removes a cog from the bot, and unregisters its message handlers.
+
+        Parameters
+        ----------
+        name : str
+            the name of the cog to remove
+
+        Returns
+        -------
+        commands.Cog | None
+            the removed cog, None if no cog has the given name
+        """
+
+        cog = await super().remove_cog(name, **kwargs)
+        if cog is not None:
+            self.message_pipeline.unregister_cog(cog)
+
+        return cog
+
     
     async def setup_hook(self):
         """
@@ -69,6 +140,9 @@ class PetrichorBot(commands.Bot):
         and any other necessary functions.
         """
 
+        # the schema must be up to date before any cog touches the database
+        await self._run_migrations()
+        await self._prewarm_db_caches()
         await self._setup_cogs()
         await self._ping_db()
         # await self.cogs['RemindersCog'].setup_dle_reminders()
@@ -90,3 +164,19 @@ class PetrichorBot(commands.Bot):
         """
         print_petrichor_msg('pinging tables...')
         await self.db.ping_tables()
+
+
+    async def _prewarm_db_caches(self) -> None:
+        """
+        Loads the database metadata caches, so that the first commands that
+        write to the database don't have to query the metadata themselves.
+        """
+        print_petrichor_msg('prewarming database caches...')
+        await self.db.prewarm_table_column_cache()
+
+
+    async def _run_migrations(self) -> None:
+        """
+        Applies any database schema migrations that have not been applied yet.
+        """
+        await self.db.run_migrations()
@@ -10,12 +10,12 @@ from discord.ext import commands
 from discord import (
     app_commands,
     Member,
-    Message, 
     Reaction,
     User
 )
 
 from util.printing import print_petrichor_error, print_petrichor_msg
+from Petrichor.message_pipeline import message_handler
 
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
@@ -25,6 +25,10 @@ if TYPE_CHECKING:
     from asyncpg import Record
 
     from Petrichor.PetrichorBot import PetrichorBot
+    from util.message_context import MessageContext
+
+
+ISRAEL_FLAG = '🇮🇱'
 
 
 
@@ -51,22 +55,6 @@ class BoysWhoCried(commands.Cog):
 
 
 
-    @commands.Cog.listener()
-    async def on_message(self, message : Message):
-        """
-        Event listener that reacts to all messages.
-
-        Parameters
-        ----------
-        message : Message
-            the message that was sent
-        """
-
-        await self.check_for_israel_flag(message)
-
-        await self.bot.process_commands(message)
-
-
     @commands.Cog.listener()
     async def on_reaction_add(
         self, 
@@ -90,9 +78,9 @@ class BoysWhoCried(commands.Cog):
         if not self._is_flag_emoji(emoji_str):
             return
 
-        reaction_is_israel_flag = emoji_str == '🇮🇱'
+        reaction_is_israel_flag = emoji_str == ISRAEL_FLAG
 
-        inserted_successfully = await self.bot.db.insert_row(
+        inserted_successfully = self.bot.db.enqueue_row(
             table_name='boys_who_cried',
             record_info=[
                 reaction.message.guild.id,
@@ -145,9 +133,10 @@ class BoysWhoCried(commands.Cog):
         return False
     
 
+    @message_handler(include_bots=True, requires=['flags'])
     async def check_for_israel_flag(
         self,
-        message : Message
+        context : MessageContext
     ) -> None:
         """
         Checks if someone sends an israel flag emoji in a message, and logs it if so.
@@ -155,18 +144,15 @@ class BoysWhoCried(commands.Cog):
 
         Parameters
         ----------
-        message : Message
-            the message that was sent
+        context : MessageContext
+            the context of the message that was sent
         """
 
-        any_flag_in_msg = self._general_flag_emoji_in_message(message.content)
+        message = context.message
 
-        if not any_flag_in_msg:
-            return
-        
-        israel_flag_in_msg = self._israel_flag_emoji_in_message(message.content)
+        israel_flag_in_msg = ISRAEL_FLAG in context.flags
 
-        inserted_successfully = await self.bot.db.insert_row(
+        inserted_successfully = self.bot.db.enqueue_row(
             table_name='boys_who_cried',
             record_info=[
                 message.guild.id,
@@ -188,50 +174,6 @@ class BoysWhoCried(commands.Cog):
         )
 
 
-    def _israel_flag_emoji_in_message(
-        self,
-        message : str
-    ) -> bool:
-        """
-        Checks if an israel flag emoji is in the message.
-
-
-        Parameters
-        ----------
-        message : str
-            the message to check
-
-        Returns
-        -------
-        bool
-            True, if an israel flag emoji is in the message |
-            False, otherwise
-        """
-        return '🇮🇱' in str(message)
-
-
-    def _general_flag_emoji_in_message(
-        self,
-        message : str
-    ) -> bool:
-        """
-        Checks if any flag emoji is in the message.
-
-
-        Parameters
-        ----------
-        message : str
-            the message to check
-
-        Returns
-        -------
-        bool
-            True, if a flag emoji is in the message |
-            False, otherwise
-        """
-        return 'flag' in str(message)
-
-
     @app_commands.command(
         name='the-boy-who-cried-israel',
         description='Get the counts of israel reacts to messages in the server.'
@@ -248,13 +190,15 @@ class BoysWhoCried(commands.Cog):
             the interaction that evoked the command
         """
 
-        those_who_cried_records : list[Record] = await self.bot.db.fetch_rows(
+        cry_counts : list[Record] = await self.bot.db.count_rows_by_group(
             table_name='boys_who_cried',
-            where=f"guild_id = '{interaction.guild.id}'",
-            order_by='user_id'
+            group_by='user_id',
+            where={'guild_id' : interaction.guild.id},
+            count_alias='cries',
+            cache=True
         )
 
-        if not those_who_cried_records:
+        if not cry_counts:
             await interaction.response.send_message(
                 content='No one has reacted to any messages with the israel flag emoji yet...'
             )
@@ -262,27 +206,17 @@ class BoysWhoCried(commands.Cog):
         
         
         server = interaction.guild
-        current_user_id = -1
-        current_user = None
         those_who_cried : dict[Member, int] = {}
 
-        for record in those_who_cried_records:
-
-            if current_user_id != int(record['user_id']):
-
-                current_user_id = int(record['user_id'])
-
-                if not (check_member := server.get_member(current_user_id)):
-                    # the user might have left the server
-                    continue
+        # counts are already ordered from most to least cries
+        for cry_count in cry_counts:
 
-                current_user = check_member
-            
-            those_who_cried[current_user] = \
-                those_who_cried.get(current_user, 0) + 1
+            if not (member := server.get_member(cry_count['user_id'])):
+                # the user might have left the server
+                continue
 
+            those_who_cried[member] = cry_count['cries']
 
-        those_who_cried = dict(sorted(those_who_cried.items(), key=lambda name: name[1], reverse=True))
         msg = '# Boys Who Cried Israel\n- '
         msg += '\n- '.join([
                     f'{member.display_name}: {count} times'
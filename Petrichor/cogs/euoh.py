@@ -162,11 +162,15 @@ class EuohCog(commands.Cog):
             member to get the VC Meuohment counts of
         """
         
-        euoh_type_counts : list[Record] = await self.bot.db.fetch_rows(
+        euoh_type_counts : list[Record] = await self.bot.db.count_rows_by_group(
             table_name='vc_euohs',
-            columns=['COUNT(*) euoh_count', 'euoh_type'],
             group_by='euoh_type',
-            where=f"guild_id = '{interaction.guild_id}' AND recipient_id = '{euoh_recipient.id}'",
+            where={
+                'guild_id' : interaction.guild_id,
+                'recipient_id' : euoh_recipient.id
+            },
+            count_alias='euoh_count',
+            cache=True
         )
 
         if not euoh_type_counts:
@@ -316,11 +320,15 @@ class EuohCog(commands.Cog):
             member to get the Apex euoh counts of
         """
 
-        euoh_type_counts : list[Record] = await self.bot.db.fetch_rows(
+        euoh_type_counts : list[Record] = await self.bot.db.count_rows_by_group(
             table_name='apex_euohs',
-            columns=['COUNT(*) euoh_count', 'euoh_type'],
             group_by='euoh_type',
-            where=f"guild_id = '{interaction.guild_id}' AND recipient_id = '{euoh_recipient.id}'",
+            where={
+                'guild_id' : interaction.guild_id,
+                'recipient_id' : euoh_recipient.id
+            },
+            count_alias='euoh_count',
+            cache=True
         )
 
         if not euoh_type_counts:
@@ -342,22 +350,42 @@ class EuohCog(commands.Cog):
         self,
         interaction : Interaction
     ) -> None:
-        
+        """
+        Displays the Apex euoh counts of every member of the server, fetched
+        with a single query for the whole server.
+
+        Parameters
+        ----------
+        interaction : Interaction
+            interaction that triggered the command
+        """
+
         server = self.bot.get_guild(int(interaction.guild_id))
-        members = list(server.members)
         full_msg = '# Apex Euohs\n'
-        members_to_include: list[tuple[Member, list[Record]]] = []
 
-        for member in members:
+        euoh_type_counts : list[Record] = await self.bot.db.count_rows_by_group(
+            table_name='apex_euohs',
+            group_by=['recipient_id', 'euoh_type'],
+            where={'guild_id' : interaction.guild_id},
+            count_alias='euoh_count',
+            cache=True
+        )
+
+        # recipient id -> euoh type counts of the recipient, recipients are
+        # in order of their most given euoh type
+        recipient_counts : dict[int, list[Record]] = {}
+        for euoh_type_count in euoh_type_counts or []:
+            recipient_counts.setdefault(
+                euoh_type_count['recipient_id'], []
+            ).append(euoh_type_count)
 
-            member_counts = await self.bot.db.fetch_rows(
-                table_name='apex_euohs',
-                columns=['COUNT(*) euoh_count', 'euoh_type', 'recipient_id'],
-                group_by=['euoh_type', 'recipient_id'],
-                where=f"guild_id = '{interaction.guild_id}' AND recipient_id = '{member.id}'"
-            )
+        members_to_include: list[tuple[Member, list[Record]]] = []
+
+        for recipient_id, member_counts in recipient_counts.items():
 
-            if not member_counts:
+            # skip recipients that have left the server
+            member = server.get_member(recipient_id)
+            if not member:
                 continue
 
             members_to_include.append((member, member_counts))
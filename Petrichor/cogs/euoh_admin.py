@@ -152,22 +152,24 @@ class EuohAdminCog(commands.Cog):
             await interaction.response.send_message('Member not found in the specified server.')
             return
         
-        for i in range(count):
-            print(f"Adding euoh {i+1}/{count}...")
-            inserted_successfully = await self.bot.db.insert_row(
-                table_name='vc_euohs',
-                record_info=[
+        print(f"Adding {count} euohs...")
+        inserted_successfully = await self.bot.db.insert_rows(
+            table_name='vc_euohs',
+            records=[
+                [
                     member.id,
                     euoh_type,
                     interaction.user.id,
                     server.id,
                     interaction.created_at
                 ]
-            )
+                for _ in range(count)
+            ]
+        )
 
-            if not inserted_successfully:
-                await interaction.response.send_message('An error occurred while adding the euohs. Please try again later.')
-                return
+        if not inserted_successfully:
+            await interaction.response.send_message('An error occurred while adding the euohs. Please try again later.')
+            return
             
         await interaction.response.send_message('Euohs added successfully')
 
@@ -7,14 +7,18 @@ from __future__ import annotations
 import asyncio
 import random
 from typing import TYPE_CHECKING
+from urllib.parse import urlsplit, urlunsplit
 
-from discord import VoiceChannel
+from discord import ChannelType
 from discord.ext import commands
 
 from util.env_vars import get_dict, get_id
 from util.server_info import SERVERS
+from Petrichor.message_pipeline import message_handler
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+
     from discord import (
         Member,
         Message,
@@ -22,6 +26,7 @@ if TYPE_CHECKING:
     )
 
     from Petrichor.PetrichorBot import PetrichorBot
+    from util.message_context import MessageContext
     from util.server_info import ServerInfo
 
 
@@ -45,6 +50,11 @@ EMBED_FAIL_EXCEPTIONS = [
     'discordapp.com'
 ]
 
+TWITTER_DOMAINS = frozenset({
+    'twitter.com',
+    'x.com'
+})
+
 DEFAULT_REPOST_SERVERS = {
     "apex-legends" : SERVERS["guard"]
 }
@@ -75,33 +85,6 @@ class EventHandlersCog(commands.Cog):
 
 
 
-    @commands.Cog.listener()
-    async def on_message(self, message : Message):
-        """
-        Event listener that reacts to all messages.
-        
-        Parameters
-        ----------
-        message : Message
-            the message that was sent
-        """
-
-        # preserve the ability to react to bots
-        await self.igh_bro(message)
-
-        if message.author.bot:
-            return
-
-        await self.repost_game_clips(message)
-        await self.ping_vc(message)
-        await self.update_twitter_link(message)
-
-        # await self.crazy_check(message)
-        # await self.embed_evaluation(message)
-
-        await self.bot.process_commands(message)
-
-
     @commands.Cog.listener()
     async def on_member_join(self, member : Member) -> None:
         if member.bot:
@@ -127,7 +110,8 @@ class EventHandlersCog(commands.Cog):
     #######                                                #######
     ##############################################################
 
-    async def crazy_check(self, message : Message):
+    # disabled, not registered as a message handler
+    async def crazy_check(self, context : MessageContext):
         """
         crazy? i was crazy once.
         they locked me in a room.
@@ -137,11 +121,12 @@ class EventHandlersCog(commands.Cog):
 
         Parameters
         ----------
-        message : Message
-            the message that was sent
+        context : MessageContext
+            the context of the message that was sent
         """
 
-        msg = message.content.lower()
+        message = context.message
+        msg = context.lowered_content
 
         if 'crazy' in msg:
             if 'i was crazy once' in msg:
@@ -164,18 +149,19 @@ class EventHandlersCog(commands.Cog):
                 return
 
 
-    async def igh_bro(self, message : Message):
+    # preserve the ability to react to bots
+    @message_handler(include_bots=True, channel_ids=[get_id('KNS_GAME_UPDATES')])
+    async def igh_bro(self, context : MessageContext):
         """
         igh bro
         
         Parameters
         ----------
-        message : Message
-            the message that was sent
+        context : MessageContext
+            the context of the message that was sent
         """
 
-        if message.channel.id != get_id('KNS_GAME_UPDATES'):
-            return
+        message = context.message
 
         if message.author.id in (get_id('PETRICHOR_ID'), get_id('PETRICHOR_TESTING_ID')):
             return
@@ -184,6 +170,7 @@ class EventHandlersCog(commands.Cog):
         return
 
 
+    # disabled, not registered as a message handler
     async def embed_evaluation(self, message : Message):
         """
         epic fail of the embed
@@ -245,15 +232,15 @@ class EventHandlersCog(commands.Cog):
         return any(link in message for link in EMBED_FAIL_EXCEPTIONS)
 
 
-    def _link_in_message(self, message : Message) -> bool:
+    def _link_in_message(self, context : MessageContext) -> bool:
         """
         Verifies if a given message has a link inside.
 
         
         Parameters
         ----------
-        message : Message
-            the message to check for a link in
+        context : MessageContext
+            the context of the message to check for a link in
         
         Returns
         -------
@@ -261,13 +248,13 @@ class EventHandlersCog(commands.Cog):
             True, if the message has a link |
             False, otherwise
         """
-        return 'https://' in message.content or len(message.embeds) > 0
+        return len(context.urls) > 0 or len(context.message.embeds) > 0
 
 
     def _get_links_from_message(
         self, 
-        message : Message, 
-        domains : list[str] | None = None
+        context : MessageContext, 
+        domains : Iterable[str] | None = None
     ) -> list[str]:
         """
         Parses the links from a message and returns the list of links.
@@ -277,10 +264,10 @@ class EventHandlersCog(commands.Cog):
         
         Parameters
         ----------
-        message : Message
-            the message to check for a link in
-        domains : list[str], optional
-            the domains of the links that you wish to return
+        context : MessageContext
+            the context of the message to check for a link in
+        domains : Iterable[str], optional
+            the domains of the links that you wish to return, e.g. `x.com`
         
         Returns
         -------
@@ -289,31 +276,25 @@ class EventHandlersCog(commands.Cog):
         """
 
         if not domains:
-            return [
-                term
-                for term
-                in message.content.split(" ")
-                if term.startswith("https://")
-            ]
+            return [url.url for url in context.urls]
 
         return [
-            term
-            for term
-            in message.content.split(" ")
-            if term.startswith("https://") 
-            and any(term.startswith(domain) for domain in domains)
+            url.url
+            for url
+            in context.urls
+            if url.domain in domains
         ]
 
 
-    def _get_twitter_links(self, message : Message) -> list[str]:
+    def _get_twitter_links(self, context : MessageContext) -> list[str]:
         """
         Parses the Twitter links from a message and returns the list of links.
 
 
         Parameters
         ----------
-        message : Message
-            the message to check for a link in
+        context : MessageContext
+            the context of the message to check for a link in
 
 
         Returns
@@ -323,39 +304,39 @@ class EventHandlersCog(commands.Cog):
         """
 
         return self._get_links_from_message(
-            message=message,
-            domains=[
-                'https://twitter.com',
-                'https://x.com',
-            ]
+            context=context,
+            domains=TWITTER_DOMAINS
         )
 
 
 
-    async def update_twitter_link(self, message : Message) -> None:
+    @message_handler(requires=['urls'])
+    async def update_twitter_link(self, context : MessageContext) -> None:
         """
         Updates a sent Twitter link to use fxtwitter.
 
         
         Parameters
         ----------
-        message : Message
-            the message to update
+        context : MessageContext
+            the context of the message to update
         """
 
-        if not self._link_in_message(message):
+        message = context.message
+
+        if not self._link_in_message(context):
             return
 
-        twitter_links_in_message = self._get_twitter_links(message)
+        twitter_links_in_message = self._get_twitter_links(context)
 
         if not twitter_links_in_message:
             return
 
-        new_links : list[str] = [
-            "https://fxtwitter.com" + link[link.index(".com") + 4:]
-            for link
-            in twitter_links_in_message
-        ]
+        new_links : list[str] = []
+        for link in twitter_links_in_message:
+            # only the domain is replaced, as it may be in any case
+            link_parts = urlsplit(link)
+            new_links.append(urlunsplit(link_parts._replace(netloc='fxtwitter.com')))
 
         # suppress the original message to remove unnecessary duplicated embed
         await message.edit(
@@ -375,22 +356,22 @@ class EventHandlersCog(commands.Cog):
     #######                                                #######
     ##############################################################
 
+    @message_handler(guild_ids=[get_id('FANTA_ID')])
     async def repost_game_clips(
         self,
-        message : Message,
+        context : MessageContext,
     ) -> None:
         """
         Reposts game clips posted to my archive server to another server.
         
         Parameters
         ----------
-        message : Message
-            the message to repost, if applicable
+        context : MessageContext
+            the context of the message to repost, if applicable
         """
-        
-        if message.guild.id != get_id('FANTA_ID'):
-            return
-        
+
+        message = context.message
+
         if 'clips' not in message.channel.name:
             return
         
@@ -402,9 +383,10 @@ class EventHandlersCog(commands.Cog):
         await self.repost_to_channel(text_to_send)
 
 
+    @message_handler(channel_types=[ChannelType.voice])
     async def ping_vc(
         self,
-        message : Message,
+        context : MessageContext,
     ) -> None:
         """
         Replaces an instance of @vc with a ping to all the users in
@@ -412,14 +394,13 @@ class EventHandlersCog(commands.Cog):
         
         Parameters
         ----------
-        message : str
-            the message to process
+        context : MessageContext
+            the context of the message to process
         """
 
-        if not isinstance(message.channel, VoiceChannel):
-            return
-        
-        if '@vc' not in message.content.lower():
+        message = context.message
+
+        if '@vc' not in context.lowered_content:
             return
         
         members_in_vc = message.channel.members
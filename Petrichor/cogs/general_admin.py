@@ -172,6 +172,145 @@ class AdminCog(commands.Cog):
         await interaction.response.send_message('Reloaded Cogs')
 
 
+    @app_commands.command(
+        name='db-stats',
+        description='Shows the statistics of the database connection'
+    )
+    async def db_stats(self, interaction : Interaction) -> None:
+        """
+        Displays the statistics of the database connection manager.
+
+        Parameters
+        ----------
+        interaction : Interaction
+            the interaction that evoked the command
+        """
+
+        response = '# Database Statistics\n'
+        for component, stats in self.bot.db.diagnostics().items():
+            response += f'## {component}\n'
+            response += '\n'.join(
+                f'- {stat_name}: {stat_value}'
+                for stat_name, stat_value
+                in stats.items()
+            )
+            response += '\n'
+
+        # keep within discord's message length limit
+        await interaction.response.send_message(response[:2000])
+
+
+    @app_commands.command(
+        name='db-top-queries',
+        description='Shows the query shapes that take up the most database time'
+    )
+    async def db_top_queries(
+        self,
+        interaction : Interaction,
+        count : int = 5
+    ) -> None:
+        """
+        Displays the query shapes that the most total time was spent running,
+        along with their timings.
+
+        Parameters
+        ----------
+        interaction : Interaction
+            the interaction that evoked the command
+        count : int, default = 5
+            the number of query shapes to show
+        """
+
+        top_shapes = self.bot.db.query_stats.top_shapes(limit=count)
+
+        if not top_shapes:
+            await interaction.response.send_message('No queries have been run yet.')
+            return
+
+        response = '# Top Queries by Total Time\n'
+        for shape, summary in top_shapes:
+            stats = ' | '.join(
+                f'{stat_name}: {stat_value}'
+                for stat_name, stat_value
+                in summary.items()
+            )
+            response += f'```sql\n{shape[:300]}\n```{stats}\n'
+
+        # keep within discord's message length limit
+        await interaction.response.send_message(response[:2000])
+
+
+    @app_commands.command(
+        name='message-stats',
+        description='Shows the timings of the message handlers'
+    )
+    async def message_stats(self, interaction : Interaction) -> None:
+        """
+        Displays the statistics of the message pipeline, and the timings of
+        each message handler.
+
+        Parameters
+        ----------
+        interaction : Interaction
+            the interaction that evoked the command
+        """
+
+        response = '# Message Handler Statistics\n'
+        response += '\n'.join(
+            f'- {stat_name}: {stat_value}'
+            for stat_name, stat_value
+            in self.bot.message_pipeline.stats().items()
+        )
+        response += '\n'
+
+        for handler_name, summary in self.bot.message_pipeline.handler_timings().items():
+            stats = ' | '.join(
+                f'{stat_name}: {stat_value}'
+                for stat_name, stat_value
+                in summary.items()
+            )
+            response += f'## {handler_name}\n{stats}\n'
+
+        # keep within discord's message length limit
+        await interaction.response.send_message(response[:2000])
+
+
+    @app_commands.command(
+        name='db-rebuild-ping-counts',
+        description='Rebuilds the /rtp ping counts from the full ping history'
+    )
+    async def db_rebuild_ping_counts(self, interaction : Interaction) -> None:
+        """
+        Rebuilds the `/rtp` ping counts summary table from the full history
+        of pings.
+
+        Parameters
+        ----------
+        interaction : Interaction
+            the interaction that evoked the command
+        """
+
+        roll_the_ping_cog = self.bot.get_cog('RollThePingCog')
+
+        if roll_the_ping_cog is None:
+            await interaction.response.send_message('RollThePingCog is not loaded.')
+            return
+
+        # the ping counts are rebuilt with an SQL script
+        if not self.bot.db.SUPPORTS_SQL_SCRIPTS:
+            await interaction.response.send_message(
+                'Rebuilding the /rtp ping counts is not supported on the in-memory database.'
+            )
+            return
+
+        await interaction.response.defer(thinking=True)
+
+        if await roll_the_ping_cog.rebuild_ping_counts():
+            await interaction.followup.send('Rebuilt the /rtp ping counts.')
+        else:
+            await interaction.followup.send('Could not rebuild the /rtp ping counts.')
+
+
     async def _reload_cog(self, cog_path : str) -> bool:
         """
         Reloads a given cog.
@@ -9,6 +9,8 @@ import random
 from discord.ext import commands
 from discord import app_commands
 
+from util.printing import print_petrichor_msg, print_petrichor_error
+
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from discord import (
@@ -22,6 +24,30 @@ if TYPE_CHECKING:
     from Petrichor.PetrichorBot import PetrichorBot
 
 
+REBUILD_PING_COUNTS_SCRIPT = '''
+DELETE FROM roll_the_ping_counts;
+
+INSERT INTO roll_the_ping_counts (guild_id, user_id, pinger_count, victim_count)
+SELECT guild_id, user_id, SUM(pinger_count), SUM(victim_count)
+FROM (
+    SELECT guild_id, pinger_id AS user_id, 1 AS pinger_count, 0 AS victim_count
+    FROM roll_the_pings
+    UNION ALL
+    SELECT guild_id, pingee_id AS user_id, 0 AS pinger_count, 1 AS victim_count
+    FROM roll_the_pings
+) AS pings
+WHERE user_id IS NOT NULL
+GROUP BY guild_id, user_id;
+'''
+
+
+
+class PingRecordError(Exception):
+    """
+    Raised when a step of recording an `/rtp` ping failed.
+    """
+
+
 
 class RollThePingCog(commands.Cog):
     """
@@ -53,7 +79,8 @@ class RollThePingCog(commands.Cog):
     async def roll_the_ping(self, interaction : Interaction):
         """
         Picks a random active member and pings them. Makes a record of the ping
-        as well.
+        as well, and adds it to the ping counts of both members, in the same
+        transaction.
 
         Parameters
         ----------
@@ -79,16 +106,74 @@ class RollThePingCog(commands.Cog):
             f"By fate, {interaction.user.display_name} has pinged {ping_victim.mention}. Congrats!"
         )
 
-        await self.bot.db.insert_row(
-            table_name='roll_the_pings',
-            record_info=[
-                bot_response.message_id,
-                interaction.user.id,
-                ping_victim.id,
-                interaction.guild_id,
-                interaction.created_at
-            ]
-        )
+        try:
+            async with self.bot.db.transaction() as conn:
+
+                # a failed step raises, so that the transaction is rolled back
+                # rather than committed with only some of the steps
+                if not await self.bot.db.insert_row(
+                    table_name='roll_the_pings',
+                    record_info=[
+                        bot_response.message_id,
+                        interaction.user.id,
+                        ping_victim.id,
+                        interaction.guild_id,
+                        interaction.created_at
+                    ],
+                    conn=conn
+                ):
+                    raise PingRecordError('could not insert the ping')
+
+                if not await self.bot.db.increment_counters(
+                    table_name='roll_the_ping_counts',
+                    key={
+                        'guild_id' : interaction.guild_id,
+                        'user_id' : interaction.user.id
+                    },
+                    increments={'pinger_count' : 1},
+                    conn=conn
+                ):
+                    raise PingRecordError('could not count the pinger')
+
+                if not await self.bot.db.increment_counters(
+                    table_name='roll_the_ping_counts',
+                    key={
+                        'guild_id' : interaction.guild_id,
+                        'user_id' : ping_victim.id
+                    },
+                    increments={'victim_count' : 1},
+                    conn=conn
+                ):
+                    raise PingRecordError('could not count the victim')
+
+        except PingRecordError as e:
+            print_petrichor_error(f'Could not record the /rtp ping, rolled back: {e}')
+
+
+    async def rebuild_ping_counts(self) -> bool:
+        """
+        Rebuilds the ping counts of every member from the full `/rtp` history,
+        in case they have drifted from it.
+
+        Returns
+        -------
+        bool
+            True, if the ping counts were successfully rebuilt |
+            False, if there was an error rebuilding the ping counts
+        """
+
+        # the counts are replaced all at once, so they are never read empty
+        async with self.bot.db.transaction() as conn:
+            rebuilt_successfully = await self.bot.db.run_data_script(
+                REBUILD_PING_COUNTS_SCRIPT,
+                table_names=['roll_the_ping_counts'],
+                conn=conn
+            )
+
+        if rebuilt_successfully:
+            print_petrichor_msg('Rebuilt the /rtp ping counts')
+
+        return rebuilt_successfully
 
 
     
@@ -212,15 +297,18 @@ class RollThePingCog(commands.Cog):
             )
 
         rtp_user_type = 'Perpetrator' if perpetrator else 'Victim'
-        rtp_user_column_name = 'pinger_id' if perpetrator else 'pingee_id'
+        rtp_count_column_name = 'pinger_count' if perpetrator else 'victim_count'
 
         rows : list[Record] = await self.bot.db.fetch_rows(
-            table_name='roll_the_pings',
-            columns=['COUNT(*) pings', rtp_user_column_name],
-            group_by=rtp_user_column_name,
-            order_by='pings',
+            table_name='roll_the_ping_counts',
+            columns=['user_id', rtp_count_column_name],
+            where={
+                'guild_id' : interaction.guild_id,
+                rtp_count_column_name : ('>', 0)
+            },
+            order_by=rtp_count_column_name,
             order_by_ascending=reverse,
-            where=f"guild_id = '{interaction.guild_id}'"
+            cache=True
         )
 
         if not rows:
@@ -239,12 +327,12 @@ class RollThePingCog(commands.Cog):
             if count != 0 and member_count == count:
                 break
 
-            member : Member = guild.get_member(int(row[rtp_user_column_name]))
+            member : Member = guild.get_member(row['user_id'])
             if not member: continue
 
             response += (
                 f'{member_count+1}. {member.display_name} '
-                f'(pinged {row['pings']} times)\n'
+                f'(pinged {row[rtp_count_column_name]} times)\n'
             )
             member_count += 1
 
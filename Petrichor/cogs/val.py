@@ -4,28 +4,32 @@ Contains the Cog that holds commands related to kaeley.
 """
 from __future__ import annotations
 
+import asyncio
+
 from discord.ext import commands
 from discord import app_commands
 
+from util.config import SIDE_EYE_STATE_RETRY_SECONDS
+from util.emoji_matcher import EmojiMatcher
 from util.env_vars import get_dict
 from util.printing import print_petrichor_msg, print_petrichor_error
+from util.tracked_event_state import TrackedEventState
+from Petrichor.message_pipeline import message_handler
 
-import re
-from datetime import datetime
 from datetime import timedelta
 
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
+    from datetime import datetime
     from discord import (
         Interaction,
-        Message,
         Reaction,
-        User,
-        StickerItem
+        User
     )
     from asyncpg import Record
 
     from Petrichor.PetrichorBot import PetrichorBot
+    from util.message_context import MessageContext
 
 
 SIDE_EYE_EMOTE_IDS = [
@@ -43,8 +47,8 @@ SIDE_EYE_EMOTE_IDS = [
 SIDE_EYE_STICKER_IDS = [
     1335000085385318423
 ]
+SIDE_EYE_MATCHER = EmojiMatcher(SIDE_EYE_EMOTE_IDS, SIDE_EYE_STICKER_IDS)
 VAL_ID : int = int(get_dict('FRIEND_IDS')['KAELEY'])
-DATETIME_FORMAT : str = '%Y-%m-%d %H:%M:%S.%f%z'
 
 
 class ValCog(commands.Cog):
@@ -55,6 +59,11 @@ class ValCog(commands.Cog):
     ----------
     bot : PetrichorBot
         bot that the commands belong to
+    side_eye_states : dict[int, TrackedEventState]
+        mapping of guild ids to the statistics of kaeley's side eyes in the
+        guild, where the info of the last event is its
+        `(channel_id, message_id)`. A guild's statistics are loaded again
+        whenever its side eyes are written, by this or any other process
     """
 
     def __init__(self, bot : PetrichorBot):
@@ -67,22 +76,233 @@ class ValCog(commands.Cog):
             bot that the commands belong to
         """
         self.bot = bot
+        self.side_eye_states : dict[int, TrackedEventState] = {}
+        self._side_eye_states_loaded : bool = False
+        self._side_eye_states_lock = asyncio.Lock()
 
+        # guilds whose side eye statistics are out of date, None for all guilds
+        self._stale_side_eye_guild_ids : set[int] | None = set()
+        self._side_eye_refresh_task : asyncio.Task | None = None
 
-    @commands.Cog.listener()
-    async def on_message(self, message : Message):
+
+    async def cog_load(self) -> None:
+        """
+        Loads the side eye statistics of every guild when the cog is loaded,
+        and starts reloading the statistics of a guild whenever its side eyes
+        are written. If the statistics can't be loaded, loading them is
+        retried in the background.
+        """
+
+        self.bot.db.add_rows_changed_listener(
+            'kaeley_side_eyes',
+            self._mark_side_eye_states_stale
+        )
+
+        if not await self._load_side_eye_states():
+            self._mark_side_eye_states_stale(None)
+
+
+    def cog_unload(self) -> None:
+        """
+        Runs when the cog is unloaded. Stops reloading the side eye statistics.
         """
-        Event listener that reacts to all messages.
+
+        self.bot.db.remove_rows_changed_listener(
+            'kaeley_side_eyes',
+            self._mark_side_eye_states_stale
+        )
+
+        if self._side_eye_refresh_task is not None:
+            self._side_eye_refresh_task.cancel()
+
+
+    async def _load_side_eye_states(self, guild_ids : set[int] | None = None) -> bool:
+        """
+        Loads the side eye statistics of the given guilds from the database,
+        with a single aggregate query, plus a single query for the location
+        of the most recent side eye of every guild.
 
         Parameters
         ----------
-        message : Message
-            the message that was sent
+        guild_ids : set[int] | None, default = None
+            the guilds to load the statistics of, defaults to every guild
+
+        Returns
+        -------
+        bool
+            True, if the statistics were loaded |
+            False, if there was an error loading them
         """
 
-        await self.check_for_side_eye(message)
+        async with self._side_eye_states_lock:
+
+            if guild_ids is None:
+                # side eyes still waiting in the write-behind buffer would be missed
+                await self.bot.db.flush_writes()
+
+                side_eye_states = await self._fetch_side_eye_states()
+                if side_eye_states is None:
+                    print_petrichor_error('Could not load the side eye statistics')
+                    return False
+
+                self.side_eye_states = side_eye_states
+                self._side_eye_states_loaded = True
+                print_petrichor_msg(
+                    f'Loaded side eye statistics for {len(side_eye_states)} guilds'
+                )
+                return True
+
+            for guild_id in guild_ids:
+                side_eye_states = await self._fetch_side_eye_states(guild_id)
+                if side_eye_states is None:
+                    print_petrichor_error(
+                        f'Could not load the side eye statistics of guild {guild_id}'
+                    )
+                    return False
+
+                self.side_eye_states.pop(guild_id, None)
+                self.side_eye_states.update(side_eye_states)
+
+            return True
+
+
+    async def _fetch_side_eye_states(
+        self,
+        guild_id : int = None
+    ) -> dict[int, TrackedEventState] | None:
+        """
+        Fetches the side eye statistics of one or every guild from the database.
+
+        Parameters
+        ----------
+        guild_id : int, default = None
+            the guild to fetch the statistics of, defaults to every guild
+
+        Returns
+        -------
+        dict[int, TrackedEventState]
+            mapping of guild ids to their side eye statistics, guilds without
+            side eyes are left out |
+            None, if there was an error fetching the statistics
+        """
+
+        where = {'guild_id' : guild_id} if guild_id is not None else None
+
+        # both queries read the same snapshot, so they agree on the last side eye
+        async with self.bot.db.read_session(snapshot=True) as conn:
+
+            side_eye_gaps : list[Record] | None = await self.bot.db.longest_gaps_by_group(
+                table_name='kaeley_side_eyes',
+                time_column='message_time',
+                group_by='guild_id',
+                where=where,
+                conn=conn
+            )
+
+            last_side_eyes : list[Record] | None = await self.bot.db.latest_rows_by_group(
+                table_name='kaeley_side_eyes',
+                columns=['channel_id', 'message_id'],
+                group_by='guild_id',
+                order_by='message_time',
+                where=where,
+                conn=conn
+            )
+
+        if side_eye_gaps is None or last_side_eyes is None:
+            return None
+
+        # guild id -> location of the most recent side eye in the guild
+        last_side_eye_infos : dict[int, tuple[int, int]] = {
+            last_side_eye['guild_id'] : (
+                last_side_eye['channel_id'],
+                last_side_eye['message_id']
+            )
+            for last_side_eye
+            in last_side_eyes
+        }
+
+        return {
+            guild_side_eye_gaps['guild_id'] : TrackedEventState(
+                event_count=guild_side_eye_gaps['event_count'],
+                last_event_time=guild_side_eye_gaps['last_event_time'],
+                last_event_info=last_side_eye_infos.get(guild_side_eye_gaps['guild_id']),
+                longest_gap=guild_side_eye_gaps['longest_gap']
+            )
+            for guild_side_eye_gaps
+            in side_eye_gaps
+        }
+
+
+    def _mark_side_eye_states_stale(self, guild_ids : set[str] | None) -> None:
+        """
+        Marks the side eye statistics of the given guilds as out of date, and
+        starts reloading them, unless they are already being reloaded. Runs
+        whenever side eyes are written.
+
+        Parameters
+        ----------
+        guild_ids : set[str] | None
+            the guilds whose side eyes were written, None for every guild
+        """
+
+        if guild_ids is None:
+            self._stale_side_eye_guild_ids = None
+        elif self._stale_side_eye_guild_ids is not None:
+            self._stale_side_eye_guild_ids.update(int(guild_id) for guild_id in guild_ids)
+
+        if self._side_eye_refresh_task is None or self._side_eye_refresh_task.done():
+            self._side_eye_refresh_task = asyncio.create_task(
+                self._refresh_side_eye_states()
+            )
+
+
+    async def _refresh_side_eye_states(self) -> None:
+        """
+        Reloads the out of date side eye statistics until none are left,
+        retrying every `SIDE_EYE_STATE_RETRY_SECONDS` seconds if they can't
+        be loaded.
+        """
+
+        while self._stale_side_eye_guild_ids is None or self._stale_side_eye_guild_ids:
+
+            stale_guild_ids, self._stale_side_eye_guild_ids = self._stale_side_eye_guild_ids, set()
+
+            if await self._load_side_eye_states(stale_guild_ids):
+                continue
+
+            # guilds marked stale meanwhile are reloaded along with the failed ones
+            if stale_guild_ids is None or self._stale_side_eye_guild_ids is None:
+                self._stale_side_eye_guild_ids = None
+            else:
+                self._stale_side_eye_guild_ids.update(stale_guild_ids)
 
-        await self.bot.process_commands(message)
+            await asyncio.sleep(SIDE_EYE_STATE_RETRY_SECONDS)
+
+
+    async def _side_eye_states_unavailable(self, interaction : Interaction) -> bool:
+        """
+        Tells the user to try again later if the side eye statistics haven't
+        been loaded yet, rather than answering with incomplete statistics.
+
+        Parameters
+        ----------
+        interaction : Interaction
+            interaction that triggered the command
+
+        Returns
+        -------
+        bool
+            True, if the statistics are not loaded and the user was told so |
+            False, if the statistics are loaded
+        """
+
+        if self._side_eye_states_loaded:
+            return False
+
+        await interaction.response.send_message(
+            'The side eye statistics are still loading. Please try again later.'
+        )
+        return True
 
 
     @commands.Cog.listener()
@@ -105,10 +325,10 @@ class ValCog(commands.Cog):
         if user.id != VAL_ID:
             return
         
-        if reaction.emoji.id not in SIDE_EYE_EMOTE_IDS:
+        if reaction.emoji.id not in SIDE_EYE_MATCHER.emoji_ids:
             return
         
-        inserted_successfully = await self.bot.db.insert_row(
+        inserted_successfully = self.bot.db.enqueue_row(
             table_name='kaeley_side_eyes',
             record_info=[
                 reaction.message.guild.id,
@@ -130,49 +350,51 @@ class ValCog(commands.Cog):
         )
     
 
+    @message_handler(author_ids=[VAL_ID])
     async def check_for_side_eye(
         self,
-        message : Message
+        context : MessageContext
     ) -> None:
         """
         Checks if kaeley sends a side eye emoji, and logs it if so.
 
         Parameters
         ----------
-        message : Message
-            the message that was sent
+        context : MessageContext
+            the context of the message that was sent
         """
 
-        if message.author.id != VAL_ID:
-            return
-        
-        side_eye_emoji_id = self._side_eye_emoji_in_message(message.content)
-        side_eye_sticker_id = self._side_eye_sticker_in_message(message)
+        message = context.message
+
+        side_eye_match = SIDE_EYE_MATCHER.match(context)
 
-        if not side_eye_emoji_id and not side_eye_sticker_id:
+        if not side_eye_match.emoji_ids and not side_eye_match.sticker_ids:
             return
-        
-        if side_eye_emoji_id:
-            inserted_successfully = await self.bot.db.insert_row(
+
+        # a message is logged as a single side eye, with its first side eye
+        if side_eye_match.emoji_ids:
+            side_eye_id = side_eye_match.emoji_ids[0]
+            inserted_successfully = self.bot.db.enqueue_row(
                 table_name='kaeley_side_eyes',
                 record_info=[
                     message.guild.id,
                     message.channel.id,
                     message.id,
-                    side_eye_emoji_id,
+                    side_eye_id,
                     True,
                     True,
                     message.created_at
                 ]
             )
         else:
-            inserted_successfully = await self.bot.db.insert_row(
+            side_eye_id = side_eye_match.sticker_ids[0]
+            inserted_successfully = self.bot.db.enqueue_row(
                 table_name='kaeley_side_eyes',
                 record_info=[
                     message.guild.id,
                     message.channel.id,
                     message.id,
-                    side_eye_sticker_id,
+                    side_eye_id,
                     False,
                     True,
                     message.created_at
@@ -182,69 +404,12 @@ class ValCog(commands.Cog):
         if not inserted_successfully:
             print_petrichor_error('Failed to log kaeley side eye emoji message.')
             return
-        
+
         print_petrichor_msg(
-            f'Logged side eye emoji message from kaeley with id {side_eye_emoji_id}.'
+            f'Logged side eye emoji message from kaeley with id {side_eye_id}.'
         )
 
 
-    def _side_eye_emoji_in_message(
-        self,
-        message : str
-    ) -> int | None:
-        """
-        Checks if a side eye emoji is in the message.
-
-        Parameters
-        ----------
-        message : str
-            the message to check
-
-        Returns
-        -------
-        int | None
-            id of the side eye emoji if found, 
-            otherwise None
-        """
-
-        for emote_id in SIDE_EYE_EMOTE_IDS:
-            emote_regex = re.compile(f'<:.*:{emote_id}>')
-            if re.search(emote_regex, message):
-                return emote_id
-        
-        return None
-    
-
-    def _side_eye_sticker_in_message(
-        self,
-        message : Message
-    ) -> int | None:
-        """
-        Checks if a side eye sticker is in the message.
-
-        Parameters
-        ----------
-        message : Message
-            the message to check
-
-        Returns
-        -------
-        int | None
-            id of the side eye sticker if found, 
-            otherwise None
-        """
-
-        if not message.stickers:
-            return None
-        
-        sticker : StickerItem
-        for sticker in message.stickers:
-            if sticker.id in SIDE_EYE_STICKER_IDS:
-                return sticker.id
-
-        return None
-
-
     kaeley = app_commands.Group(
         name='kaeley',
         description='Commands related to kaeley'
@@ -268,30 +433,27 @@ class ValCog(commands.Cog):
             interaction that triggered the command
         """
 
-        last_side_eye : Record = await self.bot.db.fetch_rows(
-            table_name='kaeley_side_eyes',
-            where=f"guild_id = '{interaction.guild_id}'",
-            order_by='message_time',
-            order_by_ascending=False,
-            limit=1
-        )
+        if await self._side_eye_states_unavailable(interaction):
+            return
 
-        if not last_side_eye:
+        side_eye_state = self.side_eye_states.get(interaction.guild_id)
+
+        if side_eye_state is None or side_eye_state.last_event_info is None:
             await interaction.response.send_message(
                 'Apparently kaeley has never sent a side eye emoji, sticker, or reaction '
                 'in this server (this simply can not be true)'
             )
             return
         
-        last_side_eye = last_side_eye[0]
+        channel_id, message_id = side_eye_state.last_event_info
 
         guild = self.bot.get_guild(interaction.guild_id) \
                 or await self.bot.fetch_guild(interaction.guild_id)
-        channel = guild.get_channel(last_side_eye['channel_id']) \
-                or await guild.fetch_channel(last_side_eye['channel_id'])
-        message = await channel.fetch_message(last_side_eye['message_id'])
+        channel = guild.get_channel(channel_id) \
+                or await guild.fetch_channel(channel_id)
+        message = channel.get_partial_message(message_id)
         
-        time_delta : timedelta = interaction.created_at - last_side_eye['message_time']
+        time_delta : timedelta = side_eye_state.current_gap(interaction.created_at)
 
         formatted_td = self._format_timedelta(time_delta)
 
@@ -319,12 +481,11 @@ class ValCog(commands.Cog):
             interaction that triggered the command
         """
 
-        side_eye_list : list[Record] = await self.bot.db.fetch_rows(
-            table_name='kaeley_side_eyes',
-            where=f"guild_id = '{interaction.guild_id}'"
-        )
+        if await self._side_eye_states_unavailable(interaction):
+            return
 
-        side_eye_count : int = len(side_eye_list)
+        side_eye_state = self.side_eye_states.get(interaction.guild_id)
+        side_eye_count = side_eye_state.event_count if side_eye_state else 0
 
         await interaction.response.send_message(
             f'kaeley has sent a total of {side_eye_count} '
@@ -349,32 +510,14 @@ class ValCog(commands.Cog):
             interaction that triggered the command
         """
 
-        side_eye_list : list[Record] = await self.bot.db.fetch_rows(
-            table_name='kaeley_side_eyes',
-            where=f"guild_id = '{interaction.guild_id}'",
-            order_by='message_time', 
-            order_by_ascending=True
-        )
-
-        longest_drought = timedelta(seconds=0)
-        
-        for i, side_eye_record in enumerate(side_eye_list):
-
-            if i == 0:
-                continue
-
-            second = f'{side_eye_record['message_time']}'
-            first = f'{side_eye_list[i - 1]['message_time']}'
-
-            first_dt = datetime.strptime(f'{first}', DATETIME_FORMAT)
-            second_dt = datetime.strptime(f'{second}', DATETIME_FORMAT)
-
-            current_drought = second_dt - first_dt
-            
-            longest_drought = max(longest_drought, current_drought)
+        if await self._side_eye_states_unavailable(interaction):
+            return
 
+        side_eye_state = self.side_eye_states.get(interaction.guild_id) \
+                         or TrackedEventState()
 
-        longest_drought = max(longest_drought, interaction.created_at - second_dt)
+        # the current drought counts too
+        longest_drought = side_eye_state.longest_gap_until(interaction.created_at)
 
         await interaction.response.send_message(
             f'The longest side eye drought kaeley has had in this server is '
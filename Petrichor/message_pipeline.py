@@ -0,0 +1,507 @@
+"""message_pipeline.py
+
+Contains the pipeline that hands every message the bot receives to the
+message handlers of the cogs.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from functools import cached_property
+from typing import NamedTuple
+
+from Petrichor.message_routing import MessageRoutingIndex
+from util.message_context import MessageContext
+from util.printing import print_petrichor_error
+from util.query_stats import percentile
+from util.config import MESSAGE_HANDLER_TIMEOUT_SECONDS, MESSAGE_HANDLER_SAMPLE_SIZE
+
+from typing import TYPE_CHECKING, Any
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Iterable
+
+    from discord import ChannelType, Message
+    from discord.ext.commands import Cog
+
+
+MESSAGE_HANDLER_ATTRIBUTE = '__message_handler__'
+
+
+
+class MessageHandlerOptions(NamedTuple):
+    include_bots: bool
+    timeout: float
+    guild_ids: frozenset[int] | None
+    channel_ids: frozenset[int] | None
+    channel_types: frozenset[ChannelType] | None
+    author_ids: frozenset[int] | None
+    requires: tuple[str, ...]
+
+
+
+class MessageHandler(NamedTuple):
+    name: str
+    callback: Callable[[MessageContext], Awaitable[None]]
+    options: MessageHandlerOptions
+
+
+
+def message_handler(
+    include_bots : bool = False,
+    timeout : float = MESSAGE_HANDLER_TIMEOUT_SECONDS,
+    guild_ids : Iterable[int] = None,
+    channel_ids : Iterable[int] = None,
+    channel_types : Iterable[ChannelType] = None,
+    author_ids : Iterable[int] = None,
+    requires : Iterable[str] = ()
+) -> Callable:
+    """
+    Marks a cog method as a message handler, which the bot runs for every
+    message it receives, once the cog is added to the bot. The method takes
+    the `MessageContext` of the message:
+    ```
+    @message_handler()
+    async def check_message(self, context : MessageContext) -> None:
+        pass
+    ```
+    The handlers of a message run concurrently, so a handler must not rely
+    on another handler having run before it.
+
+    A handler that only applies to some messages should declare its scope,
+    rather than check for it in its body, e.g. a handler for a single channel:
+    ```
+    @message_handler(channel_ids=[get_id('KNS_GAME_UPDATES')])
+    ```
+    Messages outside the scope of a handler are filtered out by the pipeline
+    before any task is created for them. A message must fall in every scope
+    the handler declares.
+
+    A handler that only applies to messages with some content, e.g. links,
+    should also declare the `MessageContext` fields it needs, so that plain
+    messages skip it:
+    ```
+    @message_handler(requires=['urls'])
+    ```
+
+    Parameters
+    ----------
+    include_bots : bool, default = False
+        if True, the handler also runs for messages sent by bots
+    timeout : float, default = MESSAGE_HANDLER_TIMEOUT_SECONDS
+        the number of seconds after which the handler is cancelled
+    guild_ids : Iterable[int], default = None
+        the guilds whose messages the handler runs for, defaults to all
+    channel_ids : Iterable[int], default = None
+        the channels whose messages the handler runs for, defaults to all
+    channel_types : Iterable[ChannelType], default = None
+        the types of channel whose messages the handler runs for, defaults to all
+    author_ids : Iterable[int], default = None
+        the users whose messages the handler runs for, defaults to all
+    requires : Iterable[str], default = ()
+        the `MessageContext` fields that must be non-empty for the handler to
+        run, e.g. `urls` or `flags`
+
+    Returns
+    -------
+    Callable
+        the decorator that marks the method
+
+    Raises
+    ------
+    ValueError
+        if a required field is not a field of `MessageContext`
+    """
+
+    for field in requires:
+        if not isinstance(getattr(MessageContext, field, None), cached_property):
+            raise ValueError(f'{field} is not a field of MessageContext')
+
+    options = MessageHandlerOptions(
+        include_bots=include_bots,
+        timeout=timeout,
+        guild_ids=frozenset(guild_ids) if guild_ids is not None else None,
+        channel_ids=frozenset(channel_ids) if channel_ids is not None else None,
+        channel_types=frozenset(channel_types) if channel_types is not None else None,
+        author_ids=frozenset(author_ids) if author_ids is not None else None,
+        requires=tuple(requires)
+    )
+
+    def decorator(func : Callable) -> Callable:
+        setattr(func, MESSAGE_HANDLER_ATTRIBUTE, options)
+        return func
+
+    return decorator
+
+
+
+class HandlerTimings:
+    """
+    Class that holds the timings of every run of a single message handler.
+
+    Attributes
+    ----------
+    count : int
+        the number of times the handler ran
+    errors : int
+        the number of runs that raised an error
+    timeouts : int
+        the number of runs that were cancelled for taking too long
+    total_time : float
+        the total time spent running the handler, in seconds
+    max_time : float
+        the longest run of the handler, in seconds
+    """
+
+    def __init__(self, sample_size : int):
+        """
+        Creates an instance of the HandlerTimings class.
+
+        Parameters
+        ----------
+        sample_size : int
+            the number of most recent run times to keep for percentiles
+        """
+
+        self.count : int = 0
+        self.errors : int = 0
+        self.timeouts : int = 0
+        self.total_time : float = 0.0
+        self.max_time : float = 0.0
+        self._samples : deque[float] = deque(maxlen=sample_size)
+
+
+    def record(self, elapsed : float, failed : bool, timed_out : bool) -> None:
+        """
+        Records a single run of the handler.
+
+        Parameters
+        ----------
+        elapsed : float
+            the time the run took, in seconds
+        failed : bool
+            whether the run raised an error
+        timed_out : bool
+            whether the run was cancelled for taking too long
+        """
+
+        self.count += 1
+        self.errors += int(failed)
+        self.timeouts += int(timed_out)
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self._samples.append(elapsed)
+
+
+    def summary(self) -> dict[str, Any]:
+        """
+        Gets a summary of the timings of the handler.
+
+        Returns
+        -------
+        dict[str, Any]
+            mapping of statistic names to their values, times are in milliseconds
+        """
+
+        return {
+            'count' : self.count,
+            'errors' : self.errors,
+            'timeouts' : self.timeouts,
+            'avg_ms' : round(self.total_time / self.count * 1000, 2) if self.count else 0.0,
+            'p95_ms' : round(percentile(self._samples, 95) * 1000, 2),
+            'max_ms' : round(self.max_time * 1000, 2)
+        }
+
+
+
+class MessagePipeline:
+    """
+    Class that runs the message handlers of every cog for each message the
+    bot receives. Handlers are registered when their cog is added to the bot
+    and unregistered when it is removed, so that each message goes through a
+    single listener, instead of one `on_message` listener per cog.
+
+    Each message is routed to the handlers whose scope it falls in through a
+    `MessageRoutingIndex`, which is rebuilt whenever a cog is registered or
+    unregistered, so most messages are dropped without running any handler.
+
+    The handlers of a message run concurrently, each with its own timeout, so
+    that a slow handler (e.g. one waiting on a REST call) does not hold up
+    the others, and the time until the bot reacts to a message is that of its
+    slowest handler, rather than the sum of them all. Each handler is started
+    eagerly, and only a handler that is still waiting once started is given a
+    timer, and a task group when more than one is.
+    """
+
+    def __init__(self):
+        """
+        Creates an instance of the MessagePipeline class.
+        """
+
+        # cog name -> message handlers of the cog
+        self._handlers : dict[str, list[MessageHandler]] = {}
+        self._routing_index = MessageRoutingIndex([])
+
+        # handler name -> timings of the handler
+        self._timings : dict[str, HandlerTimings] = {}
+        self._messages : int = 0
+        self._unrouted_messages : int = 0
+
+
+    def register_cog(self, cog : Cog) -> None:
+        """
+        Registers the message handlers of a cog.
+
+        Parameters
+        ----------
+        cog : Cog
+            the cog whose methods marked with `message_handler` are registered
+        """
+
+        # method name -> handler options, from the base class up, so that a
+        # method overridden by a subclass is only registered once
+        handler_options : dict[str, MessageHandlerOptions] = {}
+        for cog_class in reversed(type(cog).__mro__):
+            for name, member in vars(cog_class).items():
+                if (options := getattr(member, MESSAGE_HANDLER_ATTRIBUTE, None)) is not None:
+                    handler_options[name] = options
+
+        self._handlers[cog.qualified_name] = [
+            MessageHandler(
+                name=f'{cog.qualified_name}.{name}',
+                callback=getattr(cog, name),
+                options=options
+            )
+            for name, options
+            in handler_options.items()
+        ]
+        self._build_routing_index()
+
+
+    def unregister_cog(self, cog : Cog) -> None:
+        """
+        Unregisters the message handlers of a cog.
+
+        Parameters
+        ----------
+        cog : Cog
+            the cog whose message handlers are unregistered
+        """
+
+        self._handlers.pop(cog.qualified_name, None)
+        self._build_routing_index()
+
+
+    def _build_routing_index(self) -> None:
+        """
+        Rebuilds the routing index from the registered message handlers.
+        """
+
+        self._routing_index = MessageRoutingIndex([
+            handler
+            for cog_handlers
+            in self._handlers.values()
+            for handler
+            in cog_handlers
+        ])
+
+
+    async def dispatch(self, message : Message) -> None:
+        """
+        Runs every registered message handler whose scope a message falls in,
+        concurrently, and waits for all of them to finish.
+
+        Parameters
+        ----------
+        message : Message
+            the message that was sent
+        """
+
+        self._messages += 1
+
+        if not (handlers := self._routing_index.route(message)):
+            self._unrouted_messages += 1
+            return
+
+        context = MessageContext(message)
+
+        # only parses the content of messages that some handler is routed to
+        handlers = [
+            handler
+            for handler
+            in handlers
+            if all(getattr(context, field) for field in handler.options.requires)
+        ]
+
+        if not handlers:
+            self._unrouted_messages += 1
+            return
+
+        # every handler is started eagerly, so one that finishes without
+        # waiting on anything, as most do, never needs a turn of the event loop
+        # or a timer for its timeout
+        loop = asyncio.get_running_loop()
+        pending_handlers : list[tuple[MessageHandler, asyncio.Task, float]] = []
+        for handler in handlers:
+            handler_start = loop.time()
+            handler_task = asyncio.Task(
+                self._run_handler(handler, context),
+                loop=loop,
+                name=f'message handler: {handler.name}',
+                eager_start=True
+            )
+            if not handler_task.done():
+                pending_handlers.append((handler, handler_task, handler_start))
+
+        if not pending_handlers:
+            return
+
+        # a lone handler has nothing to wait alongside, so skip the task group
+        if len(pending_handlers) == 1:
+            await self._wait_for_handler(*pending_handlers[0])
+            return
+
+        async with asyncio.TaskGroup() as task_group:
+            for pending_handler in pending_handlers:
+                task_group.create_task(self._wait_for_handler(*pending_handler))
+
+
+    async def _run_handler(
+        self,
+        handler : MessageHandler,
+        context : MessageContext
+    ) -> None:
+        """
+        Runs a single message handler, and records its timing. An error in the
+        handler is logged rather than raised, so that it never cancels the
+        other handlers of the message. A handler cancelled for running past
+        its timeout is recorded by `_wait_for_handler` instead.
+
+        Parameters
+        ----------
+        handler : MessageHandler
+            the handler to run
+        context : MessageContext
+            the context of the message to handle
+        """
+
+        failed = False
+
+        handler_start = time.perf_counter()
+        try:
+            await handler.callback(context)
+
+        # a timeout raised by the handler itself is an error like any other
+        except Exception as e:
+            failed = True
+            print_petrichor_error(f'Error in message handler {handler.name}: {e!r}')
+
+        self._record_run(handler, time.perf_counter() - handler_start, failed, False)
+
+
+    async def _wait_for_handler(
+        self,
+        handler : MessageHandler,
+        handler_task : asyncio.Task,
+        handler_start : float
+    ) -> None:
+        """
+        Waits for a message handler that is still running to finish, and
+        cancels it once it has run for longer than its timeout.
+
+        Parameters
+        ----------
+        handler : MessageHandler
+            the handler to wait for
+        handler_task : asyncio.Task
+            the task that runs the handler, see `_run_handler`
+        handler_start : float
+            the event loop time from when the handler was started
+        """
+
+        try:
+            async with asyncio.timeout_at(handler_start + handler.options.timeout):
+                await handler_task
+
+        except TimeoutError:
+            print_petrichor_error(
+                f'Message handler {handler.name} timed out after '
+                f'{handler.options.timeout}s'
+            )
+            self._record_run(
+                handler,
+                asyncio.get_running_loop().time() - handler_start,
+                False,
+                True
+            )
+
+
+    def _record_run(
+        self,
+        handler : MessageHandler,
+        elapsed : float,
+        failed : bool,
+        timed_out : bool
+    ) -> None:
+        """
+        Records a single run of a message handler.
+
+        Parameters
+        ----------
+        handler : MessageHandler
+            the handler that was run
+        elapsed : float
+            the time the run took, in seconds
+        failed : bool
+            whether the run raised an error
+        timed_out : bool
+            whether the run was cancelled for taking too long
+        """
+
+        if (timings := self._timings.get(handler.name)) is None:
+            timings = self._timings[handler.name] = HandlerTimings(
+                MESSAGE_HANDLER_SAMPLE_SIZE
+            )
+        timings.record(elapsed, failed, timed_out)
+
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Gets the statistics of the pipeline.
+
+        Returns
+        -------
+        dict[str, Any]
+            mapping of statistic names to their values
+        """
+
+        return {
+            'handlers' : sum(len(handlers) for handlers in self._handlers.values()),
+            'messages' : self._messages,
+            'unrouted_messages' : self._unrouted_messages,
+            'handler_runs' : sum(timings.count for timings in self._timings.values()),
+            'handler_errors' : sum(timings.errors for timings in self._timings.values()),
+            'handler_timeouts' : sum(timings.timeouts for timings in self._timings.values())
+        }
+
+
+    def handler_timings(self) -> dict[str, dict[str, Any]]:
+        """
+        Gets the timings of every message handler that has run.
+
+        Returns
+        -------
+        dict[str, dict[str, Any]]
+            mapping of handler names to the summaries of their timings,
+            ordered from most to least total time
+        """
+
+        return {
+            name : timings.summary()
+            for name, timings
+            in sorted(
+                self._timings.items(),
+                key=lambda handler_timings: handler_timings[1].total_time,
+                reverse=True
+            )
+        }
@@ -0,0 +1,155 @@
+"""message_routing.py
+
+Contains the index that routes each message to the message handlers whose
+scope it falls in.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from discord import Message
+
+    from Petrichor.message_pipeline import MessageHandler
+
+
+
+def _guild_id(message : Message) -> int | None:
+    return message.guild.id if message.guild is not None else None
+
+
+def _channel_id(message : Message) -> int:
+    return message.channel.id
+
+
+def _channel_type(message : Message) -> Any:
+    return message.channel.type
+
+
+def _author_id(message : Message) -> int:
+    return message.author.id
+
+
+def _author_is_bot(message : Message) -> bool:
+    return message.author.bot
+
+
+# handler scope option -> the value of a message that the scope is matched
+# against. A handler without a scope for an option matches every message
+ROUTING_KEYS : dict[str, Callable[[Message], Any]] = {
+    'guild_ids' : _guild_id,
+    'channel_ids' : _channel_id,
+    'channel_types' : _channel_type,
+    'author_ids' : _author_id,
+    'include_bots' : _author_is_bot
+}
+
+
+def _handler_scope(handler : MessageHandler, option : str) -> Iterable[Any] | None:
+    """
+    Gets the values of a message that a handler is scoped to for an option.
+
+    Parameters
+    ----------
+    handler : MessageHandler
+        the handler to get the scope of
+    option : str
+        the scope option, one of `ROUTING_KEYS`
+
+    Returns
+    -------
+    Iterable[Any] | None
+        the values the handler is scoped to, None if it matches any value
+    """
+
+    # a handler that excludes bots is scoped to authors that are not bots
+    if option == 'include_bots':
+        return None if handler.options.include_bots else (False,)
+
+    return getattr(handler.options, option)
+
+
+
+class MessageRoutingIndex:
+    """
+    Class that compiles the scopes that message handlers declare into lookup
+    tables, so that each message is only handed to the handlers that apply to
+    it, without running any handler code to find out.
+
+    Each handler is given a bit. For every scope option, the index holds the
+    bits of the handlers without a scope for it, and, per scoped value, the
+    bits of the handlers scoped to that value. Routing a message is then one
+    dictionary lookup and one bitwise AND per option.
+    """
+
+    def __init__(self, handlers : list[MessageHandler]):
+        """
+        Creates an instance of the MessageRoutingIndex class.
+
+        Parameters
+        ----------
+        handlers : list[MessageHandler]
+            the handlers to route messages to, in the order they are run in
+        """
+
+        self._all_handlers_mask = (1 << len(handlers)) - 1
+
+        # scope option -> bits of the handlers that match any value
+        self._unscoped_masks : dict[str, int] = {}
+        # scope option -> scoped value -> bits of the handlers scoped to it
+        self._scoped_masks : dict[str, dict[Any, int]] = {}
+
+        for option in ROUTING_KEYS:
+            unscoped_mask = 0
+            scoped_masks : dict[Any, int] = {}
+
+            for i, handler in enumerate(handlers):
+                if (scope := _handler_scope(handler, option)) is None:
+                    unscoped_mask |= 1 << i
+                    continue
+
+                for value in scope:
+                    scoped_masks[value] = scoped_masks.get(value, 0) | 1 << i
+
+            self._unscoped_masks[option] = unscoped_mask
+            self._scoped_masks[option] = scoped_masks
+
+        self._handlers = handlers
+        # handler bits -> the handlers, built as combinations are routed to
+        self._handlers_by_mask : dict[int, tuple[MessageHandler, ...]] = {}
+
+
+    def route(self, message : Message) -> tuple[MessageHandler, ...]:
+        """
+        Gets the handlers whose scope a message falls in.
+
+        Parameters
+        ----------
+        message : Message
+            the message to route
+
+        Returns
+        -------
+        tuple[MessageHandler, ...]
+            the handlers of the message, in the order they are run in
+        """
+
+        mask = self._all_handlers_mask
+        for option, routing_key in ROUTING_KEYS.items():
+
+            mask &= self._unscoped_masks[option] \
+                    | self._scoped_masks[option].get(routing_key(message), 0)
+
+            if not mask:
+                return ()
+
+        if (handlers := self._handlers_by_mask.get(mask)) is None:
+            handlers = self._handlers_by_mask[mask] = tuple(
+                handler
+                for i, handler
+                in enumerate(self._handlers)
+                if mask >> i & 1
+            )
+
+        return handlers
@@ -0,0 +1,609 @@
+"""migration_runner.py
+
+Contains a class that applies the versioned database schema migrations.
+"""
+from __future__ import annotations
+
+import datetime
+import json
+import re
+from pathlib import Path
+from typing import NamedTuple
+
+from util.printing import print_petrichor_msg, print_petrichor_error
+
+from typing import TYPE_CHECKING, Any
+if TYPE_CHECKING:
+    from asyncpg import Connection
+
+    from util.db_connection_manager import DatabaseConnectionManager
+
+
+MIGRATIONS_DIR = Path(__file__).parent / 'migrations'
+EXPLAIN_DIRECTIVE = '-- explain:'
+
+SCHEMA_MIGRATIONS_TABLE_SCRIPT = (
+    'CREATE TABLE IF NOT EXISTS schema_migrations('
+    'version INTEGER PRIMARY KEY, '
+    'name TEXT, '
+    'applied_at TIMESTAMPTZ, '
+    'explain_timings JSONB'
+    ');'
+)
+
+# SQL type name -> the data type that information_schema reports for it
+SQL_DATA_TYPES : dict[str, str] = {
+    'smallint' : 'smallint',
+    'int' : 'integer',
+    'integer' : 'integer',
+    'bigint' : 'bigint',
+    'text' : 'text',
+    'varchar' : 'character varying',
+    'boolean' : 'boolean',
+    'timestamptz' : 'timestamp with time zone',
+    'jsonb' : 'jsonb'
+}
+
+# words that end the data type of a column definition
+COLUMN_CONSTRAINT_WORDS = frozenset({
+    'primary', 'references', 'not', 'null', 'default',
+    'generated', 'unique', 'check', 'constraint', 'using'
+})
+
+# words that start a table constraint, rather than a column definition
+TABLE_CONSTRAINT_WORDS = frozenset({
+    'primary', 'foreign', 'unique', 'check', 'constraint', 'exclude'
+})
+
+CREATE_TABLE_PATTERN = re.compile(
+    r'create table (?:if not exists )?(\w+)\s*\((.*)\)$',
+    re.IGNORECASE | re.DOTALL
+)
+ALTER_TABLE_PATTERN = re.compile(
+    r'alter table (?:if exists )?(?:only )?(\w+)\s+(.*)$',
+    re.IGNORECASE | re.DOTALL
+)
+DROP_TABLE_PATTERN = re.compile(
+    r'drop table (?:if exists )?(\w+)',
+    re.IGNORECASE
+)
+
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    script: str
+    explain_queries: list[str]
+
+
+
+class TableSchema(NamedTuple):
+    # insertable column name -> data type, in column order
+    columns: dict[str, str]
+    primary_key: tuple[str, ...]
+    # column name -> default value, for the columns with a literal default
+    defaults: dict[str, Any]
+
+
+
+def load_migrations(migrations_dir : Path = MIGRATIONS_DIR) -> list[Migration]:
+    """
+    Loads the migration files from a migrations directory.
+
+    Parameters
+    ----------
+    migrations_dir : Path, default = MIGRATIONS_DIR
+        the directory that holds the migration files
+
+    Returns
+    -------
+    list[Migration]
+        the migrations, in version order
+    """
+
+    migrations : list[Migration] = []
+    for migration_file in migrations_dir.glob('*.sql'):
+
+        version, name = migration_file.stem.split('_', maxsplit=1)
+        script = migration_file.read_text(encoding='utf-8')
+
+        migrations.append(Migration(
+            version=int(version),
+            name=name,
+            script=script,
+            explain_queries=[
+                line.removeprefix(EXPLAIN_DIRECTIVE).strip()
+                for line
+                in script.splitlines()
+                if line.startswith(EXPLAIN_DIRECTIVE)
+            ]
+        ))
+
+    return sorted(migrations, key=lambda migration: migration.version)
+
+
+def load_schema(migrations_dir : Path = MIGRATIONS_DIR) -> dict[str, TableSchema]:
+    """
+    Works out the table definitions that applying every migration results
+    in, along with the `schema_migrations` table, without a database. Only
+    the statements that define tables are read, i.e. CREATE TABLE, DROP
+    TABLE, and the ADD, DROP and ALTER COLUMN actions of ALTER TABLE.
+    Identity columns are left out, as rows are never inserted into them.
+
+    Parameters
+    ----------
+    migrations_dir : Path, default = MIGRATIONS_DIR
+        the directory that holds the migration files
+
+    Returns
+    -------
+    dict[str, TableSchema]
+        mapping of the table names to their definitions
+    """
+
+    schema : dict[str, TableSchema] = {}
+
+    scripts = [SCHEMA_MIGRATIONS_TABLE_SCRIPT]
+    scripts.extend(migration.script for migration in load_migrations(migrations_dir))
+
+    for script in scripts:
+        for statement in _split_sql(_strip_sql_comments(script), ';'):
+
+            if create_table := CREATE_TABLE_PATTERN.match(statement):
+                table_name, table_body = create_table.groups()
+                schema.setdefault(table_name.lower(), _parse_table_body(table_body))
+
+            elif alter_table := ALTER_TABLE_PATTERN.match(statement):
+                table_name, actions = alter_table.groups()
+                if (table_schema := schema.get(table_name.lower())) is not None:
+                    for action in _split_sql(actions, ','):
+                        _apply_alter_action(table_schema, action)
+
+            elif drop_table := DROP_TABLE_PATTERN.match(statement):
+                schema.pop(drop_table.group(1).lower(), None)
+
+    return schema
+
+
+def _strip_sql_comments(script : str) -> str:
+    """
+    Removes the `--` comments from a SQL script.
+
+    Parameters
+    ----------
+    script : str
+        the SQL script
+
+    Returns
+    -------
+    str
+        the script without comments
+    """
+
+    return '\n'.join(line.split('--', maxsplit=1)[0] for line in script.splitlines())
+
+
+def _split_sql(sql : str, separator : str) -> list[str]:
+    """
+    Splits SQL on a separator, ignoring separators inside parentheses.
+
+    Parameters
+    ----------
+    sql : str
+        the SQL to split
+    separator : str
+        the separator, e.g. `;` between statements or `,` between columns
+
+    Returns
+    -------
+    list[str]
+        the non-empty parts, with their whitespace collapsed
+    """
+
+    parts : list[str] = []
+    depth = 0
+    part_start = 0
+    for i, char in enumerate(sql):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(sql[part_start:i])
+            part_start = i + 1
+
+    parts.append(sql[part_start:])
+
+    return [
+        ' '.join(part.split())
+        for part
+        in parts
+        if part.strip()
+    ]
+
+
+def _parse_column(definition : str) -> tuple[str, str, dict[str, Any]]:
+    """
+    Parses a column definition, e.g. `pinger_count INTEGER NOT NULL DEFAULT 0`.
+
+    Parameters
+    ----------
+    definition : str
+        the column definition
+
+    Returns
+    -------
+    tuple[str, str, dict[str, Any]]
+        the column name, its data type, and its constraints, of which
+        `primary_key`, `identity` and `default` are read
+    """
+
+    words = definition.split()
+    column_name = words[0].lower()
+
+    type_words : list[str] = []
+    for word in words[1:]:
+        if word.lower() in COLUMN_CONSTRAINT_WORDS:
+            break
+        type_words.append(word)
+
+    lowered_words = [word.lower() for word in words]
+    constraints : dict[str, Any] = {
+        'primary_key' : 'primary' in lowered_words,
+        'identity' : 'generated' in lowered_words
+    }
+
+    if 'default' in lowered_words:
+        default = words[lowered_words.index('default') + 1]
+        # only literal defaults can be worked out without a database
+        if re.fullmatch(r'-?\d+', default):
+            constraints['default'] = int(default)
+        elif default.lower() in ('true', 'false'):
+            constraints['default'] = default.lower() == 'true'
+
+    return column_name, _normalize_data_type(' '.join(type_words)), constraints
+
+
+def _normalize_data_type(data_type : str) -> str:
+    """
+    Gets the name that information_schema reports for a SQL data type.
+
+    Parameters
+    ----------
+    data_type : str
+        the data type, as written in a migration, e.g. `VARCHAR(20)`
+
+    Returns
+    -------
+    str
+        the data type, e.g. `character varying`
+    """
+
+    base_type = data_type.split('(', maxsplit=1)[0].strip().lower()
+    return SQL_DATA_TYPES.get(base_type, base_type)
+
+
+def _parse_table_body(table_body : str) -> TableSchema:
+    """
+    Parses the column and constraint definitions of a CREATE TABLE statement.
+
+    Parameters
+    ----------
+    table_body : str
+        the definitions between the parentheses of the statement
+
+    Returns
+    -------
+    TableSchema
+        the definition of the table
+    """
+
+    table_schema = TableSchema(columns={}, primary_key=(), defaults={})
+
+    for definition in _split_sql(table_body, ','):
+
+        if definition.split()[0].lower() in TABLE_CONSTRAINT_WORDS:
+            if primary_key := re.match(r'primary key\s*\((.*)\)', definition, re.IGNORECASE):
+                table_schema = table_schema._replace(primary_key=tuple(
+                    column_name.strip().lower()
+                    for column_name
+                    in primary_key.group(1).split(',')
+                ))
+            continue
+
+        table_schema = _add_column(table_schema, definition)
+
+    return table_schema
+
+
+def _add_column(table_schema : TableSchema, definition : str) -> TableSchema:
+    """
+    Adds a column to a table definition, unless it is an identity column.
+
+    Parameters
+    ----------
+    table_schema : TableSchema
+        the definition of the table
+    definition : str
+        the column definition
+
+    Returns
+    -------
+    TableSchema
+        the definition of the table, with the column
+    """
+
+    column_name, data_type, constraints = _parse_column(definition)
+    if constraints['identity']:
+        return table_schema
+
+    table_schema.columns[column_name] = data_type
+    if 'default' in constraints:
+        table_schema.defaults[column_name] = constraints['default']
+
+    if constraints['primary_key']:
+        return table_schema._replace(primary_key=(column_name,))
+
+    return table_schema
+
+
+def _apply_alter_action(table_schema : TableSchema, action : str) -> None:
+    """
+    Applies an ADD, DROP or ALTER COLUMN action of an ALTER TABLE statement to
+    a table definition. Constraint actions are ignored.
+
+    Parameters
+    ----------
+    table_schema : TableSchema
+        the definition of the table, updated in place
+    action : str
+        the action, e.g. `ALTER COLUMN user_id TYPE BIGINT USING user_id::BIGINT`
+    """
+
+    words = action.split()
+    lowered_words = [word.lower() for word in words]
+
+    if lowered_words[:2] == ['alter', 'column'] and 'type' in lowered_words:
+        column_name = words[2].lower()
+        if column_name in table_schema.columns:
+            column_definition = ' '.join(words[lowered_words.index('type'):])
+            table_schema.columns[column_name] = _parse_column(column_definition)[1]
+
+    elif lowered_words[0] in ('add', 'drop') \
+         and lowered_words[1] not in TABLE_CONSTRAINT_WORDS:
+        column_words = words[1:]
+        if column_words[0].lower() == 'column':
+            column_words = column_words[1:]
+        while column_words[0].lower() in ('if', 'not', 'exists'):
+            column_words = column_words[1:]
+
+        if lowered_words[0] == 'add':
+            _add_column(table_schema, ' '.join(column_words))
+        else:
+            table_schema.columns.pop(column_words[0].lower(), None)
+            table_schema.defaults.pop(column_words[0].lower(), None)
+
+
+
+class MigrationError(Exception):
+    """
+    Raised when a migration could not be applied.
+    """
+
+
+
+class MigrationRunner:
+    """
+    Class that applies the versioned SQL migrations in the migrations
+    directory that have not been applied to the database yet.
+
+    Migrations are named `<version>_<name>.sql`, and are applied in version
+    order, each in its own transaction along with its record in the
+    `schema_migrations` table. A migration may list queries to benchmark in
+    `-- explain: <query>` comments, which are run with EXPLAIN ANALYZE before
+    and after the migration, and whose timings are recorded with it.
+
+    Attributes
+    ----------
+    db : DatabaseConnectionManager
+        the database connection to apply the migrations with
+    migrations_dir : Path
+        the directory that holds the migration files
+    """
+
+    def __init__(
+        self,
+        db : DatabaseConnectionManager,
+        migrations_dir : Path = MIGRATIONS_DIR
+    ):
+        """
+        Creates an instance of the MigrationRunner class.
+
+        Parameters
+        ----------
+        db : DatabaseConnectionManager
+            the database connection to apply the migrations with
+        migrations_dir : Path, default = MIGRATIONS_DIR
+            the directory that holds the migration files
+        """
+        self.db = db
+        self.migrations_dir = migrations_dir
+
+
+    async def run(self) -> list[Migration]:
+        """
+        Applies every migration that has not been applied yet. Stops at the
+        first migration that fails, so that later migrations never run on top
+        of a missing one.
+
+        Returns
+        -------
+        list[Migration]
+            the migrations that were applied
+        """
+
+        await self._create_migrations_table()
+
+        applied_versions = await self._get_applied_versions()
+        if applied_versions is None:
+            print_petrichor_error('Could not fetch the applied migrations')
+            return []
+
+        pending_migrations = [
+            migration
+            for migration
+            in load_migrations(self.migrations_dir)
+            if migration.version not in applied_versions
+        ]
+
+        if not pending_migrations:
+            print_petrichor_msg('Database schema is up to date')
+            return []
+
+        applied_migrations : list[Migration] = []
+        for migration in pending_migrations:
+            try:
+                await self._apply_migration(migration)
+            except MigrationError as e:
+                print_petrichor_error(str(e))
+                break
+
+            applied_migrations.append(migration)
+
+        return applied_migrations
+
+
+    async def _create_migrations_table(self) -> None:
+        """
+        Creates the table that records the applied migrations, if needed.
+        """
+
+        await self.db.run_script(SCHEMA_MIGRATIONS_TABLE_SCRIPT)
+
+
+    async def _get_applied_versions(self) -> set[int] | None:
+        """
+        Gets the versions of the migrations that have already been applied.
+
+        Returns
+        -------
+        set[int]
+            the applied migration versions |
+            None, if there was an error fetching the versions
+        """
+
+        rows = await self.db.fetch_rows(
+            table_name='schema_migrations',
+            columns='version'
+        )
+
+        if rows is None:
+            return None
+
+        return {row['version'] for row in rows}
+
+
+    async def _apply_migration(self, migration : Migration) -> None:
+        """
+        Applies a single migration and records it, in one transaction.
+
+        Parameters
+        ----------
+        migration : Migration
+            the migration to apply
+
+        Raises
+        ------
+        MigrationError
+            if the migration could not be applied, in which case none of it
+            is applied
+        """
+
+        print_petrichor_msg(
+            f'Applying migration {migration.version:04}: {migration.name}'
+        )
+
+        explain_before = await self._explain_queries(migration.explain_queries)
+
+        try:
+            async with self.db.transaction() as conn:
+
+                if not await self.db.run_script(migration.script, conn=conn):
+                    raise MigrationError(
+                        f'Migration {migration.version:04} failed, rolled back'
+                    )
+
+                # explained in the transaction, so the migration's changes apply
+                explain_after = await self._explain_queries(
+                    migration.explain_queries,
+                    conn=conn
+                )
+
+                explain_timings = [
+                    {
+                        'query' : query,
+                        'before' : explain_before[query],
+                        'after' : explain_after[query]
+                    }
+                    for query
+                    in migration.explain_queries
+                ]
+
+                recorded_successfully = await self.db.insert_row(
+                    table_name='schema_migrations',
+                    record_info=[
+                        migration.version,
+                        migration.name,
+                        datetime.datetime.now(datetime.timezone.utc),
+                        json.dumps(explain_timings)
+                    ],
+                    conn=conn
+                )
+
+                if not recorded_successfully:
+                    raise MigrationError(
+                        f'Migration {migration.version:04} could not be '
+                        'recorded, rolled back'
+                    )
+
+        finally:
+            # the migration may have changed table definitions either way
+            self.db.invalidate_table_column_cache()
+
+        print_petrichor_msg(f'Applied migration {migration.version:04}')
+        for explain_timing in explain_timings:
+            print_petrichor_msg(
+                f'  {explain_timing['query']}\n'
+                f'    before: {explain_timing['before']}\n'
+                f'    after:  {explain_timing['after']}'
+            )
+
+
+    async def _explain_queries(
+        self,
+        queries : list[str],
+        conn : Connection = None
+    ) -> dict[str, dict[str, float] | None]:
+        """
+        Gets the EXPLAIN ANALYZE timings of the given queries.
+
+        Parameters
+        ----------
+        queries : list[str]
+            the queries to explain
+        conn : Connection, default = None
+            the connection to run the queries on
+
+        Returns
+        -------
+        dict[str, dict[str, float] | None]
+            mapping of the queries to their timings, None for the queries
+            that could not be explained
+        """
+
+        return {
+            query : await self.db.explain_analyze(query, conn=conn)
+            for query
+            in queries
+        }
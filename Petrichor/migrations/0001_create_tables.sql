@@ -0,0 +1,57 @@
+-- Creates the tables documented in docs/database_schema/README.md.
+-- Databases that were set up by hand before migrations existed already have
+-- these tables, so this migration is a no-op for them.
+
+CREATE TABLE IF NOT EXISTS users(
+    user_id VARCHAR(20) PRIMARY KEY,
+    username TEXT
+);
+
+CREATE TABLE IF NOT EXISTS roll_the_pings(
+    message_id VARCHAR(20) PRIMARY KEY,
+    pinger_id VARCHAR(20) REFERENCES users(user_id),
+    pingee_id VARCHAR(20) REFERENCES users(user_id),
+    guild_id VARCHAR(20),
+    ping_time TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS vc_euohs(
+    vc_euoh_id INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    recipient_id VARCHAR(20) REFERENCES users(user_id),
+    euoh_type TEXT,
+    reporter_id VARCHAR(20) REFERENCES users(user_id),
+    guild_id VARCHAR(20),
+    ping_time TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS apex_euohs(
+    apex_euoh_id INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    recipient_id VARCHAR(20) REFERENCES users(user_id),
+    euoh_type TEXT,
+    reporter_id VARCHAR(20) REFERENCES users(user_id),
+    guild_id VARCHAR(20),
+    ping_time TIMESTAMPTZ,
+    evidence_link TEXT
+);
+
+CREATE TABLE IF NOT EXISTS kaeley_side_eyes(
+    side_eye_id INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    guild_id VARCHAR(20),
+    channel_id VARCHAR(20),
+    message_id VARCHAR(20),
+    emoji_id VARCHAR(20),
+    media_type BOOLEAN,
+    message_type BOOLEAN,
+    message_time TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS boys_who_cried(
+    cry_id INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    guild_id VARCHAR(20),
+    channel_id VARCHAR(20),
+    message_id VARCHAR(20),
+    user_id VARCHAR(20),
+    message_type BOOLEAN,
+    message_time TIMESTAMPTZ,
+    true_react BOOLEAN
+);
@@ -0,0 +1,36 @@
+-- Adds composite indexes for the columns that every command filters by,
+-- ordered to match the WHERE/GROUP BY/ORDER BY of the queries run by
+-- RollThePingCog, EuohCog, ValCog and BoysWhoCried.
+
+-- explain: SELECT COUNT(*) AS pings, pinger_id FROM roll_the_pings WHERE guild_id = (SELECT guild_id FROM roll_the_pings LIMIT 1) GROUP BY pinger_id ORDER BY pings DESC
+-- explain: SELECT COUNT(*) AS pings, pingee_id FROM roll_the_pings WHERE guild_id = (SELECT guild_id FROM roll_the_pings LIMIT 1) GROUP BY pingee_id ORDER BY pings DESC
+-- explain: SELECT COUNT(*) AS euoh_count, euoh_type FROM vc_euohs WHERE guild_id = (SELECT guild_id FROM vc_euohs LIMIT 1) AND recipient_id = (SELECT recipient_id FROM vc_euohs LIMIT 1) GROUP BY euoh_type
+-- explain: SELECT COUNT(*) AS euoh_count, euoh_type FROM apex_euohs WHERE guild_id = (SELECT guild_id FROM apex_euohs LIMIT 1) AND recipient_id = (SELECT recipient_id FROM apex_euohs LIMIT 1) GROUP BY euoh_type
+-- explain: SELECT * FROM kaeley_side_eyes WHERE guild_id = (SELECT guild_id FROM kaeley_side_eyes LIMIT 1) ORDER BY message_time DESC LIMIT 1
+-- explain: SELECT COUNT(*) AS cries, user_id FROM boys_who_cried WHERE guild_id = (SELECT guild_id FROM boys_who_cried LIMIT 1) GROUP BY user_id ORDER BY cries DESC
+
+-- /ping-counts perpetrator|victim
+CREATE INDEX IF NOT EXISTS roll_the_pings_guild_pinger_idx
+    ON roll_the_pings (guild_id, pinger_id);
+CREATE INDEX IF NOT EXISTS roll_the_pings_guild_pingee_idx
+    ON roll_the_pings (guild_id, pingee_id);
+
+-- /euoh vc|apex get, /euoh apex list
+CREATE INDEX IF NOT EXISTS vc_euohs_guild_recipient_type_idx
+    ON vc_euohs (guild_id, recipient_id, euoh_type);
+CREATE INDEX IF NOT EXISTS apex_euohs_guild_recipient_type_idx
+    ON apex_euohs (guild_id, recipient_id, euoh_type);
+
+-- /kaeley commands
+CREATE INDEX IF NOT EXISTS kaeley_side_eyes_guild_time_idx
+    ON kaeley_side_eyes (guild_id, message_time);
+
+-- /the-boy-who-cried-israel
+CREATE INDEX IF NOT EXISTS boys_who_cried_guild_user_idx
+    ON boys_who_cried (guild_id, user_id);
+
+ANALYZE roll_the_pings;
+ANALYZE vc_euohs;
+ANALYZE apex_euohs;
+ANALYZE kaeley_side_eyes;
+ANALYZE boys_who_cried;
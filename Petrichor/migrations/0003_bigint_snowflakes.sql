@@ -0,0 +1,76 @@
+-- Changes every Discord snowflake column from VARCHAR(20) to BIGINT, so ids
+-- are compared as integers and bound/returned as python ints. The foreign
+-- keys to users(user_id) are dropped and re-added around the type change,
+-- since a foreign key can't span two column types. Indexes on the changed
+-- columns are rebuilt by the ALTERs.
+
+-- explain: SELECT COUNT(*) AS pings, pinger_id FROM roll_the_pings WHERE guild_id = (SELECT guild_id FROM roll_the_pings LIMIT 1) GROUP BY pinger_id ORDER BY pings DESC
+-- explain: SELECT COUNT(*) AS pings, pingee_id FROM roll_the_pings WHERE guild_id = (SELECT guild_id FROM roll_the_pings LIMIT 1) GROUP BY pingee_id ORDER BY pings DESC
+-- explain: SELECT COUNT(*) AS euoh_count, euoh_type FROM vc_euohs WHERE guild_id = (SELECT guild_id FROM vc_euohs LIMIT 1) AND recipient_id = (SELECT recipient_id FROM vc_euohs LIMIT 1) GROUP BY euoh_type
+-- explain: SELECT COUNT(*) AS euoh_count, euoh_type FROM apex_euohs WHERE guild_id = (SELECT guild_id FROM apex_euohs LIMIT 1) AND recipient_id = (SELECT recipient_id FROM apex_euohs LIMIT 1) GROUP BY euoh_type
+-- explain: SELECT * FROM kaeley_side_eyes WHERE guild_id = (SELECT guild_id FROM kaeley_side_eyes LIMIT 1) ORDER BY message_time DESC LIMIT 1
+-- explain: SELECT COUNT(*) AS cries, user_id FROM boys_who_cried WHERE guild_id = (SELECT guild_id FROM boys_who_cried LIMIT 1) GROUP BY user_id ORDER BY cries DESC
+
+ALTER TABLE roll_the_pings
+    DROP CONSTRAINT IF EXISTS roll_the_pings_pinger_id_fkey,
+    DROP CONSTRAINT IF EXISTS roll_the_pings_pingee_id_fkey;
+ALTER TABLE vc_euohs
+    DROP CONSTRAINT IF EXISTS vc_euohs_recipient_id_fkey,
+    DROP CONSTRAINT IF EXISTS vc_euohs_reporter_id_fkey;
+ALTER TABLE apex_euohs
+    DROP CONSTRAINT IF EXISTS apex_euohs_recipient_id_fkey,
+    DROP CONSTRAINT IF EXISTS apex_euohs_reporter_id_fkey;
+
+ALTER TABLE users
+    ALTER COLUMN user_id TYPE BIGINT USING user_id::BIGINT;
+
+ALTER TABLE roll_the_pings
+    ALTER COLUMN message_id TYPE BIGINT USING message_id::BIGINT,
+    ALTER COLUMN pinger_id TYPE BIGINT USING pinger_id::BIGINT,
+    ALTER COLUMN pingee_id TYPE BIGINT USING pingee_id::BIGINT,
+    ALTER COLUMN guild_id TYPE BIGINT USING guild_id::BIGINT;
+
+ALTER TABLE vc_euohs
+    ALTER COLUMN recipient_id TYPE BIGINT USING recipient_id::BIGINT,
+    ALTER COLUMN reporter_id TYPE BIGINT USING reporter_id::BIGINT,
+    ALTER COLUMN guild_id TYPE BIGINT USING guild_id::BIGINT;
+
+ALTER TABLE apex_euohs
+    ALTER COLUMN recipient_id TYPE BIGINT USING recipient_id::BIGINT,
+    ALTER COLUMN reporter_id TYPE BIGINT USING reporter_id::BIGINT,
+    ALTER COLUMN guild_id TYPE BIGINT USING guild_id::BIGINT;
+
+ALTER TABLE kaeley_side_eyes
+    ALTER COLUMN guild_id TYPE BIGINT USING guild_id::BIGINT,
+    ALTER COLUMN channel_id TYPE BIGINT USING channel_id::BIGINT,
+    ALTER COLUMN message_id TYPE BIGINT USING message_id::BIGINT,
+    ALTER COLUMN emoji_id TYPE BIGINT USING emoji_id::BIGINT;
+
+ALTER TABLE boys_who_cried
+    ALTER COLUMN guild_id TYPE BIGINT USING guild_id::BIGINT,
+    ALTER COLUMN channel_id TYPE BIGINT USING channel_id::BIGINT,
+    ALTER COLUMN message_id TYPE BIGINT USING message_id::BIGINT,
+    ALTER COLUMN user_id TYPE BIGINT USING user_id::BIGINT;
+
+ALTER TABLE roll_the_pings
+    ADD CONSTRAINT roll_the_pings_pinger_id_fkey
+        FOREIGN KEY (pinger_id) REFERENCES users(user_id),
+    ADD CONSTRAINT roll_the_pings_pingee_id_fkey
+        FOREIGN KEY (pingee_id) REFERENCES users(user_id);
+ALTER TABLE vc_euohs
+    ADD CONSTRAINT vc_euohs_recipient_id_fkey
+        FOREIGN KEY (recipient_id) REFERENCES users(user_id),
+    ADD CONSTRAINT vc_euohs_reporter_id_fkey
+        FOREIGN KEY (reporter_id) REFERENCES users(user_id);
+ALTER TABLE apex_euohs
+    ADD CONSTRAINT apex_euohs_recipient_id_fkey
+        FOREIGN KEY (recipient_id) REFERENCES users(user_id),
+    ADD CONSTRAINT apex_euohs_reporter_id_fkey
+        FOREIGN KEY (reporter_id) REFERENCES users(user_id);
+
+ANALYZE users;
+ANALYZE roll_the_pings;
+ANALYZE vc_euohs;
+ANALYZE apex_euohs;
+ANALYZE kaeley_side_eyes;
+ANALYZE boys_who_cried;
@@ -0,0 +1,34 @@
+-- Adds a summary table of the /rtp ping counts of every user, per guild, so
+-- that the /ping-counts rankings read one row per member, rather than
+-- aggregating the whole roll_the_pings history. It is kept up to date by
+-- RollThePingCog as pings are recorded, and is populated from the existing
+-- history here.
+
+CREATE TABLE IF NOT EXISTS roll_the_ping_counts(
+    guild_id BIGINT,
+    user_id BIGINT REFERENCES users(user_id),
+    pinger_count INTEGER NOT NULL DEFAULT 0,
+    victim_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id)
+);
+
+-- /ping-counts perpetrator|victim
+CREATE INDEX IF NOT EXISTS roll_the_ping_counts_guild_pinger_count_idx
+    ON roll_the_ping_counts (guild_id, pinger_count);
+CREATE INDEX IF NOT EXISTS roll_the_ping_counts_guild_victim_count_idx
+    ON roll_the_ping_counts (guild_id, victim_count);
+
+INSERT INTO roll_the_ping_counts (guild_id, user_id, pinger_count, victim_count)
+SELECT guild_id, user_id, SUM(pinger_count), SUM(victim_count)
+FROM (
+    SELECT guild_id, pinger_id AS user_id, 1 AS pinger_count, 0 AS victim_count
+    FROM roll_the_pings
+    UNION ALL
+    SELECT guild_id, pingee_id AS user_id, 0 AS pinger_count, 1 AS victim_count
+    FROM roll_the_pings
+) AS pings
+WHERE user_id IS NOT NULL
+GROUP BY guild_id, user_id
+ON CONFLICT (guild_id, user_id) DO NOTHING;
+
+ANALYZE roll_the_ping_counts;
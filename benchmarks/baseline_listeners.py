@@ -0,0 +1,361 @@
+"""baseline_listeners.py
+
+Contains the per-cog `on_message` listeners that the message pipeline
+replaced, to benchmark the pipeline against.
+"""
+from __future__ import annotations
+
+import re
+
+from discord import VoiceChannel
+from discord.ext import commands
+
+from util.env_vars import get_id
+from util.printing import print_petrichor_msg, print_petrichor_error
+from Petrichor.cogs.val import VAL_ID, SIDE_EYE_EMOTE_IDS, SIDE_EYE_STICKER_IDS
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from discord import Message, StickerItem
+
+    from Petrichor.PetrichorBot import PetrichorBot
+    from Petrichor.cogs.event_handlers import EventHandlersCog
+
+
+
+class BaselineListeners:
+    """
+    Class that holds the `on_message` listeners of EventHandlersCog,
+    BoysWhoCried and ValCog as they were before the message pipeline, along
+    with the default `Bot.on_message`. The message handling code is copied
+    unchanged from the cogs, so that the pipeline is measured against the
+    code it replaced, rather than against its own handlers. The helpers that
+    the pipeline did not change, e.g. `respond_to_user`, are called on the
+    current cogs.
+
+    Attributes
+    ----------
+    bot : PetrichorBot
+        bot that the listeners belong to
+    event_handlers_cog : EventHandlersCog
+        cog whose unchanged helpers the listeners call
+    """
+
+    def __init__(
+        self,
+        bot : PetrichorBot,
+        event_handlers_cog : EventHandlersCog
+    ):
+        """
+        Creates an instance of the BaselineListeners class.
+
+        Parameters
+        ----------
+        bot : PetrichorBot
+            bot that the listeners belong to
+        event_handlers_cog : EventHandlersCog
+            cog whose unchanged helpers the listeners call
+        """
+
+        self.bot = bot
+        self.event_handlers_cog = event_handlers_cog
+
+
+    @property
+    def listeners(self) -> list[Callable[[Message], Awaitable[None]]]:
+        """
+        The listeners that were run for every message, each of which
+        `Client.dispatch` ran as its own task.
+        """
+
+        return [
+            self.bot_on_message,
+            self.event_handlers_on_message,
+            self.boys_who_cried_on_message,
+            self.val_on_message
+        ]
+
+
+    async def bot_on_message(self, message : Message) -> None:
+        await commands.Bot.on_message(self.bot, message)
+
+
+
+    ##############################################################
+    #######                                                #######
+    ###                    EventHandlersCog                    ###
+    #######                                                #######
+    ##############################################################
+
+    async def event_handlers_on_message(self, message : Message) -> None:
+
+        # preserve the ability to react to bots
+        await self.igh_bro(message)
+
+        if message.author.bot:
+            return
+
+        await self.repost_game_clips(message)
+        await self.ping_vc(message)
+        await self.update_twitter_link(message)
+
+        await self.bot.process_commands(message)
+
+
+    async def igh_bro(self, message : Message):
+
+        if message.channel.id != get_id('KNS_GAME_UPDATES'):
+            return
+
+        if message.author.id in (get_id('PETRICHOR_ID'), get_id('PETRICHOR_TESTING_ID')):
+            return
+
+        await self.event_handlers_cog.respond_to_user(message=message, response='igh bro')
+        return
+
+
+    def _link_in_message(self, message : Message) -> bool:
+        return 'https://' in message.content or len(message.embeds) > 0
+
+
+    def _get_links_from_message(
+        self,
+        message : Message,
+        domains : list[str] | None = None
+    ) -> list[str]:
+
+        if not domains:
+            return [
+                term
+                for term
+                in message.content.split(" ")
+                if term.startswith("https://")
+            ]
+
+        return [
+            term
+            for term
+            in message.content.split(" ")
+            if term.startswith("https://")
+            and any(term.startswith(domain) for domain in domains)
+        ]
+
+
+    def _get_twitter_links(self, message : Message) -> list[str]:
+
+        return self._get_links_from_message(
+            message=message,
+            domains=[
+                'https://twitter.com',
+                'https://x.com',
+            ]
+        )
+
+
+    async def update_twitter_link(self, message : Message) -> None:
+
+        if not self._link_in_message(message):
+            return
+
+        twitter_links_in_message = self._get_twitter_links(message)
+
+        if not twitter_links_in_message:
+            return
+
+        new_links : list[str] = [
+            "https://fxtwitter.com" + link[link.index(".com") + 4:]
+            for link
+            in twitter_links_in_message
+        ]
+
+        # suppress the original message to remove unnecessary duplicated embed
+        await message.edit(
+            suppress=True
+        )
+
+        await message.reply(
+            content="\n".join(new_links),
+            mention_author=False
+        )
+
+
+    async def repost_game_clips(self, message : Message) -> None:
+
+        if message.guild.id != get_id('FANTA_ID'):
+            return
+
+        if 'clips' not in message.channel.name:
+            return
+
+        if '!keep' in message.content:
+            return
+
+        text_to_send = self.event_handlers_cog._replace_name_with_id(message.content)
+
+        await self.event_handlers_cog.repost_to_channel(text_to_send)
+
+
+    async def ping_vc(self, message : Message) -> None:
+
+        if not isinstance(message.channel, VoiceChannel):
+            return
+
+        if '@vc' not in message.content.lower():
+            return
+
+        members_in_vc = message.channel.members
+        if not members_in_vc:
+            await message.reply(
+                content=(
+                    'Voice channel is empty, "@vc" command only works '
+                    'when there are people in the voice channel.'
+                ),
+                mention_author=True
+            )
+            return
+
+        mentions = ' '.join(member.mention for member in members_in_vc)
+
+        await message.reply(
+            content=message.content.replace("@vc", mentions),
+            mention_author=False
+        )
+
+
+
+    ##############################################################
+    #######                                                #######
+    ###                      BoysWhoCried                      ###
+    #######                                                #######
+    ##############################################################
+
+    async def boys_who_cried_on_message(self, message : Message) -> None:
+
+        await self.check_for_israel_flag(message)
+
+        await self.bot.process_commands(message)
+
+
+    async def check_for_israel_flag(self, message : Message) -> None:
+
+        any_flag_in_msg = self._general_flag_emoji_in_message(message.content)
+
+        if not any_flag_in_msg:
+            return
+
+        israel_flag_in_msg = self._israel_flag_emoji_in_message(message.content)
+
+        inserted_successfully = self.bot.db.enqueue_row(
+            table_name='boys_who_cried',
+            record_info=[
+                message.guild.id,
+                message.channel.id,
+                message.id,
+                message.author.id,
+                True,
+                message.created_at,
+                israel_flag_in_msg
+            ]
+        )
+
+        if not inserted_successfully:
+            print_petrichor_error('Failed to log flag emoji message.')
+            return
+
+        print_petrichor_msg(
+            f'Logged {'israel ' if israel_flag_in_msg else ''}flag emoji message from user {message.author.display_name}.'
+        )
+
+
+    def _israel_flag_emoji_in_message(self, message : str) -> bool:
+        return '\U0001F1EE\U0001F1F1' in str(message)
+
+
+    def _general_flag_emoji_in_message(self, message : str) -> bool:
+        return 'flag' in str(message)
+
+
+
+    ##############################################################
+    #######                                                #######
+    ###                         ValCog                         ###
+    #######                                                #######
+    ##############################################################
+
+    async def val_on_message(self, message : Message) -> None:
+
+        await self.check_for_side_eye(message)
+
+        await self.bot.process_commands(message)
+
+
+    async def check_for_side_eye(self, message : Message) -> None:
+
+        if message.author.id != VAL_ID:
+            return
+
+        side_eye_emoji_id = self._side_eye_emoji_in_message(message.content)
+        side_eye_sticker_id = self._side_eye_sticker_in_message(message)
+
+        if not side_eye_emoji_id and not side_eye_sticker_id:
+            return
+
+        if side_eye_emoji_id:
+            inserted_successfully = self.bot.db.enqueue_row(
+                table_name='kaeley_side_eyes',
+                record_info=[
+                    message.guild.id,
+                    message.channel.id,
+                    message.id,
+                    side_eye_emoji_id,
+                    True,
+                    True,
+                    message.created_at
+                ]
+            )
+        else:
+            inserted_successfully = self.bot.db.enqueue_row(
+                table_name='kaeley_side_eyes',
+                record_info=[
+                    message.guild.id,
+                    message.channel.id,
+                    message.id,
+                    side_eye_sticker_id,
+                    False,
+                    True,
+                    message.created_at
+                ]
+            )
+
+        if not inserted_successfully:
+            print_petrichor_error('Failed to log kaeley side eye emoji message.')
+            return
+
+        print_petrichor_msg(
+            f'Logged side eye emoji message from kaeley with id {side_eye_emoji_id}.'
+        )
+
+
+    def _side_eye_emoji_in_message(self, message : str) -> int | None:
+
+        for emote_id in SIDE_EYE_EMOTE_IDS:
+            emote_regex = re.compile(f'<:.*:{emote_id}>')
+            if re.search(emote_regex, message):
+                return emote_id
+
+        return None
+
+
+    def _side_eye_sticker_in_message(self, message : Message) -> int | None:
+
+        if not message.stickers:
+            return None
+
+        sticker : StickerItem
+        for sticker in message.stickers:
+            if sticker.id in SIDE_EYE_STICKER_IDS:
+                return sticker.id
+
+        return None
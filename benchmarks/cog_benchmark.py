@@ -0,0 +1,368 @@
+"""cog_benchmark.py
+
+Contains a benchmark of the cog logic, run against the in-memory database.
+
+Measures the time spent in python by the cogs and the data layer, without any
+network or database latency, by running each scenario against stand-ins of
+the Discord objects that the cogs use. Run from the repository root with:
+```
+python -m benchmarks.cog_benchmark --iterations 2000 --members 50
+```
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+# the cogs read these at import time
+os.environ.setdefault('FRIEND_IDS', json.dumps({'KAELEY' : 1}))
+
+from util.in_memory_db import InMemoryDatabaseManager
+from util.message_context import MessageContext
+from Petrichor.cogs.roll_the_ping import RollThePingCog
+from Petrichor.cogs.euoh import EuohCog
+from Petrichor.cogs.val import ValCog, VAL_ID, SIDE_EYE_EMOTE_IDS
+from Petrichor.cogs.boys_who_cried import BoysWhoCried
+
+from typing import Any
+from collections.abc import Awaitable, Callable
+
+
+GUILD_ID = 1000
+CHANNEL_ID = 2000
+
+# ids of the messages sent in response to commands, unique across interactions
+RESPONSE_MESSAGE_IDS = itertools.count(10**12)
+
+
+
+class FakeResponse:
+    """
+    Stand-in for `InteractionResponse`, which discards every response.
+    """
+
+    async def send_message(self, *args : Any, **kwargs : Any) -> SimpleNamespace:
+        return SimpleNamespace(message_id=next(RESPONSE_MESSAGE_IDS))
+
+
+    async def defer(self, *args : Any, **kwargs : Any) -> None:
+        pass
+
+
+
+class FakeMember(SimpleNamespace):
+    """
+    Stand-in for a guild member, hashable by id like `Member`.
+    """
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+
+
+def make_member(member_id : int) -> FakeMember:
+    """
+    Makes a stand-in for a guild member.
+
+    Parameters
+    ----------
+    member_id : int
+        the id of the member
+
+    Returns
+    -------
+    FakeMember
+        the member
+    """
+
+    return FakeMember(
+        id=member_id,
+        name=f'member{member_id}',
+        display_name=f'Member {member_id}',
+        mention=f'<@{member_id}>',
+        bot=False,
+        roles=[SimpleNamespace(name='friend')]
+    )
+
+
+def make_guild(member_count : int) -> SimpleNamespace:
+    """
+    Makes a stand-in for a guild, with kaeley and the given number of members.
+
+    Parameters
+    ----------
+    member_count : int
+        the number of members besides kaeley
+
+    Returns
+    -------
+    SimpleNamespace
+        the guild
+    """
+
+    members = [make_member(VAL_ID)] + [
+        make_member(member_id)
+        for member_id
+        in range(VAL_ID + 1, VAL_ID + 1 + member_count)
+    ]
+    members_by_id = {member.id : member for member in members}
+
+    channel = SimpleNamespace(
+        id=CHANNEL_ID,
+        get_partial_message=lambda message_id: SimpleNamespace(
+            jump_url=f'https://discord.com/channels/{GUILD_ID}/{CHANNEL_ID}/{message_id}'
+        )
+    )
+
+    return SimpleNamespace(
+        id=GUILD_ID,
+        name='Benchmark Guild',
+        members=members,
+        get_member=members_by_id.get,
+        get_channel=lambda channel_id: channel
+    )
+
+
+def make_interaction(guild : SimpleNamespace, user : SimpleNamespace) -> SimpleNamespace:
+    """
+    Makes a stand-in for a slash command interaction.
+
+    Parameters
+    ----------
+    guild : SimpleNamespace
+        the guild that the command was run in
+    user : SimpleNamespace
+        the member that ran the command
+
+    Returns
+    -------
+    SimpleNamespace
+        the interaction
+    """
+
+    return SimpleNamespace(
+        guild=guild,
+        guild_id=guild.id,
+        user=user,
+        created_at=datetime.now(timezone.utc),
+        response=FakeResponse()
+    )
+
+
+def make_message(
+    guild : SimpleNamespace,
+    author : SimpleNamespace,
+    message_id : int,
+    content : str,
+    created_at : datetime
+) -> SimpleNamespace:
+    """
+    Makes a stand-in for a message.
+
+    Parameters
+    ----------
+    guild : SimpleNamespace
+        the guild that the message was sent in
+    author : SimpleNamespace
+        the member that sent the message
+    message_id : int
+        the id of the message
+    content : str
+        the content of the message
+    created_at : datetime
+        the time that the message was sent
+
+    Returns
+    -------
+    SimpleNamespace
+        the message
+    """
+
+    return SimpleNamespace(
+        id=message_id,
+        guild=guild,
+        channel=guild.get_channel(CHANNEL_ID),
+        author=author,
+        content=content,
+        stickers=[],
+        created_at=created_at
+    )
+
+
+async def run_scenario(
+    name : str,
+    iterations : int,
+    step : Callable[[int], Awaitable[None]]
+) -> dict[str, Any]:
+    """
+    Runs a benchmark scenario, with the output of the cogs silenced.
+
+    Parameters
+    ----------
+    name : str
+        the name of the scenario
+    iterations : int
+        the number of times to run the scenario
+    step : Callable[[int], Awaitable[None]]
+        runs the scenario once, given the iteration number
+
+    Returns
+    -------
+    dict[str, Any]
+        the timings of the scenario
+    """
+
+    timings : list[float] = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(iterations):
+            step_start = time.perf_counter()
+            await step(i)
+            timings.append(time.perf_counter() - step_start)
+
+    timings.sort()
+    total_time = sum(timings)
+    return {
+        'scenario' : name,
+        'ops_per_sec' : round(iterations / total_time) if total_time else 0,
+        'mean_us' : round(total_time / iterations * 1e6, 1),
+        'p95_us' : round(timings[max(round(0.95 * iterations), 1) - 1] * 1e6, 1)
+    }
+
+
+async def main(iterations : int, member_count : int, seed : int) -> None:
+    random.seed(seed)
+
+    async with InMemoryDatabaseManager() as db:
+
+        guild = make_guild(member_count)
+        bot = SimpleNamespace(
+            db=db,
+            euoh_locked=False,
+            get_guild=lambda guild_id: guild,
+            process_commands=None
+        )
+
+        roll_the_ping_cog = RollThePingCog(bot)
+        euoh_cog = EuohCog(bot)
+        val_cog = ValCog(bot)
+        boys_who_cried_cog = BoysWhoCried(bot)
+        with contextlib.redirect_stdout(io.StringIO()):
+            await val_cog.cog_load()
+
+        kaeley = guild.get_member(VAL_ID)
+        members = guild.members[1:]
+        start_time = datetime.now(timezone.utc) - timedelta(days=365)
+
+        def random_member_interaction() -> SimpleNamespace:
+            return make_interaction(guild, random.choice(members))
+
+
+        async def rtp(i : int) -> None:
+            await roll_the_ping_cog.roll_the_ping.callback(
+                roll_the_ping_cog, random_member_interaction()
+            )
+
+        async def ping_counts(i : int) -> None:
+            await roll_the_ping_cog.get_ping_victim_counts.callback(
+                roll_the_ping_cog, random_member_interaction(), 5, False
+            )
+
+        async def vc_euoh_add(i : int) -> None:
+            await euoh_cog.vc_euohs_add.callback(
+                euoh_cog, random_member_interaction(), random.choice(members), 'scuzz'
+            )
+
+        async def vc_euoh_get(i : int) -> None:
+            await euoh_cog.vc_euohs_get.callback(
+                euoh_cog, random_member_interaction(), random.choice(members)
+            )
+
+        async def apex_euoh_add(i : int) -> None:
+            await euoh_cog.apex_euohs_add.callback(
+                euoh_cog, random_member_interaction(), random.choice(members),
+                random.choice(['euoh', 'half euoh', 'kereuoh'])
+            )
+
+        async def apex_euoh_list(i : int) -> None:
+            await euoh_cog.apex_euohs_list.callback(
+                euoh_cog, random_member_interaction()
+            )
+
+        async def side_eye_message(i : int) -> None:
+            await val_cog.check_for_side_eye(MessageContext(make_message(
+                guild, kaeley, 10**9 + i,
+                f'hmm <:side_eye:{random.choice(SIDE_EYE_EMOTE_IDS)}>',
+                start_time + timedelta(minutes=i * random.randint(1, 120))
+            )))
+
+        async def kaeley_commands(i : int) -> None:
+            interaction = make_interaction(guild, random.choice(members))
+            await val_cog.days_since_last_side_eye.callback(val_cog, interaction)
+            await val_cog.total_side_eye_count.callback(val_cog, interaction)
+            await val_cog.longest_side_eye_drought.callback(val_cog, interaction)
+
+        async def flag_message(i : int) -> None:
+            await boys_who_cried_cog.check_for_israel_flag(MessageContext(make_message(
+                guild, random.choice(members), 2 * 10**9 + i,
+                'flag \U0001F1EE\U0001F1F1', datetime.now(timezone.utc)
+            )))
+
+        async def flag_ranking(i : int) -> None:
+            await boys_who_cried_cog.the_boy_who_cried_israel.callback(
+                boys_who_cried_cog, random_member_interaction()
+            )
+
+
+        scenarios = [
+            ('/rtp', rtp),
+            ('/ping-counts victim', ping_counts),
+            ('/euoh vc add', vc_euoh_add),
+            ('/euoh vc get', vc_euoh_get),
+            ('/euoh apex add', apex_euoh_add),
+            ('/euoh apex list', apex_euoh_list),
+            ('side eye message', side_eye_message),
+            ('/kaeley commands', kaeley_commands),
+            ('flag message', flag_message),
+            ('/the-boy-who-cried-israel', flag_ranking)
+        ]
+
+        results = [
+            await run_scenario(name, iterations, step)
+            for name, step
+            in scenarios
+        ]
+
+    print(
+        f'{iterations} iterations per scenario, '
+        f'{member_count} members, in-memory database\n'
+    )
+    print(f'{"scenario":<28}{"ops/sec":>10}{"mean µs":>12}{"p95 µs":>12}')
+    for result in results:
+        print(
+            f'{result['scenario']:<28}'
+            f'{result['ops_per_sec']:>10}'
+            f'{result['mean_us']:>12}'
+            f'{result['p95_us']:>12}'
+        )
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the cog logic against the in-memory database.'
+    )
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--members', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.iterations, args.members, args.seed))
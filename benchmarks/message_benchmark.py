@@ -0,0 +1,319 @@
+"""message_benchmark.py
+
+Contains a benchmark of the message handling of the bot, run against the
+in-memory database.
+
+Measures how many messages per second the bot handles, and how long each
+message takes to handle, with a mix of chat, flag, side eye, link and prefix
+command messages. The message pipeline is compared with the per-cog
+`on_message` listeners it replaced, copied into `baseline_listeners.py`, where
+the bot and each of the three cogs processed the commands of every message,
+and the handlers of each cog ran one after another. Run from the repository root with:
+```
+python -m benchmarks.message_benchmark --messages 5000 --rest-latency-ms 0
+```
+where every message the bot sends, edits or replies with takes
+`--rest-latency-ms` to reach Discord.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+# the bot and the cogs read these when they are imported or created
+for name, value in {
+    'FRIEND_IDS' : json.dumps({'KAELEY' : 1}),
+    'PREFIX' : '!',
+    'KNS_ID' : '11',
+    'KNS_POV_ID' : '12',
+    'GUARD_ID' : '13',
+    'GUARD_POV_ID' : '14',
+    'FANTA_ID' : '15',
+    'KNS_GAME_UPDATES' : '16',
+    'PETRICHOR_ID' : '17',
+    'PETRICHOR_TESTING_ID' : '18'
+}.items():
+    os.environ.setdefault(name, value)
+
+from discord import ChannelType
+
+from util.in_memory_db import InMemoryDatabaseManager
+from Petrichor.PetrichorBot import PetrichorBot
+from Petrichor.cogs.event_handlers import EventHandlersCog
+from Petrichor.cogs.boys_who_cried import BoysWhoCried
+from Petrichor.cogs.val import ValCog, VAL_ID, SIDE_EYE_EMOTE_IDS
+from benchmarks.baseline_listeners import BaselineListeners
+
+from typing import Any
+from collections.abc import Awaitable, Callable
+
+
+GUILD_ID = 1000
+BOT_USER_ID = 999
+
+MESSAGE_CONTENTS = [
+    'lmao',
+    'who is on tonight',
+    'that was actually insane',
+    'flag \U0001F1EE\U0001F1F1',
+    '\U0001F1FA\U0001F1F8 \U0001F1EB\U0001F1F7',
+    'look at this https://x.com/someone/status/123',
+    'https://www.youtube.com/watch?v=abc',
+    '!notacommand',
+    '@vc get on'
+]
+
+
+
+async def discard(*args : Any, **kwargs : Any) -> None:
+    pass
+
+
+def make_rest_call(latency : float) -> Callable[..., Awaitable[None]]:
+    """
+    Makes a stand-in for a Discord REST call, e.g. sending a message.
+
+    Parameters
+    ----------
+    latency : float
+        the number of seconds that the call takes
+
+    Returns
+    -------
+    Callable[..., Awaitable[None]]
+        the call
+    """
+
+    async def rest_call(*args : Any, **kwargs : Any) -> None:
+        if latency:
+            await asyncio.sleep(latency)
+
+    return rest_call
+
+
+
+def make_channel(
+    channel_id : int,
+    name : str,
+    rest_call : Callable[..., Awaitable[None]]
+) -> SimpleNamespace:
+    """
+    Makes a stand-in for a text channel, which discards sent messages.
+
+    Parameters
+    ----------
+    channel_id : int
+        the id of the channel
+    name : str
+        the name of the channel
+    rest_call : Callable[..., Awaitable[None]]
+        the stand-in for sending a message
+
+    Returns
+    -------
+    SimpleNamespace
+        the channel
+    """
+
+    return SimpleNamespace(
+        id=channel_id,
+        name=name,
+        type=ChannelType.text,
+        send=rest_call
+    )
+
+
+def make_messages(
+    count : int,
+    state : Any,
+    rest_call : Callable[..., Awaitable[None]]
+) -> list[SimpleNamespace]:
+    """
+    Makes a mix of stand-ins for messages, sent by members, kaeley and bots,
+    mostly in general chat channels.
+
+    Parameters
+    ----------
+    count : int
+        the number of messages to make
+    state : Any
+        the connection state of the bot, which commands are processed with
+    rest_call : Callable[..., Awaitable[None]]
+        the stand-in for sending, editing or replying to a message
+
+    Returns
+    -------
+    list[SimpleNamespace]
+        the messages
+    """
+
+    guild = SimpleNamespace(id=GUILD_ID, name='Benchmark Guild')
+    channels = [
+        make_channel(2000, 'general', rest_call),
+        make_channel(2001, 'memes', rest_call),
+        make_channel(int(os.environ['KNS_GAME_UPDATES']), 'game-updates', rest_call)
+    ]
+    authors = [
+        SimpleNamespace(id=author_id, bot=False, display_name=f'Member {author_id}')
+        for author_id
+        in range(VAL_ID + 1, VAL_ID + 21)
+    ] + [
+        SimpleNamespace(id=VAL_ID, bot=False, display_name='kaeley'),
+        SimpleNamespace(id=5000, bot=True, display_name='Some Bot')
+    ]
+
+    messages : list[SimpleNamespace] = []
+    for message_id in range(count):
+
+        author = random.choice(authors)
+        content = random.choice(MESSAGE_CONTENTS)
+        if author.id == VAL_ID and random.random() < 0.5:
+            content = f'hmm <:side_eye:{random.choice(SIDE_EYE_EMOTE_IDS)}>'
+
+        messages.append(SimpleNamespace(
+            id=10**9 + message_id,
+            guild=guild,
+            channel=random.choices(channels, weights=[10, 5, 1])[0],
+            author=author,
+            content=content,
+            embeds=[],
+            stickers=[],
+            attachments=[],
+            created_at=datetime.now(timezone.utc),
+            edit=rest_call,
+            reply=rest_call,
+            _state=state
+        ))
+
+    return messages
+
+
+async def run_dispatcher(
+    messages : list[SimpleNamespace],
+    dispatch : Callable[[SimpleNamespace], Awaitable[None]]
+) -> dict[str, float]:
+    """
+    Handles every message, one at a time, with a given dispatcher, with the
+    output of the cogs silenced.
+
+    Parameters
+    ----------
+    messages : list[SimpleNamespace]
+        the messages to handle
+    dispatch : Callable[[SimpleNamespace], Awaitable[None]]
+        handles a single message
+
+    Returns
+    -------
+    dict[str, float]
+        the number of messages handled per second, and the mean and p95 time
+        to handle a message, in milliseconds
+    """
+
+    latencies : list[float] = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for message in messages:
+            dispatch_start = time.perf_counter()
+            await dispatch(message)
+            latencies.append(time.perf_counter() - dispatch_start)
+
+    latencies.sort()
+    total_time = sum(latencies)
+    return {
+        'messages_per_sec' : len(messages) / total_time,
+        'mean_ms' : total_time / len(messages) * 1000,
+        'p95_ms' : latencies[max(round(0.95 * len(latencies)), 1) - 1] * 1000
+    }
+
+
+async def main(message_count : int, rest_latency : float, seed : int) -> None:
+    random.seed(seed)
+
+    async with InMemoryDatabaseManager() as db:
+
+        bot = PetrichorBot(db_conn=db)
+        bot.loop = asyncio.get_running_loop()
+        bot._connection.user = SimpleNamespace(id=BOT_USER_ID)
+        messages = make_messages(
+            message_count,
+            bot._connection,
+            make_rest_call(rest_latency)
+        )
+        # unknown commands would otherwise print a traceback each
+        bot.on_command_error = discard
+
+        event_handlers_cog = EventHandlersCog(bot)
+        boys_who_cried_cog = BoysWhoCried(bot)
+        val_cog = ValCog(bot)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for cog in (event_handlers_cog, boys_who_cried_cog, val_cog):
+                await bot.add_cog(cog)
+
+
+        baseline_listeners = BaselineListeners(bot, event_handlers_cog)
+
+        async def per_cog_listeners(message : SimpleNamespace) -> None:
+            # the listeners that were run for every message before the
+            # pipeline, each as its own task, like `Client.dispatch` does
+            await asyncio.gather(*(
+                asyncio.create_task(listener(message))
+                for listener
+                in baseline_listeners.listeners
+            ))
+
+
+        async def message_pipeline(message : SimpleNamespace) -> None:
+            await asyncio.create_task(bot.on_message(message))
+
+
+        # warm up both paths, then measure them
+        await run_dispatcher(messages[:200], per_cog_listeners)
+        await run_dispatcher(messages[:200], message_pipeline)
+        results = {
+            'per-cog listeners' : await run_dispatcher(messages, per_cog_listeners),
+            'message pipeline' : await run_dispatcher(messages, message_pipeline)
+        }
+        pipeline_stats = bot.message_pipeline.stats()
+
+    print(
+        f'{message_count} messages, in-memory database, '
+        f'{rest_latency * 1000:g} ms per REST call\n'
+    )
+    print(f'{"dispatcher":<24}{"messages/sec":>14}{"mean ms":>10}{"p95 ms":>10}')
+    for dispatcher, result in results.items():
+        print(
+            f'{dispatcher:<24}'
+            f'{result['messages_per_sec']:>14.0f}'
+            f'{result['mean_ms']:>10.3f}'
+            f'{result['p95_ms']:>10.3f}'
+        )
+
+    speedup = results['message pipeline']['messages_per_sec'] \
+              / results['per-cog listeners']['messages_per_sec']
+    print(f'\nspeedup: {speedup:.2f}x')
+    print(
+        f'pipeline: {pipeline_stats['handler_runs']} handler runs, '
+        f'{pipeline_stats['handler_errors']} errors, '
+        f'{pipeline_stats['unrouted_messages']} messages routed to no handler'
+    )
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the message handling of the bot.'
+    )
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--rest-latency-ms', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.messages, args.rest_latency_ms / 1000, args.seed))
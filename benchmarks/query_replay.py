@@ -0,0 +1,384 @@
+"""query_replay.py
+
+Contains a tool that replays captured database queries against a Postgres
+database.
+
+Queries are captured by the bot when the QUERY_CAPTURE_PATH environment
+variable is set, see `util/query_capture.py`. Replaying them runs the real
+traffic mix of the bot against a local database, so that index, pool and query
+changes can be measured before they are deployed. Run from the repository
+root with:
+```
+python -m benchmarks.query_replay queries.jsonl --concurrency 8
+```
+The database is given with `--dsn`, or otherwise with the same POSTGRES_*
+environment variables as the bot. Execute queries and bulk copies run in a
+transaction that is rolled back, so the database is left as it was, unless
+`--commit-writes` is given.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import NamedTuple
+
+import asyncpg
+
+from util.query_capture import decode_arg
+from util.query_stats import QueryShapeStats, QueryStatsRecorder
+
+from typing import TYPE_CHECKING, Any
+if TYPE_CHECKING:
+    from asyncpg import Pool
+
+
+SAMPLE_SIZE = 100_000
+
+
+
+class CapturedQuery(NamedTuple):
+    kind: str
+    query: str
+    args: list[Any]
+    elapsed: float
+    rows: int
+    failed: bool
+    # the table and columns that a bulk copy copies its rows into
+    table: str | None = None
+    columns: list[str] | None = None
+
+
+
+def load_capture(path : str) -> list[CapturedQuery]:
+    """
+    Loads the captured queries from a capture file, in the order that they
+    were run.
+
+    Parameters
+    ----------
+    path : str
+        the capture file to load
+
+    Returns
+    -------
+    list[CapturedQuery]
+        the captured queries
+    """
+
+    captured_queries : list[CapturedQuery] = []
+
+    # SQL text ids are only unique within a capture session
+    sql_texts : dict[int, str] = {}
+    with open(path, encoding='utf-8') as capture_file:
+        for line in capture_file:
+
+            if not line.strip():
+                continue
+
+            entry : dict[str, Any] = json.loads(line)
+
+            if 'session' in entry:
+                sql_texts = {}
+            elif 'text' in entry:
+                sql_texts[entry['sql']] = entry['text']
+            else:
+                captured_queries.append(CapturedQuery(
+                    kind=entry['kind'],
+                    query=sql_texts[entry['sql']],
+                    args=[decode_arg(arg) for arg in entry['args']],
+                    elapsed=entry['ms'] / 1000,
+                    rows=entry['rows'],
+                    failed=not entry['ok'],
+                    table=entry.get('table'),
+                    columns=entry.get('columns')
+                ))
+
+    return captured_queries
+
+
+def get_dsn_from_env() -> str:
+    """
+    Gets the connection string of the database from the same environment
+    variables as the bot.
+
+    Returns
+    -------
+    str
+        the connection string
+    """
+
+    return (
+        f'postgres://'
+        f'{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASS')}'
+        f'@{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT')}'
+        f'/{os.getenv('POSTGRES_DB')}'
+    )
+
+
+async def replay_query(
+    pool : Pool,
+    captured_query : CapturedQuery,
+    commit_writes : bool
+) -> tuple[float, int, bool]:
+    """
+    Replays a single captured query.
+
+    Parameters
+    ----------
+    pool : Pool
+        the pool to run the query on
+    captured_query : CapturedQuery
+        the query to replay
+    commit_writes : bool
+        whether execute queries and copies are committed or rolled back
+
+    Returns
+    -------
+    tuple[float, int, bool]
+        the time the query took in seconds, the number of rows it returned
+        or copied, and whether it failed
+    """
+
+    async with pool.acquire() as conn:
+
+        if captured_query.kind == 'fetch':
+            query_start = time.perf_counter()
+            try:
+                result = await conn.fetch(captured_query.query, *captured_query.args)
+            except Exception:
+                return time.perf_counter() - query_start, 0, True
+
+            return time.perf_counter() - query_start, len(result), False
+
+        write_transaction = conn.transaction()
+        await write_transaction.start()
+        rows = 0
+        query_start = time.perf_counter()
+        try:
+            if captured_query.kind == 'copy':
+                rows = len(captured_query.args)
+                await conn.copy_records_to_table(
+                    captured_query.table,
+                    records=[tuple(record) for record in captured_query.args],
+                    columns=captured_query.columns
+                )
+            else:
+                await conn.execute(captured_query.query, *captured_query.args)
+            failed = False
+        except Exception:
+            failed = True
+        elapsed = time.perf_counter() - query_start
+
+        if commit_writes and not failed:
+            await write_transaction.commit()
+        else:
+            await write_transaction.rollback()
+
+        return elapsed, rows, failed
+
+
+async def replay(
+    captured_queries : list[CapturedQuery],
+    dsn : str,
+    concurrency : int,
+    pool_size : int,
+    commit_writes : bool
+) -> tuple[dict[str, QueryShapeStats], float]:
+    """
+    Replays the captured queries in capture order, with up to `concurrency`
+    queries in flight at a time.
+
+    Parameters
+    ----------
+    captured_queries : list[CapturedQuery]
+        the queries to replay
+    dsn : str
+        the connection string of the database to replay the queries against
+    concurrency : int
+        the number of queries to run at the same time
+    pool_size : int
+        the maximum number of connections in the pool
+    commit_writes : bool
+        whether execute queries and copies are committed or rolled back
+
+    Returns
+    -------
+    tuple[dict[str, QueryShapeStats], float]
+        mapping of query shapes to the timings of their replays, and the
+        total time that the replay took in seconds
+    """
+
+    replayed_shapes : dict[str, QueryShapeStats] = {}
+    next_query = iter(captured_queries)
+
+    async def worker(pool : Pool) -> None:
+        for captured_query in next_query:
+            elapsed, rows, failed = await replay_query(
+                pool, captured_query, commit_writes
+            )
+
+            shape = QueryStatsRecorder.normalize_query(captured_query.query)
+            if (shape_stats := replayed_shapes.get(shape)) is None:
+                shape_stats = replayed_shapes[shape] = QueryShapeStats(SAMPLE_SIZE)
+            shape_stats.record(elapsed, rows, failed)
+
+
+    async with asyncpg.create_pool(
+        dsn=dsn,
+        min_size=min(pool_size, concurrency),
+        max_size=pool_size
+    ) as pool:
+        replay_start = time.perf_counter()
+        async with asyncio.TaskGroup() as task_group:
+            for _ in range(concurrency):
+                task_group.create_task(worker(pool))
+        replay_time = time.perf_counter() - replay_start
+
+    return replayed_shapes, replay_time
+
+
+def summarize_capture(
+    captured_queries : list[CapturedQuery]
+) -> dict[str, QueryShapeStats]:
+    """
+    Groups the captured timings of the queries by their query shape.
+
+    Parameters
+    ----------
+    captured_queries : list[CapturedQuery]
+        the captured queries
+
+    Returns
+    -------
+    dict[str, QueryShapeStats]
+        mapping of query shapes to their captured timings
+    """
+
+    captured_shapes : dict[str, QueryShapeStats] = {}
+    for captured_query in captured_queries:
+
+        shape = QueryStatsRecorder.normalize_query(captured_query.query)
+        if (shape_stats := captured_shapes.get(shape)) is None:
+            shape_stats = captured_shapes[shape] = QueryShapeStats(SAMPLE_SIZE)
+        shape_stats.record(
+            captured_query.elapsed,
+            captured_query.rows,
+            captured_query.failed
+        )
+
+    return captured_shapes
+
+
+def print_report(
+    captured_shapes : dict[str, QueryShapeStats],
+    replayed_shapes : dict[str, QueryShapeStats],
+    replay_time : float,
+    concurrency : int,
+    top : int
+) -> None:
+    """
+    Prints the replayed timings of the query shapes next to their captured
+    timings, for the shapes that the most replay time was spent on.
+
+    Parameters
+    ----------
+    captured_shapes : dict[str, QueryShapeStats]
+        mapping of query shapes to their captured timings
+    replayed_shapes : dict[str, QueryShapeStats]
+        mapping of query shapes to their replayed timings
+    replay_time : float
+        the total time that the replay took, in seconds
+    concurrency : int
+        the number of queries that were run at the same time
+    top : int
+        the number of query shapes to print
+    """
+
+    query_count = sum(shape.count for shape in replayed_shapes.values())
+    error_count = sum(shape.errors for shape in replayed_shapes.values())
+
+    print(
+        f'{query_count} queries replayed in {replay_time:.2f}s '
+        f'at concurrency {concurrency} | '
+        f'{query_count / replay_time if replay_time else 0:.0f} queries/sec | '
+        f'{error_count} errors\n'
+    )
+    print(
+        f'{"count":>7}{"errors":>8}{"total ms":>11}'
+        f'{"p50 ms":>9}{"p95 ms":>9}{"max ms":>9}'
+        f'{"captured p50":>14}{"captured p95":>14}  shape'
+    )
+
+    shapes = sorted(
+        replayed_shapes.items(),
+        key=lambda shape: shape[1].total_time,
+        reverse=True
+    )
+    for shape, replayed in shapes[:top]:
+        replayed_summary = replayed.summary()
+        captured_summary = captured_shapes[shape].summary()
+        print(
+            f'{replayed_summary['count']:>7}'
+            f'{replayed_summary['errors']:>8}'
+            f'{replayed_summary['total_ms']:>11}'
+            f'{replayed_summary['p50_ms']:>9}'
+            f'{replayed_summary['p95_ms']:>9}'
+            f'{replayed_summary['max_ms']:>9}'
+            f'{captured_summary['p50_ms']:>14}'
+            f'{captured_summary['p95_ms']:>14}'
+            f'  {shape[:120]}'
+        )
+
+
+async def main(args : argparse.Namespace) -> None:
+    captured_queries = load_capture(args.capture_file)
+
+    if args.reads_only:
+        captured_queries = [
+            captured_query
+            for captured_query
+            in captured_queries
+            if captured_query.kind == 'fetch'
+        ]
+    captured_queries = captured_queries[:args.limit] * args.repeat
+
+    if not captured_queries:
+        print('No queries to replay')
+        return
+
+    replayed_shapes, replay_time = await replay(
+        captured_queries,
+        dsn=args.dsn or get_dsn_from_env(),
+        concurrency=args.concurrency,
+        pool_size=args.pool_size or args.concurrency,
+        commit_writes=args.commit_writes
+    )
+
+    print_report(
+        summarize_capture(captured_queries),
+        replayed_shapes,
+        replay_time,
+        args.concurrency,
+        args.top
+    )
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Replays captured queries against a Postgres database.'
+    )
+    parser.add_argument('capture_file')
+    parser.add_argument('--dsn', default=None)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--pool-size', type=int, default=None)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--reads-only', action='store_true')
+    parser.add_argument('--commit-writes', action='store_true')
+
+    asyncio.run(main(parser.parse_args()))
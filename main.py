@@ -12,17 +12,30 @@ from pathlib import Path
 
 from Petrichor.PetrichorBot import PetrichorBot
 from util.db_connection_manager import DatabaseConnectionManager
+from util.in_memory_db import InMemoryDatabaseManager
 
 
 
 async def main():
-    async with DatabaseConnectionManager() as db_conn:
+    async with get_database_manager() as db_conn:
         async with PetrichorBot(
             db_conn=db_conn
         ) as bot:
             await bot.start(os.getenv('BOT_TOKEN'))
 
 
+def get_database_manager() -> DatabaseConnectionManager | InMemoryDatabaseManager:
+    """
+    Gets the database backend selected by the DATABASE_BACKEND environment
+    variable, `postgres` by default, or `memory` for the in-memory database.
+    """
+
+    if os.getenv('DATABASE_BACKEND', 'postgres').lower() == 'memory':
+        return InMemoryDatabaseManager()
+
+    return DatabaseConnectionManager()
+
+
 def setup_logging():
 
     # logging configuration obtained from discord.py documentation
@@ -42,6 +55,19 @@ def setup_logging():
     handler.setFormatter(formatter)
     logger.addHandler(handler)
 
+    # queries slower than the slow query threshold get their own log
+    slow_query_logger = logging.getLogger('petrichor.slow_queries')
+    slow_query_logger.setLevel(logging.WARNING)
+
+    slow_query_handler = logging.handlers.RotatingFileHandler(
+        filename=Path('logs', os.getenv('BOT_NAME') + '_slow_queries.log'),
+        encoding='utf-8',
+        maxBytes=8 * 1024 * 1024,  # 8 MiB
+        backupCount=2,
+    )
+    slow_query_handler.setFormatter(formatter)
+    slow_query_logger.addHandler(slow_query_handler)
+
 
 
 if __name__ == "__main__":
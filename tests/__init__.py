@@ -0,0 +1,17 @@
+import json
+import os
+
+# the bot and the cogs read these when they are imported or created
+for name, value in {
+    'FRIEND_IDS' : json.dumps({'KAELEY' : 1}),
+    'PREFIX' : '!',
+    'KNS_ID' : '11',
+    'KNS_POV_ID' : '12',
+    'GUARD_ID' : '13',
+    'GUARD_POV_ID' : '14',
+    'FANTA_ID' : '15',
+    'KNS_GAME_UPDATES' : '16',
+    'PETRICHOR_ID' : '17',
+    'PETRICHOR_TESTING_ID' : '18'
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,191 @@
+"""fake_pool.py
+
+Contains stand-ins for an asyncpg connection pool, to test the database
+connection manager without a PostgreSQL server.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable
+
+    from util.db_connection_manager import DatabaseConnectionManager
+
+
+# table name -> (column name, data type) of each column of the table
+FAKE_TABLES : dict[str, list[tuple[str, str]]] = {
+    'kaeley_side_eyes' : [
+        ('guild_id', 'bigint'),
+        ('channel_id', 'bigint'),
+        ('message_id', 'bigint'),
+        ('emoji_id', 'bigint'),
+        ('media_type', 'boolean'),
+        ('message_type', 'boolean'),
+        ('message_time', 'timestamp with time zone')
+    ],
+    'boys_who_cried' : [
+        ('guild_id', 'bigint'),
+        ('channel_id', 'bigint'),
+        ('message_id', 'bigint'),
+        ('user_id', 'bigint'),
+        ('message_type', 'boolean'),
+        ('message_time', 'timestamp with time zone'),
+        ('true_react', 'boolean')
+    ]
+}
+
+
+
+class FakeTransaction:
+    """
+    Class that stands in for an asyncpg transaction, and records how it was
+    opened and how it ended.
+    """
+
+    def __init__(self, conn : FakeConnection, options : dict[str, Any]):
+        self.conn = conn
+        self.options = options
+
+
+    async def __aenter__(self):
+        self.conn.log.append(('begin', self.options))
+        self.conn.in_transaction = True
+        return self
+
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.conn.log.append(('rollback' if exc_type else 'commit', self.options))
+        self.conn.in_transaction = False
+        return False
+
+
+
+class FakeConnection:
+    """
+    Class that stands in for an asyncpg connection. Every query is logged,
+    and fetch queries are answered by the `fetch_handler` of its pool.
+    """
+
+    def __init__(self, pool : FakePool):
+        self.pool = pool
+        self.log = pool.log
+        self.in_transaction = False
+
+
+    def is_in_transaction(self) -> bool:
+        return self.in_transaction
+
+
+    def is_closed(self) -> bool:
+        return False
+
+
+    def transaction(self, **options : Any) -> FakeTransaction:
+        return FakeTransaction(self, options)
+
+
+    async def fetch(self, query : str, *args : Any) -> list[dict[str, Any]]:
+        self.log.append(('fetch', query, args))
+
+        if 'information_schema.columns' in query:
+            return [
+                {
+                    'column_name' : column_name,
+                    'data_type' : data_type,
+                    'is_identity' : 'NO',
+                    'column_default' : None
+                }
+                for column_name, data_type
+                in FAKE_TABLES.get(args[0], [])
+            ]
+
+        return self.pool.fetch_handler(query, args)
+
+
+    async def execute(self, query : str, *args : Any) -> str:
+        self.log.append(('execute', query, args))
+        return 'SELECT 0'
+
+
+    def cursor(self, query : str, *args : Any, prefetch : int = None) -> AsyncIterator[Any]:
+        self.log.append(('cursor', query, args, prefetch))
+
+        async def stream_rows() -> AsyncIterator[Any]:
+            for row in self.pool.fetch_handler(query, args):
+                yield row
+
+        return stream_rows()
+
+
+
+class FakePool:
+    """
+    Class that stands in for an asyncpg connection pool of a fixed size, and
+    keeps track of which of its connections are idle.
+
+    Attributes
+    ----------
+    log : list[tuple]
+        every query and transaction run on the connections of the pool
+    fetch_handler : Callable[[str, tuple], list[Any]]
+        gets the rows that a fetch query returns, from the query and its
+        arguments
+    """
+
+    def __init__(self, size : int = 2):
+        self.log : list[tuple] = []
+        self.fetch_handler : Callable[[str, tuple], list[Any]] = lambda query, args: []
+        self._size = size
+        self._idle = [FakeConnection(self) for _ in range(size)]
+
+
+    async def acquire(self, timeout : float = None) -> FakeConnection:
+        return self._idle.pop()
+
+
+    async def release(self, conn : FakeConnection) -> None:
+        self._idle.append(conn)
+
+
+    def get_size(self) -> int:
+        return self._size
+
+
+    def get_idle_size(self) -> int:
+        return len(self._idle)
+
+
+    def get_min_size(self) -> int:
+        return self._size
+
+
+    def get_max_size(self) -> int:
+        return self._size
+
+
+    async def close(self) -> None:
+        pass
+
+
+
+def make_database_manager(pool_size : int = 2) -> tuple[DatabaseConnectionManager, FakePool]:
+    """
+    Makes a database connection manager that runs its queries on a fake pool.
+
+    Parameters
+    ----------
+    pool_size : int, default = 2
+        the number of connections in the pool
+
+    Returns
+    -------
+    tuple[DatabaseConnectionManager, FakePool]
+        the manager, and the pool it runs its queries on
+    """
+
+    from util.db_connection_manager import DatabaseConnectionManager
+
+    db = DatabaseConnectionManager()
+    pool = FakePool(pool_size)
+    db._db_pool = pool
+    return db, pool
@@ -0,0 +1,76 @@
+"""test_aggregates.py
+
+Contains tests of counting rows and getting the smallest and largest values
+of a column.
+"""
+import unittest
+from datetime import datetime, timezone
+
+from util.in_memory_db import InMemoryDatabaseManager
+from tests.fake_pool import make_database_manager
+
+
+
+class AggregatesTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_count_rows_binds_typed_filters(self):
+        db, pool = make_database_manager()
+        pool.fetch_handler = lambda query, args: [{'row_count' : 3}]
+        start_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        row_count = await db.count_rows(
+            'kaeley_side_eyes',
+            where={'guild_id' : '123', 'message_time' : ('>=', start_time)}
+        )
+
+        self.assertEqual(row_count, 3)
+
+        query, args = [entry[1:] for entry in pool.log if entry[0] == 'fetch'][-1]
+        self.assertIn('COUNT(*) AS row_count', query)
+        self.assertIn('guild_id = $1 AND message_time >= $2', query)
+        self.assertEqual(args, (123, start_time))
+        self.assertEqual(pool.get_idle_size(), pool.get_size())
+
+
+    async def test_min_and_max_value_bind_typed_filters(self):
+        db, pool = make_database_manager()
+        pool.fetch_handler = lambda query, args: [{'min_value' : 1, 'max_value' : 9}]
+
+        min_value = await db.min_value('kaeley_side_eyes', 'message_id', where={'guild_id' : '5'})
+        max_value = await db.max_value('kaeley_side_eyes', 'message_id', where={'guild_id' : '5'})
+
+        self.assertEqual((min_value, max_value), (1, 9))
+
+        fetch_queries = [entry[1:] for entry in pool.log if entry[0] == 'fetch']
+        self.assertIn('MIN(message_id) AS min_value', fetch_queries[-2][0])
+        self.assertIn('MAX(message_id) AS max_value', fetch_queries[-1][0])
+        self.assertEqual(fetch_queries[-2][1], (5,))
+        self.assertEqual(fetch_queries[-1][1], (5,))
+
+
+    async def test_min_and_max_value_are_none_without_rows(self):
+        db, pool = make_database_manager()
+        pool.fetch_handler = lambda query, args: []
+
+        self.assertIsNone(await db.min_value('kaeley_side_eyes', 'message_id'))
+        self.assertIsNone(await db.max_value('kaeley_side_eyes', 'message_id'))
+
+
+    async def test_in_memory_aggregates(self):
+        db = InMemoryDatabaseManager()
+        for guild_id, message_id in ((1, 30), (2, 10), (1, 20), (1, None)):
+            await db.insert_row(
+                'kaeley_side_eyes',
+                [guild_id, 2, message_id, 4, True, True, None]
+            )
+
+        self.assertEqual(await db.count_rows('kaeley_side_eyes'), 4)
+        self.assertEqual(await db.count_rows('kaeley_side_eyes', where={'guild_id' : 1}), 3)
+        self.assertEqual(await db.min_value('kaeley_side_eyes', 'message_id', where={'guild_id' : 1}), 20)
+        self.assertEqual(await db.max_value('kaeley_side_eyes', 'message_id', where={'guild_id' : 1}), 30)
+        self.assertIsNone(await db.max_value('kaeley_side_eyes', 'message_id', where={'guild_id' : 3}))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""test_event_handlers.py
+
+Contains tests of replying to Twitter links with fxtwitter links.
+"""
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from util.message_context import MessageContext
+from Petrichor.cogs.event_handlers import EventHandlersCog
+
+
+
+def make_message(content : str) -> SimpleNamespace:
+    return SimpleNamespace(
+        content=content,
+        embeds=[],
+        edit=mock.AsyncMock(),
+        reply=mock.AsyncMock()
+    )
+
+
+
+class UpdateTwitterLinkTest(unittest.IsolatedAsyncioTestCase):
+
+    async def fxtwitter_reply(self, content : str) -> str:
+        cog = EventHandlersCog(SimpleNamespace())
+        message = make_message(content)
+
+        await cog.update_twitter_link(MessageContext(message))
+
+        message.edit.assert_awaited_once_with(suppress=True)
+        return message.reply.await_args.kwargs['content']
+
+
+    async def test_only_the_domain_is_replaced(self):
+        reply = await self.fxtwitter_reply(
+            'look https://X.com/user/status/1?s=20&t=abc#m and '
+            'https://twitter.com/user/status/2#fragment'
+        )
+
+        self.assertEqual(
+            reply,
+            'https://fxtwitter.com/user/status/1?s=20&t=abc#m\n'
+            'https://fxtwitter.com/user/status/2#fragment'
+        )
+
+
+    async def test_other_links_are_left_alone(self):
+        cog = EventHandlersCog(SimpleNamespace())
+        message = make_message('https://example.com/user/status/1')
+
+        await cog.update_twitter_link(MessageContext(message))
+
+        message.reply.assert_not_awaited()
+
+
+
+if __name__ == '__main__':
+    unittest.main()
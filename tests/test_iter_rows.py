@@ -0,0 +1,73 @@
+"""test_iter_rows.py
+
+Contains tests of streaming rows with a server-side cursor.
+"""
+import unittest
+
+from util.in_memory_db import InMemoryDatabaseManager
+from tests.fake_pool import make_database_manager
+
+
+
+class IterRowsTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_streams_every_row_in_a_read_only_transaction(self):
+        db, pool = make_database_manager()
+        pool.fetch_handler = lambda query, args: [{'guild_id' : i} for i in range(5)]
+
+        async with db.iter_rows('kaeley_side_eyes', where={'guild_id' : 1}, prefetch=2) as records:
+            guild_ids = [record['guild_id'] async for record in records]
+
+        self.assertEqual(guild_ids, [0, 1, 2, 3, 4])
+        self.assertIn(('begin', {'readonly' : True}), pool.log)
+        self.assertIn(('commit', {'readonly' : True}), pool.log)
+
+        cursor_queries = [entry for entry in pool.log if entry[0] == 'cursor']
+        self.assertEqual(len(cursor_queries), 1)
+        self.assertEqual(cursor_queries[0][2], (1,))
+        self.assertEqual(cursor_queries[0][3], 2)
+
+
+    async def test_breaking_early_releases_the_connection(self):
+        db, pool = make_database_manager(pool_size=2)
+        pool.fetch_handler = lambda query, args: [{'guild_id' : i} for i in range(100)]
+
+        async with db.iter_rows('kaeley_side_eyes') as records:
+            async for record in records:
+                self.assertEqual(pool.get_idle_size(), 1)
+                break
+
+        self.assertEqual(pool.get_idle_size(), pool.get_size())
+        self.assertEqual(pool.log[-1], ('commit', {'readonly' : True}))
+
+
+    async def test_error_while_streaming_releases_the_connection(self):
+        db, pool = make_database_manager(pool_size=2)
+        pool.fetch_handler = lambda query, args: [{'guild_id' : i} for i in range(100)]
+
+        with self.assertRaises(RuntimeError):
+            async with db.iter_rows('kaeley_side_eyes') as records:
+                async for record in records:
+                    raise RuntimeError('stop')
+
+        self.assertEqual(pool.get_idle_size(), pool.get_size())
+        self.assertEqual(pool.log[-1], ('rollback', {'readonly' : True}))
+
+
+    async def test_in_memory_streams_matching_rows(self):
+        db = InMemoryDatabaseManager()
+        for guild_id in (1, 2, 1):
+            await db.insert_row(
+                'kaeley_side_eyes',
+                [guild_id, 2, 3, 4, True, True, None]
+            )
+
+        async with db.iter_rows('kaeley_side_eyes', where={'guild_id' : 1}) as records:
+            rows = [row async for row in records]
+
+        self.assertEqual(len(rows), 2)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
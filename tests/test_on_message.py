@@ -0,0 +1,64 @@
+"""test_on_message.py
+
+Contains tests of processing the commands and message handlers of messages.
+"""
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from Petrichor.PetrichorBot import PetrichorBot
+
+
+
+class OnMessageTest(unittest.IsolatedAsyncioTestCase):
+
+    def make_bot(self, dispatch) -> tuple[SimpleNamespace, list[str]]:
+        events : list[str] = []
+
+        async def process_commands(message) -> None:
+            events.append('commands started')
+            await asyncio.sleep(0)
+            events.append('commands finished')
+
+        bot = SimpleNamespace(
+            process_commands=process_commands,
+            message_pipeline=SimpleNamespace(dispatch=dispatch)
+        )
+        return bot, events
+
+
+    async def test_commands_are_not_held_up_by_slow_handlers(self):
+        handlers_released = asyncio.Event()
+
+        async def dispatch(message) -> None:
+            events.append('handlers started')
+            await handlers_released.wait()
+            events.append('handlers finished')
+
+        bot, events = self.make_bot(dispatch)
+        on_message_task = asyncio.create_task(PetrichorBot.on_message(bot, object()))
+
+        await asyncio.sleep(0.01)
+        self.assertEqual(events, ['commands started', 'handlers started', 'commands finished'])
+
+        handlers_released.set()
+        await on_message_task
+        self.assertEqual(events[-1], 'handlers finished')
+
+
+    async def test_commands_finish_when_the_handlers_fail(self):
+
+        async def dispatch(message) -> None:
+            raise RuntimeError('handlers failed')
+
+        bot, events = self.make_bot(dispatch)
+
+        with self.assertRaises(RuntimeError):
+            await PetrichorBot.on_message(bot, object())
+
+        self.assertEqual(events, ['commands started', 'commands finished'])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
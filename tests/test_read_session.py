@@ -0,0 +1,62 @@
+"""test_read_session.py
+
+Contains tests of running several read queries on a single connection.
+"""
+import unittest
+
+from util.in_memory_db import InMemoryDatabaseManager
+from tests.fake_pool import make_database_manager
+
+
+
+class ReadSessionTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_yields_a_connection_without_a_transaction(self):
+        db, pool = make_database_manager(pool_size=2)
+
+        async with db.read_session() as conn:
+            self.assertFalse(conn.is_in_transaction())
+            self.assertEqual(pool.get_idle_size(), 1)
+            await db.fetch_rows('kaeley_side_eyes', conn=conn)
+            await db.fetch_rows('boys_who_cried', conn=conn)
+            self.assertEqual(pool.get_idle_size(), 1)
+
+        self.assertEqual(pool.get_idle_size(), pool.get_size())
+        self.assertFalse(any(entry[0] == 'begin' for entry in pool.log))
+
+
+    async def test_snapshot_runs_in_a_read_only_repeatable_read_transaction(self):
+        db, pool = make_database_manager(pool_size=2)
+        snapshot_options = {'isolation' : 'repeatable_read', 'readonly' : True}
+
+        async with db.read_session(snapshot=True) as conn:
+            self.assertTrue(conn.is_in_transaction())
+            await db.fetch_rows('kaeley_side_eyes', conn=conn)
+
+        self.assertEqual(pool.get_idle_size(), pool.get_size())
+        self.assertIn(('begin', snapshot_options), pool.log)
+        self.assertEqual(pool.log[-1], ('commit', snapshot_options))
+
+
+    async def test_snapshot_is_rolled_back_and_released_on_error(self):
+        db, pool = make_database_manager(pool_size=2)
+
+        with self.assertRaises(RuntimeError):
+            async with db.read_session(snapshot=True):
+                raise RuntimeError('stop')
+
+        self.assertEqual(pool.get_idle_size(), pool.get_size())
+        self.assertEqual(pool.log[-1][0], 'rollback')
+
+
+    async def test_in_memory_yields_no_connection(self):
+        db = InMemoryDatabaseManager()
+
+        async with db.read_session(snapshot=True) as conn:
+            self.assertIsNone(conn)
+            self.assertEqual(await db.fetch_rows('kaeley_side_eyes', conn=conn), [])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+"""test_read_your_writes.py
+
+Contains tests of pinning reads to the primary after writing.
+"""
+import unittest
+
+from util.in_memory_db import InMemoryDatabaseManager
+from tests.fake_pool import make_database_manager
+
+
+
+class ReadYourWritesTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_pins_reads_to_the_primary_inside_the_context(self):
+        db, _ = make_database_manager()
+
+        with db.read_your_writes():
+            self.assertFalse(db.replica_router.use_replica('kaeley_side_eyes'))
+
+        self.assertTrue(db.replica_router.use_replica('kaeley_side_eyes'))
+        self.assertEqual(db.replica_router.stats()['pinned_reads'], 1)
+
+
+    async def test_in_memory_does_nothing(self):
+        db = InMemoryDatabaseManager()
+        await db.insert_row('kaeley_side_eyes', [1, 2, 3, 4, True, True, None])
+
+        with db.read_your_writes():
+            rows = await db.fetch_rows('kaeley_side_eyes')
+
+        self.assertEqual(len(rows), 1)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""test_roll_the_ping.py
+
+Contains tests of recording `/rtp` pings and rebuilding their counts.
+"""
+import unittest
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from util.in_memory_db import InMemoryDatabaseManager
+from Petrichor.cogs.general_admin import AdminCog
+from Petrichor.cogs.roll_the_ping import RollThePingCog
+
+
+
+class FakeTransactionDatabase:
+    """
+    Class that stands in for the database connection, and records whether
+    each of its transactions was committed or rolled back.
+    """
+
+    def __init__(self, increment_results : list[bool]):
+        self.transactions : list[str] = []
+        self.insert_row = mock.AsyncMock(return_value=True)
+        self.increment_counters = mock.AsyncMock(side_effect=increment_results)
+
+
+    @asynccontextmanager
+    async def transaction(self):
+        try:
+            yield 'conn'
+        except BaseException:
+            self.transactions.append('rollback')
+            raise
+        self.transactions.append('commit')
+
+
+
+def make_interaction() -> SimpleNamespace:
+    member = SimpleNamespace(bot=False, roles=[], mention='@victim', id=2)
+    return SimpleNamespace(
+        guild=SimpleNamespace(members=[member]),
+        guild_id=5,
+        user=SimpleNamespace(id=1, display_name='pinger'),
+        created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        response=SimpleNamespace(
+            send_message=mock.AsyncMock(return_value=SimpleNamespace(message_id=3)),
+            defer=mock.AsyncMock()
+        ),
+        followup=SimpleNamespace(send=mock.AsyncMock())
+    )
+
+
+
+class RollThePingTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_recorded_ping_is_committed(self):
+        db = FakeTransactionDatabase(increment_results=[True, True])
+        cog = RollThePingCog(SimpleNamespace(db=db))
+
+        await cog.roll_the_ping.callback(cog, make_interaction())
+
+        self.assertEqual(db.transactions, ['commit'])
+        self.assertEqual(db.increment_counters.await_count, 2)
+
+
+    async def test_failed_step_rolls_the_ping_back(self):
+        db = FakeTransactionDatabase(increment_results=[False, True])
+        cog = RollThePingCog(SimpleNamespace(db=db))
+
+        await cog.roll_the_ping.callback(cog, make_interaction())
+
+        self.assertEqual(db.transactions, ['rollback'])
+        self.assertEqual(db.increment_counters.await_count, 1)
+
+
+    async def test_rebuild_is_not_supported_in_memory(self):
+        db = InMemoryDatabaseManager()
+        bot = SimpleNamespace(db=db, get_cog=lambda name: RollThePingCog(SimpleNamespace(db=db)))
+        cog = AdminCog(bot)
+        interaction = make_interaction()
+
+        await cog.db_rebuild_ping_counts.callback(cog, interaction)
+
+        self.assertIn('not supported', interaction.response.send_message.await_args.args[0])
+        interaction.response.defer.assert_not_awaited()
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""test_side_eye_states.py
+
+Contains tests of keeping kaeley's side eye statistics in sync with the
+database.
+"""
+import json
+import unittest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from util.cache_invalidation import CacheInvalidationListener
+from util.in_memory_db import InMemoryDatabaseManager
+from Petrichor.cogs.val import ValCog
+
+
+GUILD_ID = 5
+
+
+
+def make_side_eye(message_id : int, day : int) -> list:
+    return [
+        GUILD_ID,
+        2,
+        message_id,
+        4,
+        True,
+        True,
+        datetime(2024, 1, day, tzinfo=timezone.utc)
+    ]
+
+
+def make_interaction() -> SimpleNamespace:
+    return SimpleNamespace(
+        guild_id=GUILD_ID,
+        created_at=datetime(2024, 2, 1, tzinfo=timezone.utc),
+        response=SimpleNamespace(send_message=mock.AsyncMock())
+    )
+
+
+
+class SideEyeStatesTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.db = InMemoryDatabaseManager()
+        self.cog = ValCog(SimpleNamespace(db=self.db))
+
+
+    async def asyncTearDown(self):
+        self.cog.cog_unload()
+
+
+    async def total_side_eye_count_reply(self) -> str:
+        interaction = make_interaction()
+        await self.cog.total_side_eye_count.callback(self.cog, interaction)
+        return interaction.response.send_message.await_args.args[0]
+
+
+    async def test_written_side_eyes_reload_their_guild(self):
+        await self.db.insert_row('kaeley_side_eyes', make_side_eye(1, 1))
+        await self.cog.cog_load()
+        self.assertEqual(self.cog.side_eye_states[GUILD_ID].event_count, 1)
+
+        self.assertTrue(self.db.enqueue_row('kaeley_side_eyes', make_side_eye(2, 3)))
+        await self.cog._side_eye_refresh_task
+
+        side_eye_state = self.cog.side_eye_states[GUILD_ID]
+        self.assertEqual(side_eye_state.event_count, 2)
+        self.assertEqual(side_eye_state.last_event_info, (2, 2))
+        self.assertEqual(side_eye_state.longest_gap.days, 2)
+
+
+    async def test_commands_refuse_to_answer_until_loaded(self):
+        fetch_side_eye_gaps = self.db.longest_gaps_by_group
+        attempts : list[dict] = []
+
+        # the first two attempts to load the statistics fail
+        async def flaky_side_eye_gaps(**kwargs):
+            attempts.append(kwargs)
+            if len(attempts) <= 2:
+                return None
+            return await fetch_side_eye_gaps(**kwargs)
+
+        await self.db.insert_row('kaeley_side_eyes', make_side_eye(1, 1))
+
+        with mock.patch.object(self.db, 'longest_gaps_by_group', flaky_side_eye_gaps), \
+             mock.patch('Petrichor.cogs.val.SIDE_EYE_STATE_RETRY_SECONDS', 0):
+
+            await self.cog.cog_load()
+            self.assertIn('still loading', await self.total_side_eye_count_reply())
+
+            await self.cog._side_eye_refresh_task
+
+        self.assertEqual(len(attempts), 3)
+        self.assertIn('a total of 1 side eye ', await self.total_side_eye_count_reply())
+
+
+    async def test_notifications_from_other_processes_reload_the_guild(self):
+        db = SimpleNamespace(
+            dispatch_rows_changed=mock.Mock(),
+            result_cache=mock.Mock(),
+            replica_router=mock.Mock()
+        )
+        listener = CacheInvalidationListener(
+            db=db,
+            enabled=True,
+            channel='invalidations',
+            tracked_tables=('kaeley_side_eyes',),
+            reconnect_delay=1,
+            publish_delay=0
+        )
+
+        listener._on_notification(None, 0, 'invalidations', json.dumps({
+            'origin' : 'another process',
+            'kind' : 'rows',
+            'tables' : {'kaeley_side_eyes' : [str(GUILD_ID)]},
+            'sent_at' : 0
+        }))
+
+        db.dispatch_rows_changed.assert_called_once_with('kaeley_side_eyes', {str(GUILD_ID)})
+
+
+
+if __name__ == '__main__':
+    unittest.main()
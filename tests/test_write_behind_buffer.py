@@ -0,0 +1,130 @@
+"""test_write_behind_buffer.py
+
+Contains tests of buffering rows and writing them to the database in batches.
+"""
+import asyncio
+import unittest
+
+from util.write_behind_buffer import WriteBehindBuffer
+
+
+
+class FakeDatabase:
+    """
+    Class that stands in for the database connection that the buffer flushes
+    to, and records the rows that it inserted.
+    """
+
+    def __init__(self):
+        self.inserted : dict[str, list[list]] = {}
+        self.insert_started = asyncio.Event()
+        self.release_insert = asyncio.Event()
+        self.release_insert.set()
+        self.failing_tables : set[str] = set()
+
+
+    async def insert_rows(self, table_name : str, records : list[list]) -> bool:
+        self.insert_started.set()
+        await self.release_insert.wait()
+
+        if table_name in self.failing_tables:
+            raise ConnectionError('connection lost')
+
+        self.inserted.setdefault(table_name, []).extend(records)
+        return True
+
+
+
+class WriteBehindBufferTest(unittest.IsolatedAsyncioTestCase):
+
+    def make_buffer(self, db : FakeDatabase, max_queued_rows : int = 100) -> WriteBehindBuffer:
+        return WriteBehindBuffer(
+            db,
+            batch_size=2,
+            max_age=60,
+            max_queued_rows=max_queued_rows
+        )
+
+
+    async def test_stop_waits_for_the_flush_in_progress(self):
+        db = FakeDatabase()
+        db.release_insert.clear()
+        buffer = self.make_buffer(db)
+        buffer.start()
+
+        buffer.enqueue('kaeley_side_eyes', [1])
+        buffer.enqueue('kaeley_side_eyes', [2])
+        await db.insert_started.wait()
+
+        stop_task = asyncio.create_task(buffer.stop())
+        await asyncio.sleep(0)
+        buffer.enqueue('boys_who_cried', [3])
+        db.release_insert.set()
+        await stop_task
+
+        self.assertEqual(db.inserted, {'kaeley_side_eyes' : [[1], [2]], 'boys_who_cried' : [[3]]})
+        self.assertEqual(buffer.stats()['rows_flushed'], 3)
+        self.assertEqual(buffer.stats()['rows_dropped'], 0)
+
+
+    async def test_failed_insert_drops_only_its_own_rows(self):
+        db = FakeDatabase()
+        db.failing_tables.add('kaeley_side_eyes')
+        buffer = self.make_buffer(db)
+
+        buffer.enqueue('kaeley_side_eyes', [1])
+        buffer.enqueue('boys_who_cried', [2])
+        await buffer.flush()
+
+        self.assertEqual(db.inserted, {'boys_who_cried' : [[2]]})
+        self.assertEqual(buffer.stats()['rows_flushed'], 1)
+        self.assertEqual(buffer.stats()['rows_dropped'], 1)
+        self.assertEqual(buffer.stats()['queue_depth'], 0)
+
+
+    async def test_cancelled_flush_puts_its_rows_back(self):
+        db = FakeDatabase()
+        db.release_insert.clear()
+        buffer = self.make_buffer(db)
+
+        buffer.enqueue('kaeley_side_eyes', [1])
+        buffer.enqueue('boys_who_cried', [2])
+        flush_task = asyncio.create_task(buffer.flush())
+        await db.insert_started.wait()
+        buffer.enqueue('kaeley_side_eyes', [3])
+
+        flush_task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await flush_task
+
+        self.assertEqual(buffer.stats()['queue_depth'], 3)
+        self.assertEqual(buffer.stats()['rows_dropped'], 0)
+
+        db.release_insert.set()
+        await buffer.flush()
+
+        self.assertEqual(db.inserted, {'kaeley_side_eyes' : [[1], [3]], 'boys_who_cried' : [[2]]})
+
+
+    async def test_cancelled_flush_drops_rows_that_no_longer_fit(self):
+        db = FakeDatabase()
+        db.release_insert.clear()
+        buffer = self.make_buffer(db, max_queued_rows=2)
+
+        buffer.enqueue('kaeley_side_eyes', [1])
+        buffer.enqueue('kaeley_side_eyes', [2])
+        flush_task = asyncio.create_task(buffer.flush())
+        await db.insert_started.wait()
+        buffer.enqueue('kaeley_side_eyes', [3])
+
+        flush_task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await flush_task
+
+        self.assertEqual(buffer.stats()['queue_depth'], 2)
+        self.assertEqual(buffer.stats()['rows_dropped'], 1)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
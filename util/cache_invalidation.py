@@ -0,0 +1,499 @@
+"""cache_invalidation.py
+
+Contains a class that shares cache invalidations between bot processes.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+import uuid
+from collections import deque
+from json import JSONDecodeError
+
+import asyncpg
+
+from util.printing import print_petrichor_msg, print_petrichor_error
+from util.query_stats import percentile
+from util.config import CACHE_INVALIDATION_MAX_PAYLOAD_BYTES
+
+from typing import TYPE_CHECKING, Any
+if TYPE_CHECKING:
+    from asyncpg import Connection
+
+    from util.db_connection_manager import DatabaseConnectionManager
+
+
+
+class CacheInvalidationListener:
+    """
+    Class that keeps the caches of every bot process that shares a database
+    in sync, using PostgreSQL LISTEN/NOTIFY.
+
+    Writes to the tracked tables, and changes to table definitions, are
+    published on a notification channel. Each process holds a dedicated
+    connection that listens on the channel, and invalidates its own cached
+    query results and column metadata when another process publishes. The
+    rows changed listeners of the written tables are run as well, see
+    `DatabaseConnectionManager.add_rows_changed_listener`.
+
+    Writes are published once they have committed, so other processes never
+    invalidate for rolled back writes. The writes made within `publish_delay`
+    seconds of each other are coalesced per table into a single notification,
+    so that writing does not cost an extra round trip per write. Changes to
+    table definitions are rare, and are published right away.
+
+    This class should be started and stopped alongside the database connection:
+    ```
+    listener = CacheInvalidationListener(db, ...)
+    await listener.start(dsn)
+    ...
+    await listener.stop()
+    ```
+
+    Attributes
+    ----------
+    enabled : bool
+        whether invalidations are published and listened for
+    channel : str
+        the name of the notification channel
+    tracked_tables : tuple[str, ...]
+        the tables whose writes are published
+    reconnect_delay : float
+        the number of seconds between attempts to reconnect the listener
+    publish_delay : float
+        the number of seconds that written tables are collected for, before
+        they are published together
+    origin : str
+        the id of this process, used to ignore its own notifications
+    """
+
+    def __init__(
+        self,
+        db : DatabaseConnectionManager,
+        enabled : bool,
+        channel : str,
+        tracked_tables : tuple[str, ...],
+        reconnect_delay : float,
+        publish_delay : float,
+        sample_size : int = 1000
+    ):
+        """
+        Creates an instance of the CacheInvalidationListener class.
+
+        Parameters
+        ----------
+        db : DatabaseConnectionManager
+            the database connection whose caches are kept in sync
+        enabled : bool
+            whether invalidations are published and listened for
+        channel : str
+            the name of the notification channel
+        tracked_tables : tuple[str, ...]
+            the tables whose writes are published
+        reconnect_delay : float
+            the number of seconds between attempts to reconnect the listener
+        publish_delay : float
+            the number of seconds that written tables are collected for,
+            before they are published together
+        sample_size : int, default = 1000
+            the number of most recent invalidation latencies to keep for percentiles
+        """
+
+        self._db = db
+        self.enabled = enabled
+        self.channel = channel
+        self.tracked_tables = tracked_tables
+        self.reconnect_delay = reconnect_delay
+        self.publish_delay = publish_delay
+        self.origin = uuid.uuid4().hex
+
+        # table name -> written guilds waiting to be published, None for all
+        self._pending_tables : dict[str, set[str] | None] = {}
+        self._publish_task : asyncio.Task | None = None
+
+        self._dsn : str | None = None
+        self._conn : Connection | None = None
+        self._reconnect_task : asyncio.Task | None = None
+        self._stopping : bool = False
+
+        self._writes_queued : int = 0
+        self._published : int = 0
+        self._publish_errors : int = 0
+        self._received : int = 0
+        self._ignored_own : int = 0
+        self._malformed : int = 0
+        self._reconnects : int = 0
+        self._max_latency : float = 0.0
+        self._total_latency : float = 0.0
+        self._latency_samples : deque[float] = deque(maxlen=sample_size)
+
+
+    async def start(self, dsn : str) -> None:
+        """
+        Connects the dedicated listener connection, and starts listening on
+        the notification channel.
+
+        Parameters
+        ----------
+        dsn : str
+            the connection string of the database
+        """
+
+        if not self.enabled:
+            return
+
+        self._dsn = dsn
+        self._stopping = False
+
+        if not await self._listen():
+            self._schedule_reconnect()
+
+
+    async def stop(self) -> None:
+        """
+        Publishes the written tables that are still waiting, stops listening
+        on the notification channel, and closes the listener connection.
+        """
+
+        self._stopping = True
+
+        if self._publish_task is not None:
+            self._publish_task.cancel()
+            try:
+                await self._publish_task
+            except asyncio.CancelledError:
+                pass
+            self._publish_task = None
+
+        await self.publish_pending()
+
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            try:
+                await self._reconnect_task
+            except asyncio.CancelledError:
+                pass
+            self._reconnect_task = None
+
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+
+    def publish_rows_changed(
+        self,
+        table_name : str,
+        guild_ids : set[str] | None
+    ) -> None:
+        """
+        Queues that committed rows of a table were written, so that other
+        processes invalidate their cached results of the table. The table is
+        published along with every other table written to within the next
+        `publish_delay` seconds.
+
+        Parameters
+        ----------
+        table_name : str
+            the table that was written to
+        guild_ids : set[str] | None
+            the guilds that the written rows belong to, or None if the table
+            is not scoped per guild
+        """
+
+        if not self.enabled or table_name not in self.tracked_tables:
+            return
+
+        self._writes_queued += 1
+
+        if table_name in self._pending_tables and self._pending_tables[table_name] is None:
+            pass
+        elif guild_ids is None:
+            self._pending_tables[table_name] = None
+        else:
+            self._pending_tables.setdefault(table_name, set()).update(guild_ids)
+
+        if self._publish_task is None or self._publish_task.done():
+            self._publish_task = asyncio.create_task(self._publish_after_delay())
+
+
+    async def publish_pending(self) -> None:
+        """
+        Publishes every written table that is waiting to be published, in a
+        single notification.
+        """
+
+        if not self._pending_tables:
+            return
+
+        pending_tables, self._pending_tables = self._pending_tables, {}
+
+        tables : dict[str, list[str] | None] = {
+            table_name : None if guild_ids is None else sorted(guild_ids)
+            for table_name, guild_ids
+            in pending_tables.items()
+        }
+
+        # too many guilds to fit, so every guild of the tables is invalidated
+        if len(json.dumps(tables)) > CACHE_INVALIDATION_MAX_PAYLOAD_BYTES:
+            tables = dict.fromkeys(tables)
+
+        await self._publish(kind='rows', tables=tables)
+
+
+    async def _publish_after_delay(self) -> None:
+        """
+        Waits for `publish_delay` seconds, so that the writes made meanwhile
+        are coalesced, then publishes the written tables.
+        """
+
+        await asyncio.sleep(self.publish_delay)
+
+        try:
+            await self.publish_pending()
+        except Exception as e:
+            print_petrichor_error(f'Error publishing cache invalidations: {e}')
+
+
+    async def publish_schema_changed(
+        self,
+        table_name : str = None,
+        conn : Connection = None
+    ) -> None:
+        """
+        Publishes that table definitions changed, so that other processes
+        invalidate their column metadata and cached results.
+
+        Parameters
+        ----------
+        table_name : str, default = None
+            the table whose definition changed, defaults to all tables
+        conn : Connection, default = None
+            the connection that the definitions were changed on
+        """
+
+        await self._publish(
+            kind='schema',
+            tables={table_name : None} if table_name is not None else None,
+            conn=conn
+        )
+
+
+    async def _publish(
+        self,
+        kind : str,
+        tables : dict[str, list[str] | None] | None,
+        conn : Connection = None
+    ) -> None:
+        """
+        Sends an invalidation notification on the notification channel.
+
+        Parameters
+        ----------
+        kind : str
+            'rows' if rows were written, 'schema' if table definitions changed
+        tables : dict[str, list[str] | None] | None
+            mapping of the tables to invalidate to their guilds to invalidate,
+            None for all guilds | None for all tables
+        conn : Connection, default = None
+            the connection to send the notification on
+        """
+
+        if not self.enabled:
+            return
+
+        payload = json.dumps({
+            'origin' : self.origin,
+            'kind' : kind,
+            'tables' : tables,
+            'sent_at' : time.time()
+        })
+
+        if await self._db.notify(self.channel, payload, conn=conn):
+            self._published += 1
+        else:
+            self._publish_errors += 1
+
+
+    async def _listen(self) -> bool:
+        """
+        Connects the listener connection and adds the notification listener.
+
+        Returns
+        -------
+        bool
+            True, if the listener is connected |
+            False, if the connection could not be made
+        """
+
+        try:
+            self._conn = await asyncpg.connect(self._dsn)
+            await self._conn.add_listener(self.channel, self._on_notification)
+            self._conn.add_termination_listener(self._on_termination)
+
+        except Exception as e:
+            print_petrichor_error(f'Could not listen for cache invalidations: {e}')
+            self._conn = None
+            return False
+
+        print_petrichor_msg(
+            f'Listening for cache invalidations on {self.channel} | '
+            f'Origin: {self.origin}'
+        )
+        return True
+
+
+    def _schedule_reconnect(self) -> None:
+        """
+        Starts the background task that reconnects the listener connection,
+        unless it is already running.
+        """
+
+        if self._stopping:
+            return
+
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect_loop())
+
+
+    async def _reconnect_loop(self) -> None:
+        """
+        Tries to reconnect the listener connection every `reconnect_delay`
+        seconds, until it succeeds.
+        """
+
+        while True:
+            await asyncio.sleep(self.reconnect_delay)
+
+            if await self._listen():
+                self._reconnects += 1
+                # invalidations may have been missed while disconnected
+                self._db.invalidate_table_column_cache()
+                for table_name in self.tracked_tables:
+                    self._db.dispatch_rows_changed(table_name, None)
+                return
+
+
+    def _on_termination(self, connection : Connection) -> None:
+        """
+        Runs when the listener connection is closed. Any invalidation sent
+        while it is closed would be missed, so all caches are cleared, and
+        the connection is reconnected.
+
+        Parameters
+        ----------
+        connection : Connection
+            the closed listener connection
+        """
+
+        if self._stopping:
+            return
+
+        print_petrichor_error('Cache invalidation listener disconnected')
+        self._conn = None
+        self._db.invalidate_table_column_cache()
+        self._schedule_reconnect()
+
+
+    def _on_notification(
+        self,
+        connection : Connection,
+        pid : int,
+        channel : str,
+        payload : str
+    ) -> None:
+        """
+        Runs when a notification is received on the notification channel, and
+        invalidates the caches that it names.
+
+        Parameters
+        ----------
+        connection : Connection
+            the listener connection
+        pid : int
+            the id of the server process that sent the notification
+        channel : str
+            the notification channel
+        payload : str
+            the JSON payload of the notification
+        """
+
+        try:
+            invalidation : dict[str, Any] = json.loads(payload)
+            origin = invalidation['origin']
+            kind = invalidation['kind']
+            tables : dict[str, list[str] | None] | None = invalidation['tables']
+            sent_at = float(invalidation['sent_at'])
+
+            if tables is None and kind == 'rows':
+                raise ValueError('rows invalidation without tables')
+
+        except (JSONDecodeError, KeyError, TypeError, ValueError):
+            self._malformed += 1
+            print_petrichor_error(f'Malformed cache invalidation: {payload}')
+            return
+
+        if origin == self.origin:
+            self._ignored_own += 1
+            return
+
+        if kind == 'schema' and tables is None:
+            self._db.invalidate_table_column_cache()
+            self._db.replica_router.mark_written()
+
+        for table_name, guild_ids in (tables or {}).items():
+
+            if kind == 'schema':
+                self._db.invalidate_table_column_cache(table_name)
+            elif guild_ids is None:
+                self._db.result_cache.invalidate(table_name)
+            else:
+                for guild_id in guild_ids:
+                    self._db.result_cache.invalidate(table_name, guild_id)
+
+            # the replica may not have the write yet, so re-reads use the primary
+            self._db.replica_router.mark_written(table_name)
+
+            if kind == 'rows':
+                self._db.dispatch_rows_changed(
+                    table_name,
+                    None if guild_ids is None else set(guild_ids)
+                )
+
+        # sent and received by processes on the same clock in the local setup,
+        # across hosts this includes their clock skew
+        latency = max(time.time() - sent_at, 0.0)
+        self._received += 1
+        self._max_latency = max(self._max_latency, latency)
+        self._total_latency += latency
+        self._latency_samples.append(latency)
+
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Gets the statistics of the listener.
+
+        Returns
+        -------
+        dict[str, Any]
+            mapping of statistic names to their values, times are in milliseconds
+        """
+
+        return {
+            'enabled' : self.enabled,
+            'listening' : self._conn is not None and not self._conn.is_closed(),
+            'origin' : self.origin,
+            'writes_queued' : self._writes_queued,
+            'pending_tables' : len(self._pending_tables),
+            'published' : self._published,
+            'publish_errors' : self._publish_errors,
+            'received' : self._received,
+            'ignored_own' : self._ignored_own,
+            'malformed' : self._malformed,
+            'reconnects' : self._reconnects,
+            'avg_latency_ms' : round(
+                self._total_latency / self._received * 1000, 2
+            ) if self._received else 0.0,
+            'p95_latency_ms' : round(percentile(self._latency_samples, 95) * 1000, 2),
+            'max_latency_ms' : round(self._max_latency * 1000, 2)
+        }
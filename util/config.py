@@ -14,3 +14,67 @@ VC_EUOH_TYPES = Literal[
     'max moment',
     'max yapment' # cSpell:disable-line
 ]
+
+
+# write-behind buffer for high-frequency event tables
+WRITE_BEHIND_BATCH_SIZE : int = 100
+WRITE_BEHIND_MAX_AGE_SECONDS : float = 2.0
+WRITE_BEHIND_MAX_QUEUED_ROWS : int = 10_000
+
+# number of rows fetched per round trip when streaming rows with a cursor
+CURSOR_PREFETCH_ROWS : int = 500
+
+# query timing instrumentation, the threshold can be overridden with the
+# SLOW_QUERY_THRESHOLD_MS environment variable
+SLOW_QUERY_THRESHOLD_MS : float = 250.0
+QUERY_STATS_SAMPLE_SIZE : int = 1000
+
+# capture of every fetch and execute query to a JSON lines file, enabled by
+# setting the QUERY_CAPTURE_PATH environment variable to the file to write to
+QUERY_CAPTURE_FLUSH_EVERY : int = 100
+
+# message handlers, which run concurrently for every message, each cancelled
+# after its timeout
+MESSAGE_HANDLER_TIMEOUT_SECONDS : float = 10.0
+MESSAGE_HANDLER_SAMPLE_SIZE : int = 1000
+
+# database connection pool, each can be overridden with the environment
+# variable of the same name
+POSTGRES_POOL_MIN_SIZE : int = 2
+POSTGRES_POOL_MAX_SIZE : int = 10
+POSTGRES_POOL_MAX_QUERIES : int = 50_000
+POSTGRES_POOL_MAX_INACTIVE_LIFETIME : float = 300.0
+POSTGRES_STATEMENT_CACHE_SIZE : int = 100
+POSTGRES_COMMAND_TIMEOUT : float = 10.0
+POSTGRES_ACQUIRE_TIMEOUT : float = 5.0
+
+# read replica, enabled by setting the POSTGRES_REPLICA_DSN environment
+# variable. Reads of a table stay on the primary for this many seconds after
+# it is written to, which can be overridden with the environment variable of
+# the same name
+POSTGRES_REPLICA_MAX_LAG_SECONDS : float = 2.0
+
+# read-through cache of aggregate query results, each can be overridden with
+# the environment variable of the same name
+RESULT_CACHE_MAX_ENTRIES : int = 1024
+RESULT_CACHE_TTL_SECONDS : float = 300.0
+
+# cross-process cache invalidation over LISTEN/NOTIFY, enabled with the
+# CACHE_INVALIDATION_ENABLED environment variable
+CACHE_INVALIDATION_CHANNEL : str = 'petrichor_cache_invalidation'
+CACHE_INVALIDATION_TABLES : tuple[str, ...] = (
+    'roll_the_pings',
+    'roll_the_ping_counts',
+    'vc_euohs',
+    'apex_euohs',
+    'kaeley_side_eyes',
+    'boys_who_cried'
+)
+CACHE_INVALIDATION_RECONNECT_SECONDS : float = 5.0
+# writes made within this many seconds of each other are published together
+CACHE_INVALIDATION_PUBLISH_DELAY_SECONDS : float = 0.05
+# PostgreSQL rejects notification payloads of 8000 bytes or more
+CACHE_INVALIDATION_MAX_PAYLOAD_BYTES : int = 7900
+
+# seconds between attempts to load the side eye statistics, while they can't be
+SIDE_EYE_STATE_RETRY_SECONDS : float = 30.0
@@ -0,0 +1,159 @@
+"""emoji_matcher.py
+
+Contains a class that finds tracked custom emojis and stickers in messages.
+"""
+from __future__ import annotations
+
+import re
+from typing import NamedTuple
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from discord import StickerItem
+
+    from util.message_context import MessageContext
+
+
+# a custom emoji in message content, e.g. <:side_eye:123> or <a:side_eye:123>
+CUSTOM_EMOJI_PATTERN = re.compile(r'<a?:\w+:(\d+)>')
+
+
+
+def custom_emoji_ids(content : str) -> list[int]:
+    """
+    Gets the ids of the custom emojis in message content, in a single scan.
+
+    Parameters
+    ----------
+    content : str
+        the content to scan
+
+    Returns
+    -------
+    list[int]
+        the ids of the custom emojis, in the order they first appear in
+    """
+
+    # cheap check, as most messages have no custom emojis
+    if '<' not in content:
+        return []
+
+    return list(dict.fromkeys(
+        int(emoji_id)
+        for emoji_id
+        in CUSTOM_EMOJI_PATTERN.findall(content)
+    ))
+
+
+
+class EmojiMatch(NamedTuple):
+    emoji_ids: list[int]
+    sticker_ids: list[int]
+
+
+
+class EmojiMatcher:
+    """
+    Class that finds the tracked custom emojis and stickers of a message, e.g.
+    kaeley's side eyes. Every custom emoji in the content is found in a single
+    scan with a precompiled pattern, see `custom_emoji_ids`, and each is then
+    checked against the set of tracked ids, so the cost of a match does not
+    grow with the number of tracked emojis.
+
+    Attributes
+    ----------
+    emoji_ids : frozenset[int]
+        the ids of the tracked custom emojis
+    sticker_ids : frozenset[int]
+        the ids of the tracked stickers
+    """
+
+    def __init__(
+        self,
+        emoji_ids : Iterable[int],
+        sticker_ids : Iterable[int] = ()
+    ):
+        """
+        Creates an instance of the EmojiMatcher class.
+
+        Parameters
+        ----------
+        emoji_ids : Iterable[int]
+            the ids of the custom emojis to track
+        sticker_ids : Iterable[int], default = ()
+            the ids of the stickers to track
+        """
+
+        self.emoji_ids = frozenset(emoji_ids)
+        self.sticker_ids = frozenset(sticker_ids)
+
+
+    def match_emojis(self, emoji_ids : Iterable[int]) -> list[int]:
+        """
+        Gets the tracked custom emojis among the custom emojis of a message.
+
+        Parameters
+        ----------
+        emoji_ids : Iterable[int]
+            the ids of the custom emojis of the message, e.g. from
+            `custom_emoji_ids`
+
+        Returns
+        -------
+        list[int]
+            the ids of the tracked emojis, in the order they were given in
+        """
+
+        return [
+            emoji_id
+            for emoji_id
+            in emoji_ids
+            if emoji_id in self.emoji_ids
+        ]
+
+
+    def match_stickers(self, stickers : Iterable[StickerItem]) -> list[int]:
+        """
+        Gets the tracked stickers of a message.
+
+        Parameters
+        ----------
+        stickers : Iterable[StickerItem]
+            the stickers of the message
+
+        Returns
+        -------
+        list[int]
+            the ids of the tracked stickers
+        """
+
+        return [
+            sticker.id
+            for sticker
+            in stickers
+            if sticker.id in self.sticker_ids
+        ]
+
+
+    def match(self, context : MessageContext) -> EmojiMatch:
+        """
+        Gets the tracked custom emojis and stickers of a message.
+
+        Parameters
+        ----------
+        context : MessageContext
+            the context of the message to check, whose custom emojis are
+            shared with the other handlers of the message
+
+        Returns
+        -------
+        EmojiMatch
+            the ids of the tracked emojis and stickers in the message
+        """
+
+        return EmojiMatch(
+            emoji_ids=self.match_emojis(context.custom_emoji_ids),
+            sticker_ids=self.match_stickers(context.message.stickers)
+        )
@@ -102,3 +102,85 @@ def get_list(key : str) -> list | None:
         print_petrichor_error('Could not decode JSON')
 
     return
+
+
+def get_int(key : str, default : int) -> int:
+    """
+    Gets an integer from the .env file with the given key, or the given
+    default if the key does not exist.
+
+    Parameters
+    ----------
+    key : str
+        the key of the environment variable to search for
+    default : int
+        the value to return if the key does not exist
+
+    Returns
+    -------
+    int
+        the integer that was obtained | 
+        the default if the key does not exist
+    """
+
+    value = os.getenv(key)
+
+    if not value:
+        return default
+    
+    return int(value)
+
+
+def get_float(key : str, default : float) -> float:
+    """
+    Gets a float from the .env file with the given key, or the given
+    default if the key does not exist.
+
+    Parameters
+    ----------
+    key : str
+        the key of the environment variable to search for
+    default : float
+        the value to return if the key does not exist
+
+    Returns
+    -------
+    float
+        the float that was obtained | 
+        the default if the key does not exist
+    """
+
+    value = os.getenv(key)
+
+    if not value:
+        return default
+    
+    return float(value)
+
+
+def get_bool(key : str, default : bool) -> bool:
+    """
+    Gets a boolean from the .env file with the given key, or the given
+    default if the key does not exist. The values `true`, `yes` and `1`
+    are True, any other value is False.
+
+    Parameters
+    ----------
+    key : str
+        the key of the environment variable to search for
+    default : bool
+        the value to return if the key does not exist
+
+    Returns
+    -------
+    bool
+        the boolean that was obtained | 
+        the default if the key does not exist
+    """
+
+    value = os.getenv(key)
+
+    if not value:
+        return default
+
+    return value.strip().lower() in ('true', 'yes', '1')
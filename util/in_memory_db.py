@@ -0,0 +1,1283 @@
+"""in_memory_db.py
+
+Contains a class that stores the database tables in memory.
+"""
+from __future__ import annotations
+
+import operator
+import time
+from collections.abc import Callable
+from contextlib import asynccontextmanager, nullcontext
+
+from util.printing import print_petrichor_msg, print_petrichor_error
+from util.query_stats import QueryStatsRecorder
+from util.config import QUERY_STATS_SAMPLE_SIZE
+from Petrichor.migration_runner import load_schema
+
+from typing import TYPE_CHECKING, Any
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+    from contextlib import AbstractContextManager
+
+    from Petrichor.migration_runner import TableSchema
+
+
+# table name -> definition of the table, as of the latest migration. Built
+# from the migration files, so the in-memory schema can't drift from the
+# PostgreSQL one
+IN_MEMORY_TABLES : dict[str, TableSchema] = load_schema()
+
+# table name -> insertable column names -> PostgreSQL data types
+IN_MEMORY_SCHEMA : dict[str, dict[str, str]] = {
+    table_name : table_schema.columns
+    for table_name, table_schema
+    in IN_MEMORY_TABLES.items()
+}
+
+# table name -> primary key column names
+IN_MEMORY_PRIMARY_KEYS : dict[str, tuple[str, ...]] = {
+    table_name : table_schema.primary_key
+    for table_name, table_schema
+    in IN_MEMORY_TABLES.items()
+    if table_schema.primary_key
+}
+
+# table name -> column name -> default value
+IN_MEMORY_DEFAULTS : dict[str, dict[str, Any]] = {
+    table_name : table_schema.defaults
+    for table_name, table_schema
+    in IN_MEMORY_TABLES.items()
+    if table_schema.defaults
+}
+
+
+
+class InMemoryDatabaseManager:
+    """
+    Class that stores the database tables in memory, behind the same interface
+    as `DatabaseConnectionManager`. Used to run and benchmark the cogs without
+    a PostgreSQL server, so that only the time spent in python is measured.
+
+    Rows are returned as dicts, which support the same `row['column']` access
+    as asyncpg Records. Transactions are accepted, but are not isolated and
+    are never rolled back, and SQL scripts can not be run.
+
+    This class should only be run in the `async with` statement, like so:
+    ```
+    async with InMemoryDatabaseManager() as db:
+        pass
+    ```
+
+    Attributes
+    ----------
+    query_stats : QueryStatsRecorder
+        recorder of the timings of every operation run by the manager
+    FILTER_OPERATORS : dict[str, Callable[[Any, Any], bool]]
+        mapping of the comparison operators that can be used in filters to
+        the functions that apply them
+    SUPPORTS_SQL_SCRIPTS : bool
+        whether SQL scripts can be run, never the case in memory
+    """
+
+    FILTER_OPERATORS : dict[str, Callable[[Any, Any], bool]] = {
+        '=' : operator.eq,
+        '!=' : operator.ne,
+        '<' : operator.lt,
+        '<=' : operator.le,
+        '>' : operator.gt,
+        '>=' : operator.ge
+    }
+    SUPPORTS_SQL_SCRIPTS : bool = False
+
+    def __init__(self):
+        # table name -> rows of the table
+        self._tables : dict[str, list[dict[str, Any]]] = {
+            table_name : []
+            for table_name
+            in IN_MEMORY_SCHEMA
+        }
+
+        # table name -> primary key -> row, for the tables with a primary key
+        self._primary_key_indexes : dict[str, dict[tuple, dict[str, Any]]] = {
+            table_name : {}
+            for table_name
+            in IN_MEMORY_PRIMARY_KEYS
+        }
+
+        # table name -> listeners run whenever rows of the table are written
+        self._rows_changed_listeners : dict[
+            str, list[Callable[[set[str] | None], None]]
+        ] = {}
+
+        # every operation is timed, but never logged as slow
+        self.query_stats = QueryStatsRecorder(
+            slow_query_threshold=float('inf'),
+            sample_size=QUERY_STATS_SAMPLE_SIZE
+        )
+
+
+    async def __aenter__(self):
+        print_petrichor_msg('Using the in-memory database')
+        return self
+
+
+    async def __aexit__(self, *args, **kwargs):
+        pass
+
+
+
+    async def ping_tables(self) -> None:
+        """
+        Displays the names of the tables in the in-memory database.
+        """
+        print_petrichor_msg(f'Tables: {list(self._tables)}')
+
+
+    async def run_migrations(self) -> None:
+        """
+        Does nothing, as the in-memory schema is built from the migrations.
+        """
+        print_petrichor_msg('in-memory database, schema built from the migrations')
+
+
+    async def prewarm_table_column_cache(self) -> None:
+        """
+        Does nothing, as the in-memory schema is always loaded.
+        """
+
+
+    def invalidate_table_column_cache(self, table_name : str = None) -> None:
+        """
+        Does nothing, as the in-memory schema never changes.
+
+        Parameters
+        ----------
+        table_name : str, default = None
+            the table to invalidate the metadata of
+        """
+
+
+    def add_rows_changed_listener(
+        self,
+        table_name : str,
+        listener : Callable[[set[str] | None], None]
+    ) -> None:
+        """
+        Adds a listener that runs whenever rows of a table are written, see
+        `DatabaseConnectionManager.add_rows_changed_listener`.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table to listen for writes to
+        listener : Callable[[set[str] | None], None]
+            the function to run with the guilds that the written rows belong
+            to, or None if they may belong to any guild
+        """
+
+        self._rows_changed_listeners.setdefault(table_name, []).append(listener)
+
+
+    def remove_rows_changed_listener(
+        self,
+        table_name : str,
+        listener : Callable[[set[str] | None], None]
+    ) -> None:
+        """
+        Removes a listener added with `add_rows_changed_listener`.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table that the listener listens for writes to
+        listener : Callable[[set[str] | None], None]
+            the listener to remove
+        """
+
+        listeners = self._rows_changed_listeners.get(table_name, [])
+        if listener in listeners:
+            listeners.remove(listener)
+
+
+    def dispatch_rows_changed(
+        self,
+        table_name : str,
+        guild_ids : set[str] | None
+    ) -> None:
+        """
+        Runs the listeners of a table whose rows were written.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table that was written to
+        guild_ids : set[str] | None
+            the guilds that the written rows belong to, or None if they may
+            belong to any guild
+        """
+
+        for listener in list(self._rows_changed_listeners.get(table_name, [])):
+            try:
+                listener(guild_ids)
+            except Exception as e:
+                print_petrichor_error(
+                    f'Error running rows changed listener of {table_name}: {e}'
+                )
+
+
+    def diagnostics(self) -> dict[str, dict[str, Any]]:
+        """
+        Gets the statistics of the in-memory database.
+
+        Returns
+        -------
+        dict[str, dict[str, Any]]
+            mapping of component names to their statistics
+        """
+
+        return {
+            'tables' : {
+                table_name : len(rows)
+                for table_name, rows
+                in self._tables.items()
+            },
+            'queries' : self.query_stats.stats()
+        }
+
+
+    async def insert_row(
+        self,
+        table_name : str,
+        record_info : list,
+        conn : Any = None
+    ) -> bool:
+        """
+        Inserts a row into a given table, see `DatabaseConnectionManager.insert_row`.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table to insert the row into
+        record_info : list
+            the data to insert into the table
+        conn : Any, default = None
+            unused, accepted for compatibility
+
+        Returns
+        -------
+        bool
+            True, if the row was successfully inserted |
+            False, if the table does not exist or the primary key is taken
+        """
+
+        return await self.insert_rows(table_name, [record_info])
+
+
+    def enqueue_row(
+        self,
+        table_name : str,
+        record_info : list
+    ) -> bool:
+        """
+        Inserts a row into a given table right away, as there is nothing to
+        gain from buffering in-memory inserts.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table to insert the row into
+        record_info : list
+            the data to insert into the table
+
+        Returns
+        -------
+        bool
+            True, if the row was successfully inserted |
+            False, if the table does not exist or the primary key is taken
+        """
+
+        operation_start = time.perf_counter()
+        rows = self._build_rows(table_name, [record_info])
+
+        if rows is None:
+            return False
+
+        self._store_rows(table_name, rows)
+        self._record('enqueue', table_name, operation_start, len(rows))
+        self.dispatch_rows_changed(table_name, self._get_row_guild_ids(table_name, rows))
+        return True
+
+
+    async def flush_writes(self) -> None:
+        """
+        Does nothing, as rows are never buffered.
+        """
+
+
+    async def insert_rows(
+        self,
+        table_name : str,
+        records : list[list]
+    ) -> bool:
+        """
+        Inserts multiple rows into a given table, see
+        `DatabaseConnectionManager.insert_rows`. Either all rows are inserted,
+        or none are.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table to insert the rows into
+        records : list[list]
+            the data of each row to insert into the table
+
+        Returns
+        -------
+        bool
+            True, if all rows were successfully inserted |
+            False, if the table does not exist or a primary key is taken
+        """
+
+        operation_start = time.perf_counter()
+        rows = self._build_rows(table_name, records)
+
+        if rows is None:
+            return False
+
+        self._store_rows(table_name, rows)
+        self._record('insert', table_name, operation_start, len(rows))
+        self.dispatch_rows_changed(table_name, self._get_row_guild_ids(table_name, rows))
+        return True
+
+
+    async def increment_counters(
+        self,
+        table_name : str,
+        key : dict[str, Any],
+        increments : dict[str, int],
+        conn : Any = None
+    ) -> bool:
+        """
+        Adds to the counter columns of the row of a given table with the given
+        key, see `DatabaseConnectionManager.increment_counters`.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the summary table
+        key : dict[str, Any]
+            mapping of the key column names to the key of the row
+        increments : dict[str, int]
+            mapping of counter column names to the amounts to add to them
+        conn : Any, default = None
+            unused, accepted for compatibility
+
+        Returns
+        -------
+        bool
+            True, if the counters were successfully updated |
+            False, if the table does not exist or the key is not its primary key
+        """
+
+        operation_start = time.perf_counter()
+
+        primary_key_columns = IN_MEMORY_PRIMARY_KEYS.get(table_name)
+        if primary_key_columns is None or set(primary_key_columns) != set(key):
+            print_petrichor_error(
+                f'Error updating counters of {table_name}: '
+                f'{list(key)} is not its primary key'
+            )
+            return False
+
+        column_data_types = IN_MEMORY_SCHEMA[table_name]
+        key = {
+            column_name : self._bind_value(column_data_types.get(column_name), value)
+            for column_name, value
+            in key.items()
+        }
+        primary_key = tuple(key[column_name] for column_name in primary_key_columns)
+
+        row = self._primary_key_indexes[table_name].get(primary_key)
+        if row is None:
+            row = {
+                column_name : IN_MEMORY_DEFAULTS.get(table_name, {}).get(column_name)
+                for column_name
+                in column_data_types
+            }
+            row.update(key)
+            row.update(increments)
+            self._store_rows(table_name, [row])
+        else:
+            for column_name, increment in increments.items():
+                row[column_name] = (row[column_name] or 0) + increment
+
+        self._record('increment', table_name, operation_start, 1)
+        self.dispatch_rows_changed(table_name, self._get_row_guild_ids(table_name, [row]))
+        return True
+
+
+    async def fetch_rows(
+        self,
+        table_name : str,
+        columns : str | list[str] = None,
+        where : dict[str, Any] = None,
+        group_by : str | list[str] = None,
+        order_by : str | list[str] = None,
+        order_by_ascending : bool = True,
+        distinct : bool = False,
+        limit : int = None,
+        cache : bool = False,
+        conn : Any = None
+    ) -> list[dict[str, Any]] | None:
+        """
+        Fetches all rows from a given table that match the search criteria,
+        see `DatabaseConnectionManager.fetch_rows`. Only plain column names are
+        supported, grouping without an aggregate selects the distinct groups.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table to select from
+        columns : str | list[str], default = None
+            the column(s) to include in the search, defaults to all columns
+        where : dict[str, Any], default = None
+            mapping of column names to the filters that all selected rows must
+            match
+        group_by : str | list[str], default = None
+            the column(s) to group the results by
+        order_by : str | list[str], default = None
+            the column(s) to order the results by
+        order_by_ascending : bool, default = True
+            if True, results are sorting in ascending order |
+            if False, results are sorting in descending order
+        distinct : bool, default = False
+            if True, only selects distinct rows
+        limit : int, default = None
+            the maximum number of results to fetch, defaults to all valid rows
+        cache : bool, default = False
+            unused, accepted for compatibility
+        conn : Any, default = None
+            unused, accepted for compatibility
+
+        Returns
+        -------
+        list[dict[str, Any]]
+            the rows found in the search |
+            None, if the table does not exist or the search is not supported
+        """
+
+        operation_start = time.perf_counter()
+
+        rows = self._select_rows(table_name, where)
+        if rows is None:
+            return None
+
+        if isinstance(columns, str): columns = [columns]
+        if isinstance(group_by, str): group_by = [group_by]
+        columns = columns or list(IN_MEMORY_SCHEMA[table_name])
+
+        if any(column_name not in IN_MEMORY_SCHEMA[table_name] for column_name in columns):
+            print_petrichor_error(
+                f'Only plain columns of {table_name} can be fetched from the '
+                f'in-memory database, got {columns}'
+            )
+            return None
+
+        rows = self._order_rows(rows, order_by, order_by_ascending)
+        result = [
+            {column_name : row[column_name] for column_name in columns}
+            for row
+            in rows
+        ]
+
+        if distinct or group_by:
+            unique_rows : dict[tuple, dict[str, Any]] = {}
+            for row in result:
+                unique_rows.setdefault(tuple(row.values()), row)
+            result = list(unique_rows.values())
+
+        if limit is not None:
+            result = result[:limit]
+
+        self._record('fetch', table_name, operation_start, len(result))
+        return result
+
+
+    @asynccontextmanager
+    async def iter_rows(
+        self,
+        table_name : str,
+        columns : str | list[str] = None,
+        where : dict[str, Any] = None,
+        order_by : str | list[str] = None,
+        order_by_ascending : bool = True,
+        prefetch : int = None,
+        conn : Any = None
+    ) -> AsyncIterator[AsyncIterator[dict[str, Any]]]:
+        """
+        Streams the rows from a given table that match the search criteria,
+        see `DatabaseConnectionManager.iter_rows`.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table to select from
+        columns : str | list[str], default = None
+            the column(s) to include in the search, defaults to all columns
+        where : dict[str, Any], default = None
+            mapping of column names to the filters that all selected rows must
+            match
+        order_by : str | list[str], default = None
+            the column(s) to order the results by
+        order_by_ascending : bool, default = True
+            if True, results are sorting in ascending order |
+            if False, results are sorting in descending order
+        prefetch : int, default = None
+            unused, accepted for compatibility
+        conn : Any, default = None
+            unused, accepted for compatibility
+
+        Yields
+        ------
+        AsyncIterator[dict[str, Any]]
+            each row found in the search
+        """
+
+        rows = await self.fetch_rows(
+            table_name=table_name,
+            columns=columns,
+            where=where,
+            order_by=order_by,
+            order_by_ascending=order_by_ascending
+        )
+
+        async def stream_rows() -> AsyncIterator[dict[str, Any]]:
+            for row in rows or []:
+                yield row
+
+        records = stream_rows()
+        try:
+            yield records
+        finally:
+            await records.aclose()
+
+
+    async def count_rows(
+        self,
+        table_name : str,
+        where : dict[str, Any] = None,
+        conn : Any = None
+    ) -> int | None:
+        """
+        Counts the rows of a given table that match the search criteria.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table to count the rows of
+        where : dict[str, Any], default = None
+            mapping of column names to the filters that all counted rows must
+            match
+        conn : Any, default = None
+            unused, accepted for compatibility
+
+        Returns
+        -------
+        int
+            the number of matching rows |
+            None, if the table does not exist
+        """
+
+        operation_start = time.perf_counter()
+
+        rows = self._select_rows(table_name, where)
+        if rows is None:
+            return None
+
+        self._record('count', table_name, operation_start, 1)
+        return len(rows)
+
+
+    async def count_rows_by_group(
+        self,
+        table_name : str,
+        group_by : str | list[str],
+        where : dict[str, Any] = None,
+        count_alias : str = 'row_count',
+        ascending : bool = False,
+        limit : int = None,
+        cache : bool = False,
+        conn : Any = None
+    ) -> list[dict[str, Any]] | None:
+        """
+        Counts the rows of a given table that match the search criteria, per
+        group of the given column(s), see
+        `DatabaseConnectionManager.count_rows_by_group`.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table to count the rows of
+        group_by : str | list[str]
+            the column(s) to group the rows by
+        where : dict[str, Any], default = None
+            mapping of column names to the filters that all counted rows must
+            match
+        count_alias : str, default = 'row_count'
+            the name of the column that holds the count of each group
+        ascending : bool, default = False
+            if True, groups are ordered from least to most rows |
+            if False, groups are ordered from most to least rows
+        limit : int, default = None
+            the maximum number of groups to fetch, defaults to all groups
+        cache : bool, default = False
+            unused, accepted for compatibility
+        conn : Any, default = None
+            unused, accepted for compatibility
+
+        Returns
+        -------
+        list[dict[str, Any]]
+            one row per group, holding the group column(s) and the count |
+            None, if the table does not exist
+        """
+
+        operation_start = time.perf_counter()
+
+        rows = self._select_rows(table_name, where)
+        if rows is None:
+            return None
+
+        if isinstance(group_by, str): group_by = [group_by]
+
+        group_counts : dict[tuple, int] = {}
+        for row in rows:
+            group = tuple(row[column_name] for column_name in group_by)
+            group_counts[group] = group_counts.get(group, 0) + 1
+
+        result = [
+            {count_alias : group_count, **dict(zip(group_by, group))}
+            for group, group_count
+            in sorted(
+                group_counts.items(),
+                key=lambda group_count: group_count[1],
+                reverse=not ascending
+            )
+        ]
+
+        if limit is not None:
+            result = result[:limit]
+
+        self._record('count_by_group', table_name, operation_start, len(result))
+        return result
+
+
+    async def min_value(
+        self,
+        table_name : str,
+        column : str,
+        where : dict[str, Any] = None,
+        conn : Any = None
+    ) -> Any:
+        """
+        Gets the smallest value of a column amongst the rows of a given table
+        that match the search criteria.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table to search
+        column : str
+            the column to get the smallest value of
+        where : dict[str, Any], default = None
+            mapping of column names to the filters that all searched rows must
+            match
+        conn : Any, default = None
+            unused, accepted for compatibility
+
+        Returns
+        -------
+        Any
+            the smallest value |
+            None, if no rows match or the table does not exist
+        """
+
+        values = [
+            row[column]
+            for row
+            in self._select_rows(table_name, where) or []
+            if row[column] is not None
+        ]
+        return min(values) if values else None
+
+
+    async def max_value(
+        self,
+        table_name : str,
+        column : str,
+        where : dict[str, Any] = None,
+        conn : Any = None
+    ) -> Any:
+        """
+        Gets the largest value of a column amongst the rows of a given table
+        that match the search criteria.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table to search
+        column : str
+            the column to get the largest value of
+        where : dict[str, Any], default = None
+            mapping of column names to the filters that all searched rows must
+            match
+        conn : Any, default = None
+            unused, accepted for compatibility
+
+        Returns
+        -------
+        Any
+            the largest value |
+            None, if no rows match or the table does not exist
+        """
+
+        values = [
+            row[column]
+            for row
+            in self._select_rows(table_name, where) or []
+            if row[column] is not None
+        ]
+        return max(values) if values else None
+
+
+    async def longest_gaps_by_group(
+        self,
+        table_name : str,
+        time_column : str,
+        group_by : str,
+        where : dict[str, Any] = None,
+        conn : Any = None
+    ) -> list[dict[str, Any]] | None:
+        """
+        Gets the gap statistics of the events recorded in a given table, per
+        group of the given column, see
+        `DatabaseConnectionManager.longest_gaps_by_group`.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table that holds the events
+        time_column : str
+            the column that holds the time of each event
+        group_by : str
+            the column to group the events by
+        where : dict[str, Any], default = None
+            mapping of column names to the filters that all events must match
+        conn : Any, default = None
+            unused, accepted for compatibility
+
+        Returns
+        -------
+        list[dict[str, Any]]
+            the gap statistics of the events of each group |
+            None, if the table does not exist
+        """
+
+        operation_start = time.perf_counter()
+
+        rows = self._select_rows(table_name, where)
+        if rows is None:
+            return None
+
+        group_event_times : dict[Any, list[Any]] = {}
+        for row in rows:
+            if row[time_column] is not None:
+                group_event_times.setdefault(row[group_by], []).append(row[time_column])
+
+        result = []
+        for group, event_times in group_event_times.items():
+            gap_stats = self._get_gap_stats(sorted(event_times))
+            result.append({group_by : group, **gap_stats})
+
+        self._record('longest_gaps_by_group', table_name, operation_start, len(result))
+        return result
+
+
+    async def latest_rows_by_group(
+        self,
+        table_name : str,
+        columns : list[str],
+        group_by : str,
+        order_by : str,
+        where : dict[str, Any] = None,
+        conn : Any = None
+    ) -> list[dict[str, Any]] | None:
+        """
+        Gets the latest row of each group of the given column in a given
+        table, see `DatabaseConnectionManager.latest_rows_by_group`.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table to select from
+        columns : list[str]
+            the columns of the latest rows to include
+        group_by : str
+            the column to group the rows by
+        order_by : str
+            the column that orders the rows of a group, the row with its
+            greatest value is the latest
+        where : dict[str, Any], default = None
+            mapping of column names to the filters that all rows must match
+        conn : Any, default = None
+            unused, accepted for compatibility
+
+        Returns
+        -------
+        list[dict[str, Any]]
+            the group column and the given columns of the latest row of each
+            group |
+            None, if the table does not exist
+        """
+
+        operation_start = time.perf_counter()
+
+        rows = self._select_rows(table_name, where)
+        if rows is None:
+            return None
+
+        latest_rows : dict[Any, dict[str, Any]] = {}
+        for row in rows:
+            if row[order_by] is None:
+                latest_rows.setdefault(row[group_by], row)
+                continue
+
+            latest_row = latest_rows.get(row[group_by])
+            if latest_row is None or latest_row[order_by] is None \
+               or row[order_by] > latest_row[order_by]:
+                latest_rows[row[group_by]] = row
+
+        result = [
+            {group_by : group, **{column : row[column] for column in columns}}
+            for group, row
+            in latest_rows.items()
+        ]
+
+        self._record('latest_rows_by_group', table_name, operation_start, len(result))
+        return result
+
+
+    @asynccontextmanager
+    async def read_session(self, snapshot : bool = False) -> AsyncIterator[None]:
+        """
+        Yields no connection, as in-memory reads don't need one.
+
+        Parameters
+        ----------
+        snapshot : bool, default = False
+            unused, accepted for compatibility
+        """
+
+        yield None
+
+
+    def read_your_writes(self) -> AbstractContextManager[None]:
+        """
+        Returns a context that does nothing, as in-memory reads always see
+        the latest writes.
+        """
+
+        return nullcontext()
+
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        """
+        Yields no connection, as in-memory writes don't need one. The writes
+        made in the transaction are not rolled back if it fails.
+        """
+
+        yield None
+
+
+    async def run_script(self, script : str, conn : Any = None) -> bool:
+        """
+        Fails to run an SQL script, as the in-memory database can't run SQL.
+
+        Parameters
+        ----------
+        script : str
+            the SQL statements to run
+        conn : Any, default = None
+            unused, accepted for compatibility
+
+        Returns
+        -------
+        bool
+            False, always
+        """
+
+        print_petrichor_error('SQL scripts can not be run on the in-memory database')
+        return False
+
+
+    async def run_data_script(
+        self,
+        script : str,
+        table_names : list[str],
+        conn : Any = None
+    ) -> bool:
+        """
+        Fails to run an SQL script, as the in-memory database can't run SQL.
+
+        Parameters
+        ----------
+        script : str
+            the SQL statements to run
+        table_names : list[str]
+            the tables whose rows the script changes
+        conn : Any, default = None
+            unused, accepted for compatibility
+
+        Returns
+        -------
+        bool
+            False, always
+        """
+
+        print_petrichor_error('SQL scripts can not be run on the in-memory database')
+        return False
+
+
+    async def explain_analyze(self, query : str, conn : Any = None) -> None:
+        """
+        Fails to explain a query, as the in-memory database can't run SQL.
+
+        Parameters
+        ----------
+        query : str
+            the query to explain
+        conn : Any, default = None
+            unused, accepted for compatibility
+
+        Returns
+        -------
+        None
+            always
+        """
+
+        return None
+
+
+    def _build_rows(
+        self,
+        table_name : str,
+        records : list[list]
+    ) -> list[dict[str, Any]] | None:
+        """
+        Builds the rows to insert into a given table, and checks that their
+        primary keys are not taken.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table to insert the rows into
+        records : list[list]
+            the data of each row, in the order of the insertable columns
+
+        Returns
+        -------
+        list[dict[str, Any]]
+            the rows to insert |
+            None, if the table does not exist or a primary key is taken
+        """
+
+        column_data_types = IN_MEMORY_SCHEMA.get(table_name)
+        if column_data_types is None:
+            print_petrichor_error(f'Table {table_name} does not exist')
+            return None
+
+        rows = [
+            {
+                column_name : self._bind_value(data_type, data)
+                for (column_name, data_type), data
+                in zip(column_data_types.items(), record_info)
+            }
+            for record_info
+            in records
+        ]
+
+        primary_key_columns = IN_MEMORY_PRIMARY_KEYS.get(table_name)
+        if primary_key_columns is None:
+            return rows
+
+        primary_key_index = self._primary_key_indexes[table_name]
+        primary_keys = [
+            tuple(row.get(column_name) for column_name in primary_key_columns)
+            for row
+            in rows
+        ]
+
+        if len(set(primary_keys)) != len(primary_keys) \
+           or any(primary_key in primary_key_index for primary_key in primary_keys):
+            print_petrichor_error(
+                f'Error inserting rows into {table_name}: duplicate primary key'
+            )
+            return None
+
+        return rows
+
+
+    def _store_rows(self, table_name : str, rows : list[dict[str, Any]]) -> None:
+        """
+        Adds rows to a given table, and to its primary key index.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table to add the rows to
+        rows : list[dict[str, Any]]
+            the rows to add
+        """
+
+        self._tables[table_name].extend(rows)
+
+        primary_key_columns = IN_MEMORY_PRIMARY_KEYS.get(table_name)
+        if primary_key_columns is None:
+            return
+
+        for row in rows:
+            primary_key = tuple(row.get(column_name) for column_name in primary_key_columns)
+            self._primary_key_indexes[table_name][primary_key] = row
+
+
+    def _get_row_guild_ids(
+        self,
+        table_name : str,
+        rows : list[dict[str, Any]]
+    ) -> set[str] | None:
+        """
+        Gets the guilds that the given rows of a table belong to.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table that the rows belong to
+        rows : list[dict[str, Any]]
+            the rows to get the guilds of
+
+        Returns
+        -------
+        set[str]
+            the ids of the guilds that the rows belong to |
+            None, if the table is not scoped per guild
+        """
+
+        if 'guild_id' not in IN_MEMORY_SCHEMA[table_name]:
+            return None
+
+        return {str(row['guild_id']) for row in rows}
+
+
+    def _select_rows(
+        self,
+        table_name : str,
+        where : dict[str, Any] | None
+    ) -> list[dict[str, Any]] | None:
+        """
+        Gets the rows of a given table that match the given filters.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table to select from
+        where : dict[str, Any] | None
+            mapping of column names to their filters, where a filter is either
+            a value that the column must be equal to, or an `(operator, value)`
+            tuple to compare the column with
+
+        Returns
+        -------
+        list[dict[str, Any]]
+            the matching rows |
+            None, if the table does not exist or a filter is not supported
+
+        Raises
+        ------
+        ValueError
+            if a filter uses an operator that is not in `FILTER_OPERATORS`
+        """
+
+        rows = self._tables.get(table_name)
+        if rows is None:
+            print_petrichor_error(f'Table {table_name} does not exist')
+            return None
+
+        if not where:
+            return list(rows)
+
+        if isinstance(where, str):
+            print_petrichor_error('Raw WHERE clauses are not supported in memory')
+            return None
+
+        column_data_types = IN_MEMORY_SCHEMA[table_name]
+        filters : list[tuple[str, Callable[[Any, Any], bool], Any]] = []
+        for column_name, value in where.items():
+
+            filter_operator = '='
+            if isinstance(value, tuple):
+                filter_operator, value = value
+
+            if filter_operator not in self.FILTER_OPERATORS:
+                raise ValueError(f'Unsupported filter operator: {filter_operator}')
+
+            filters.append((
+                column_name,
+                self.FILTER_OPERATORS[filter_operator],
+                self._bind_value(column_data_types.get(column_name), value)
+            ))
+
+        # like SQL, comparisons with NULL never match
+        return [
+            row
+            for row
+            in rows
+            if all(
+                row[column_name] is not None
+                and value is not None
+                and compare(row[column_name], value)
+                for column_name, compare, value
+                in filters
+            )
+        ]
+
+
+    def _order_rows(
+        self,
+        rows : list[dict[str, Any]],
+        order_by : str | list[str] | None,
+        ascending : bool
+    ) -> list[dict[str, Any]]:
+        """
+        Orders rows by the given column(s). Like PostgreSQL, NULLs are ordered
+        last in ascending order, and first in descending order.
+
+        Parameters
+        ----------
+        rows : list[dict[str, Any]]
+            the rows to order
+        order_by : str | list[str] | None
+            the column(s) to order the rows by, if any
+        ascending : bool
+            if True, rows are sorted in ascending order |
+            if False, rows are sorted in descending order
+
+        Returns
+        -------
+        list[dict[str, Any]]
+            the ordered rows
+        """
+
+        if not order_by:
+            return rows
+
+        if isinstance(order_by, str): order_by = [order_by]
+
+        return sorted(
+            rows,
+            key=lambda row: tuple(
+                (row[column_name] is None, row[column_name])
+                for column_name
+                in order_by
+            ),
+            reverse=not ascending
+        )
+
+
+    def _get_gap_stats(self, event_times : list[Any]) -> dict[str, Any]:
+        """
+        Gets the gap statistics of the given event times.
+
+        Parameters
+        ----------
+        event_times : list[Any]
+            the times of the events, in ascending order
+
+        Returns
+        -------
+        dict[str, Any]
+            the `event_count`, `first_event_time`, `last_event_time`,
+            `average_gap` and `longest_gap` of the events
+        """
+
+        gaps = [
+            later_time - earlier_time
+            for earlier_time, later_time
+            in zip(event_times, event_times[1:])
+        ]
+
+        return {
+            'event_count' : len(event_times),
+            'first_event_time' : event_times[0] if event_times else None,
+            'last_event_time' : event_times[-1] if event_times else None,
+            'average_gap' : sum(gaps[1:], gaps[0]) / len(gaps) if gaps else None,
+            'longest_gap' : max(gaps) if gaps else None
+        }
+
+
+    def _bind_value(self, data_type : str | None, data : Any) -> Any:
+        """
+        Converts the given data to the python type that its column holds, see
+        `DatabaseConnectionManager._bind_value`.
+
+        Parameters
+        ----------
+        data_type : str | None
+            the PostgreSQL data type of the column
+        data : Any
+            the given data
+
+        Returns
+        -------
+        Any
+            the data, converted to the column type if necessary
+        """
+
+        if data is None: return None
+
+        if data_type == 'text' and not isinstance(data, str):
+            return str(data)
+
+        if data_type in ('integer', 'bigint') and isinstance(data, str):
+            return int(data)
+
+        return data
+
+
+    def _record(
+        self,
+        operation : str,
+        table_name : str,
+        operation_start : float,
+        rows : int
+    ) -> None:
+        """
+        Records the timing of an operation, grouped by the operation and table.
+
+        Parameters
+        ----------
+        operation : str
+            the name of the operation
+        table_name : str
+            the name of the table that the operation ran on
+        operation_start : float
+            the `time.perf_counter()` value from when the operation started
+        rows : int
+            the number of rows returned or affected by the operation
+        """
+
+        self.query_stats.record(
+            query=f'{operation} {table_name}',
+            elapsed=time.perf_counter() - operation_start,
+            rows=rows
+        )
@@ -0,0 +1,140 @@
+"""message_context.py
+
+Contains a class that holds a message along with the state that its message
+handlers share.
+"""
+from __future__ import annotations
+
+import re
+from functools import cached_property
+from pathlib import PurePosixPath
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+from util.emoji_matcher import custom_emoji_ids
+
+from typing import TYPE_CHECKING, Any
+if TYPE_CHECKING:
+    from discord import Message
+
+
+URL_PREFIXES = ('https://', 'http://')
+
+# a country flag (a pair of regional indicators), or a flag built on the white
+# or black flag, e.g. the rainbow, pirate or england flag
+FLAG_PATTERN = re.compile(
+    '[\U0001F1E6-\U0001F1FF]{2}'
+    '|[\U0001F3F3\U0001F3F4]\uFE0F?'
+    '(?:\u200D\\S\uFE0F?|[\U000E0020-\U000E007E]+\U000E007F)?'
+)
+
+
+
+class ParsedUrl(NamedTuple):
+    url: str
+    domain: str
+
+
+
+class MessageContext:
+    """
+    Class that is built once for every message that the bot receives, and is
+    handed to each of its message handlers, so that anything one handler
+    works out about the message can be reused by the others.
+
+    The parsed forms of the message, e.g. its links, are worked out the first
+    time a handler reads them, and then reused by every other handler, so
+    each message is only tokenized once.
+
+    Attributes
+    ----------
+    message : Message
+        the message that was sent
+    state : dict[str, Any]
+        state that the handlers of the message share
+    """
+
+    def __init__(self, message : Message):
+        """
+        Creates an instance of the MessageContext class.
+
+        Parameters
+        ----------
+        message : Message
+            the message that was sent
+        """
+
+        self.message = message
+        self.state : dict[str, Any] = {}
+
+
+    @cached_property
+    def lowered_content(self) -> str:
+        """
+        The content of the message, in lowercase.
+        """
+
+        return self.message.content.lower()
+
+
+    @cached_property
+    def urls(self) -> list[ParsedUrl]:
+        """
+        The links in the content of the message, with their domains in
+        lowercase and without a leading `www.`, e.g. `x.com`.
+        """
+
+        if '://' not in self.message.content:
+            return []
+
+        urls : list[ParsedUrl] = []
+        for term in self.message.content.split():
+
+            if not term.startswith(URL_PREFIXES):
+                continue
+
+            try:
+                domain = urlsplit(term).hostname or ''
+            except ValueError:
+                continue
+
+            urls.append(ParsedUrl(url=term, domain=domain.removeprefix('www.')))
+
+        return urls
+
+
+    @cached_property
+    def custom_emoji_ids(self) -> list[int]:
+        """
+        The ids of the custom emojis in the content of the message, in the
+        order they first appear in.
+        """
+
+        return custom_emoji_ids(self.message.content)
+
+
+    @cached_property
+    def flags(self) -> list[str]:
+        """
+        The flag emojis in the content of the message.
+        """
+
+        # flags are made of characters outside of ascii
+        if self.message.content.isascii():
+            return []
+
+        return FLAG_PATTERN.findall(self.message.content)
+
+
+    @cached_property
+    def attachment_suffixes(self) -> list[str]:
+        """
+        The file extensions of the attachments of the message, in lowercase,
+        e.g. `.mp4`.
+        """
+
+        return [
+            PurePosixPath(attachment.filename).suffix.lower()
+            for attachment
+            in self.message.attachments
+        ]
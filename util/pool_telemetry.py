@@ -0,0 +1,114 @@
+"""pool_telemetry.py
+
+Contains a class that records the usage of a database connection pool.
+"""
+from __future__ import annotations
+
+from collections import deque
+
+from util.query_stats import percentile
+
+from typing import TYPE_CHECKING, Any
+if TYPE_CHECKING:
+    from asyncpg import Pool
+
+
+
+class PoolTelemetry:
+    """
+    Class that records how long connections take to be acquired from a
+    connection pool, and how many are in use at once.
+
+    Attributes
+    ----------
+    in_use : int
+        the number of connections currently acquired
+    peak_in_use : int
+        the most connections that were acquired at once
+    """
+
+    def __init__(self, sample_size : int = 1000):
+        """
+        Creates an instance of the PoolTelemetry class.
+
+        Parameters
+        ----------
+        sample_size : int, default = 1000
+            the number of most recent acquire wait times to keep for percentiles
+        """
+
+        self.in_use : int = 0
+        self.peak_in_use : int = 0
+
+        self._acquires : int = 0
+        self._acquire_timeouts : int = 0
+        self._total_wait : float = 0.0
+        self._max_wait : float = 0.0
+        self._wait_samples : deque[float] = deque(maxlen=sample_size)
+
+
+    def record_acquire(self, wait : float) -> None:
+        """
+        Records a connection being acquired from the pool.
+
+        Parameters
+        ----------
+        wait : float
+            the time spent waiting for the connection, in seconds
+        """
+
+        self._acquires += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+        self._wait_samples.append(wait)
+
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+
+    def record_release(self) -> None:
+        """
+        Records a connection being released back to the pool.
+        """
+
+        self.in_use -= 1
+
+
+    def record_acquire_timeout(self) -> None:
+        """
+        Records a connection that could not be acquired in time.
+        """
+
+        self._acquire_timeouts += 1
+
+
+    def stats(self, pool : Pool) -> dict[str, Any]:
+        """
+        Gets the statistics of the connection pool.
+
+        Parameters
+        ----------
+        pool : Pool
+            the pool that the telemetry was recorded for
+
+        Returns
+        -------
+        dict[str, Any]
+            mapping of statistic names to their values, times are in milliseconds
+        """
+
+        return {
+            'size' : pool.get_size(),
+            'idle' : pool.get_idle_size(),
+            'min_size' : pool.get_min_size(),
+            'max_size' : pool.get_max_size(),
+            'in_use' : self.in_use,
+            'peak_in_use' : self.peak_in_use,
+            'acquires' : self._acquires,
+            'acquire_timeouts' : self._acquire_timeouts,
+            'avg_acquire_wait_ms' : round(
+                self._total_wait / self._acquires * 1000, 2
+            ) if self._acquires else 0.0,
+            'p95_acquire_wait_ms' : round(percentile(self._wait_samples, 95) * 1000, 2),
+            'max_acquire_wait_ms' : round(self._max_wait * 1000, 2)
+        }
@@ -0,0 +1,367 @@
+"""query_capture.py
+
+Contains a class that captures the queries run against the database to a file,
+so that they can be replayed later with `benchmarks/query_replay.py`.
+"""
+from __future__ import annotations
+
+import datetime
+import json
+import time
+
+from util.printing import print_petrichor_msg, print_petrichor_error
+
+from typing import TYPE_CHECKING, Any
+if TYPE_CHECKING:
+    from typing import TextIO
+
+
+
+def encode_arg(arg : Any) -> Any:
+    """
+    Encodes a query argument as a JSON value. Arguments that JSON has no type
+    for are tagged with their type, so that `decode_arg` can restore them.
+
+    Parameters
+    ----------
+    arg : Any
+        the query argument to encode
+
+    Returns
+    -------
+    Any
+        the JSON-serializable argument
+    """
+
+    if isinstance(arg, datetime.datetime):
+        return {'$datetime' : arg.isoformat()}
+    if isinstance(arg, datetime.date):
+        return {'$date' : arg.isoformat()}
+    if isinstance(arg, datetime.timedelta):
+        return {'$timedelta' : arg.total_seconds()}
+    if isinstance(arg, (bytes, bytearray)):
+        return {'$bytes' : bytes(arg).hex()}
+    if isinstance(arg, (list, tuple)):
+        return [encode_arg(item) for item in arg]
+    if arg is None or isinstance(arg, (bool, int, float, str)):
+        return arg
+
+    return str(arg)
+
+
+def decode_arg(arg : Any) -> Any:
+    """
+    Decodes a query argument that was encoded with `encode_arg`.
+
+    Parameters
+    ----------
+    arg : Any
+        the encoded query argument
+
+    Returns
+    -------
+    Any
+        the query argument, with its original type
+    """
+
+    if isinstance(arg, list):
+        return [decode_arg(item) for item in arg]
+
+    if not isinstance(arg, dict):
+        return arg
+
+    if '$datetime' in arg:
+        return datetime.datetime.fromisoformat(arg['$datetime'])
+    if '$date' in arg:
+        return datetime.date.fromisoformat(arg['$date'])
+    if '$timedelta' in arg:
+        return datetime.timedelta(seconds=arg['$timedelta'])
+    if '$bytes' in arg:
+        return bytes.fromhex(arg['$bytes'])
+
+    return arg
+
+
+
+class QueryCapture:
+    """
+    Class that appends every query run against the database, along with its
+    arguments and timing, to a JSON lines file.
+
+    The file is kept compact by writing the SQL text of each distinct query
+    only once per capture session, and referring to it by id afterwards:
+    ```
+    {"session":"2024-01-01T00:00:00+00:00"}
+    {"sql":0,"text":"SELECT ... WHERE guild_id = $1"}
+    {"t":0.512,"sql":0,"kind":"fetch","args":[123],"ms":1.42,"rows":5,"ok":true}
+    ```
+    where `t` is the number of seconds since the start of the session. A new
+    session starts every time the capture is started, so a file may hold the
+    traffic of several runs of the bot. Bulk inserts are captured with the
+    table and columns they copy into, and the copied rows as their arguments:
+    ```
+    {"sql":1,"text":"COPY kaeley_side_eyes (guild_id, ...)"}
+    {"t":2.1,"sql":1,"kind":"copy","table":"kaeley_side_eyes","columns":[...],"args":[[...],...],"ms":3.1,"rows":100,"ok":true}
+    ```
+
+    Attributes
+    ----------
+    path : str | None
+        the file to capture the queries to, None if capturing is disabled
+    flush_every : int
+        the number of captured queries between writes to the file
+    """
+
+    def __init__(self, path : str | None, flush_every : int):
+        """
+        Creates an instance of the QueryCapture class.
+
+        Parameters
+        ----------
+        path : str | None
+            the file to capture the queries to, None to disable capturing
+        flush_every : int
+            the number of captured queries between writes to the file
+        """
+
+        self.path = path
+        self.flush_every = flush_every
+
+        self._file : TextIO | None = None
+        self._session_start : float = 0.0
+        # SQL text -> id of the SQL text in the current session
+        self._sql_ids : dict[str, int] = {}
+        self._unflushed : int = 0
+        self._captured : int = 0
+        self._write_errors : int = 0
+
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether queries are currently being captured.
+        """
+
+        return self._file is not None
+
+
+    def start(self) -> None:
+        """
+        Opens the capture file and starts a new capture session in it.
+        """
+
+        if not self.path:
+            return
+
+        try:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        except OSError as e:
+            print_petrichor_error(f'Could not open query capture file {self.path}: {e}')
+            return
+
+        self._session_start = time.perf_counter()
+        self._sql_ids = {}
+        self._write({
+            'session' : datetime.datetime.now(datetime.timezone.utc).isoformat()
+        })
+        print_petrichor_msg(f'Capturing queries to {self.path}')
+
+
+    def stop(self) -> None:
+        """
+        Writes any remaining captured queries and closes the capture file.
+        """
+
+        if self._file is None:
+            return
+
+        try:
+            self._file.close()
+        except OSError as e:
+            self._write_errors += 1
+            print_petrichor_error(f'Could not close query capture file {self.path}: {e}')
+
+        self._file = None
+
+
+    def record(
+        self,
+        kind : str,
+        query : str,
+        args : tuple,
+        elapsed : float,
+        rows : int,
+        failed : bool
+    ) -> None:
+        """
+        Captures a single run of a query.
+
+        Parameters
+        ----------
+        kind : str
+            'fetch' if the query returned rows, 'execute' if it only ran
+        query : str
+            the SQL text of the query
+        args : tuple
+            the arguments of the query parameters
+        elapsed : float
+            the time the query took, in seconds
+        rows : int
+            the number of rows returned or affected by the query
+        failed : bool
+            whether the query failed
+        """
+
+        if self._file is None:
+            return
+
+        self._write_query({
+            't' : round(time.perf_counter() - self._session_start, 4),
+            'sql' : self._get_sql_id(query),
+            'kind' : kind,
+            'args' : [encode_arg(arg) for arg in args],
+            'ms' : round(elapsed * 1000, 3),
+            'rows' : rows,
+            'ok' : not failed
+        })
+
+
+    def record_copy(
+        self,
+        table_name : str,
+        columns : list[str],
+        records : list[tuple],
+        elapsed : float,
+        failed : bool
+    ) -> None:
+        """
+        Captures a single bulk insert of rows with a COPY.
+
+        Parameters
+        ----------
+        table_name : str
+            the table that the rows were copied into
+        columns : list[str]
+            the columns that the rows were copied into
+        records : list[tuple]
+            the copied rows
+        elapsed : float
+            the time the copy took, in seconds
+        failed : bool
+            whether the copy failed
+        """
+
+        if self._file is None:
+            return
+
+        self._write_query({
+            't' : round(time.perf_counter() - self._session_start, 4),
+            'sql' : self._get_sql_id(f'COPY {table_name} ({", ".join(columns)})'),
+            'kind' : 'copy',
+            'table' : table_name,
+            'columns' : columns,
+            'args' : [encode_arg(record) for record in records],
+            'ms' : round(elapsed * 1000, 3),
+            'rows' : len(records),
+            'ok' : not failed
+        })
+
+
+    def _get_sql_id(self, query : str) -> int:
+        """
+        Gets the id of the SQL text of a query in the current session, and
+        writes the SQL text to the capture file the first time it is seen.
+
+        Parameters
+        ----------
+        query : str
+            the SQL text of the query
+
+        Returns
+        -------
+        int
+            the id of the SQL text
+        """
+
+        if (sql_id := self._sql_ids.get(query)) is None:
+            sql_id = self._sql_ids[query] = len(self._sql_ids)
+            self._write({'sql' : sql_id, 'text' : query})
+
+        return sql_id
+
+
+    def _write_query(self, line : dict[str, Any]) -> None:
+        """
+        Writes a single captured query to the capture file, flushing the file
+        every `flush_every` queries.
+
+        Parameters
+        ----------
+        line : dict[str, Any]
+            the JSON object of the captured query
+        """
+
+        self._write(line)
+        self._captured += 1
+
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self._flush()
+
+
+    def _write(self, line : dict[str, Any]) -> None:
+        """
+        Writes a single line to the capture file. Capturing is stopped if the
+        file can no longer be written to.
+
+        Parameters
+        ----------
+        line : dict[str, Any]
+            the JSON object to write
+        """
+
+        if self._file is None:
+            return
+
+        try:
+            self._file.write(json.dumps(line, separators=(',', ':')) + '\n')
+        except OSError as e:
+            self._write_errors += 1
+            print_petrichor_error(f'Stopped capturing queries to {self.path}: {e}')
+            self.stop()
+
+
+    def _flush(self) -> None:
+        """
+        Flushes the captured queries to the capture file.
+        """
+
+        self._unflushed = 0
+        if self._file is None:
+            return
+
+        try:
+            self._file.flush()
+        except OSError as e:
+            self._write_errors += 1
+            print_petrichor_error(f'Stopped capturing queries to {self.path}: {e}')
+            self.stop()
+
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Gets the statistics of the query capture.
+
+        Returns
+        -------
+        dict[str, Any]
+            mapping of statistic names to their values
+        """
+
+        return {
+            'enabled' : self.enabled,
+            'path' : self.path,
+            'captured' : self._captured,
+            'distinct_queries' : len(self._sql_ids),
+            'write_errors' : self._write_errors
+        }
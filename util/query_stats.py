@@ -0,0 +1,292 @@
+"""query_stats.py
+
+Contains classes that record the timings of database queries.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from collections import deque
+
+from typing import TYPE_CHECKING, Any
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+
+slow_query_logger = logging.getLogger('petrichor.slow_queries')
+
+STRING_LITERAL_REGEX = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL_REGEX = re.compile(r'(?<![$\w])\d+(?:\.\d+)?\b')
+WHITESPACE_REGEX = re.compile(r'\s+')
+
+
+
+def percentile(samples : Iterable[float], percent : float) -> float:
+    """
+    Gets a percentile of a set of samples, using the nearest-rank method.
+
+    Parameters
+    ----------
+    samples : Iterable[float]
+        the samples, in any order
+    percent : float
+        the percentile to get, between 0 and 100
+
+    Returns
+    -------
+    float
+        the sample at the given percentile, 0.0 if there are no samples
+    """
+
+    sorted_samples = sorted(samples)
+    if not sorted_samples:
+        return 0.0
+
+    rank = max(round(percent / 100 * len(sorted_samples)), 1)
+    return sorted_samples[rank - 1]
+
+
+
+class QueryShapeStats:
+    """
+    Class that holds the timings of every run of a single query shape.
+
+    Attributes
+    ----------
+    count : int
+        the number of times the query shape was run
+    errors : int
+        the number of runs that failed
+    total_time : float
+        the total time spent running the query shape, in seconds
+    max_time : float
+        the longest run of the query shape, in seconds
+    total_rows : int
+        the total number of rows returned or affected by the query shape
+    """
+
+    def __init__(self, sample_size : int):
+        """
+        Creates an instance of the QueryShapeStats class.
+
+        Parameters
+        ----------
+        sample_size : int
+            the number of most recent run times to keep for percentiles
+        """
+
+        self.count : int = 0
+        self.errors : int = 0
+        self.total_time : float = 0.0
+        self.max_time : float = 0.0
+        self.total_rows : int = 0
+        self._samples : deque[float] = deque(maxlen=sample_size)
+
+
+    def record(self, elapsed : float, rows : int, failed : bool) -> None:
+        """
+        Records a single run of the query shape.
+
+        Parameters
+        ----------
+        elapsed : float
+            the time the run took, in seconds
+        rows : int
+            the number of rows returned or affected by the run
+        failed : bool
+            whether the run failed
+        """
+
+        self.count += 1
+        self.errors += int(failed)
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.total_rows += rows
+        self._samples.append(elapsed)
+
+
+    def percentile(self, percent : float) -> float:
+        """
+        Gets a percentile of the recent run times of the query shape, using
+        the nearest-rank method.
+
+        Parameters
+        ----------
+        percent : float
+            the percentile to get, between 0 and 100
+
+        Returns
+        -------
+        float
+            the run time at the given percentile, in seconds
+        """
+
+        return percentile(self._samples, percent)
+
+
+    def summary(self) -> dict[str, Any]:
+        """
+        Gets a summary of the timings of the query shape.
+
+        Returns
+        -------
+        dict[str, Any]
+            mapping of statistic names to their values, times are in milliseconds
+        """
+
+        return {
+            'count' : self.count,
+            'errors' : self.errors,
+            'total_ms' : round(self.total_time * 1000, 2),
+            'p50_ms' : round(self.percentile(50) * 1000, 2),
+            'p95_ms' : round(self.percentile(95) * 1000, 2),
+            'p99_ms' : round(self.percentile(99) * 1000, 2),
+            'max_ms' : round(self.max_time * 1000, 2),
+            'avg_rows' : round(self.total_rows / self.count, 2) if self.count else 0
+        }
+
+
+
+class QueryStatsRecorder:
+    """
+    Class that records the timings of database queries, grouped by their
+    normalized query shape, and logs the queries that are slower than a
+    given threshold to the slow query log.
+
+    Attributes
+    ----------
+    slow_query_threshold : float
+        the run time, in seconds, past which a query is logged as slow
+    sample_size : int
+        the number of most recent run times to keep per query shape
+    """
+
+    def __init__(self, slow_query_threshold : float, sample_size : int):
+        """
+        Creates an instance of the QueryStatsRecorder class.
+
+        Parameters
+        ----------
+        slow_query_threshold : float
+            the run time, in seconds, past which a query is logged as slow
+        sample_size : int
+            the number of most recent run times to keep per query shape
+        """
+
+        self.slow_query_threshold = slow_query_threshold
+        self.sample_size = sample_size
+
+        # normalized query shape -> timings of the shape
+        self._shapes : dict[str, QueryShapeStats] = {}
+        self._slow_queries : int = 0
+
+
+    @staticmethod
+    def normalize_query(query : str) -> str:
+        """
+        Normalizes a query into its shape by replacing any literal values with
+        placeholders, so that queries which only differ by their values are
+        grouped together.
+
+        Parameters
+        ----------
+        query : str
+            the query to normalize
+
+        Returns
+        -------
+        str
+            the normalized query shape
+        """
+
+        query = STRING_LITERAL_REGEX.sub('?', query)
+        query = NUMBER_LITERAL_REGEX.sub('?', query)
+        return WHITESPACE_REGEX.sub(' ', query).strip()
+
+
+    def record(
+        self,
+        query : str,
+        elapsed : float,
+        rows : int = 0,
+        failed : bool = False,
+        args : tuple = ()
+    ) -> None:
+        """
+        Records a single run of a query.
+
+        Parameters
+        ----------
+        query : str
+            the query that was run
+        elapsed : float
+            the time the query took, in seconds
+        rows : int, default = 0
+            the number of rows returned or affected by the query
+        failed : bool, default = False
+            whether the query failed
+        args : tuple, default = ()
+            the arguments of the query parameters, only used for logging
+        """
+
+        shape = self.normalize_query(query)
+
+        if (shape_stats := self._shapes.get(shape)) is None:
+            shape_stats = self._shapes[shape] = QueryShapeStats(self.sample_size)
+
+        shape_stats.record(elapsed, rows, failed)
+
+        if elapsed >= self.slow_query_threshold:
+            self._slow_queries += 1
+            slow_query_logger.warning(
+                '%.2f ms | %d rows | %s | args: %r',
+                elapsed * 1000, rows, query, list(args)
+            )
+
+
+    def top_shapes(self, limit : int = 10) -> list[tuple[str, dict[str, Any]]]:
+        """
+        Gets the query shapes that the most total time was spent running.
+
+        Parameters
+        ----------
+        limit : int, default = 10
+            the maximum number of query shapes to get
+
+        Returns
+        -------
+        list[tuple[str, dict[str, Any]]]
+            the query shapes and the summaries of their timings, ordered from
+            most to least total time
+        """
+
+        shapes = sorted(
+            self._shapes.items(),
+            key=lambda shape: shape[1].total_time,
+            reverse=True
+        )
+
+        return [
+            (shape, shape_stats.summary())
+            for shape, shape_stats
+            in shapes[:limit]
+        ]
+
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Gets the overall statistics of the recorded queries.
+
+        Returns
+        -------
+        dict[str, Any]
+            mapping of statistic names to their values
+        """
+
+        return {
+            'shapes' : len(self._shapes),
+            'queries' : sum(shape.count for shape in self._shapes.values()),
+            'errors' : sum(shape.errors for shape in self._shapes.values()),
+            'slow_queries' : self._slow_queries,
+            'slow_query_threshold_ms' : round(self.slow_query_threshold * 1000, 2)
+        }
@@ -0,0 +1,150 @@
+"""replica_router.py
+
+Contains a class that decides which reads can be served by the read replica.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from typing import TYPE_CHECKING, Any
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+# set while reads must see the writes made before them, see `read_your_writes`
+_read_your_writes : ContextVar[bool] = ContextVar('read_your_writes', default=False)
+
+
+
+class ReplicaRouter:
+    """
+    Class that decides whether a read may run on the read replica, or must
+    run on the primary to see the latest writes.
+
+    A streaming replica lags slightly behind the primary, so a read of a table
+    that was just written to could miss the write, and its stale result would
+    then be held in the result cache until the next write. To avoid this,
+    reads of a table stay on the primary for `max_lag` seconds after each
+    write to it. Reads that must see the writes made just before them, e.g.
+    in a command that inserts a row and then reads the table back, can be
+    pinned to the primary with:
+    ```
+    with router.read_your_writes():
+        ...
+    ```
+
+    Attributes
+    ----------
+    max_lag : float
+        the number of seconds after a write to a table that reads of the
+        table stay on the primary
+    """
+
+    def __init__(self, max_lag : float):
+        """
+        Creates an instance of the ReplicaRouter class.
+
+        Parameters
+        ----------
+        max_lag : float
+            the number of seconds after a write to a table that reads of the
+            table stay on the primary
+        """
+
+        self.max_lag = max_lag
+
+        # table name -> monotonic time of the last write, None for all tables
+        self._last_writes : dict[str | None, float] = {}
+
+        self._replica_reads : int = 0
+        self._pinned_reads : int = 0
+        self._recent_write_reads : int = 0
+        self._fallbacks : int = 0
+
+
+    def mark_written(self, table_name : str = None) -> None:
+        """
+        Records that a table was written to.
+
+        Parameters
+        ----------
+        table_name : str, default = None
+            the table that was written to, defaults to all tables
+        """
+
+        self._last_writes[table_name] = time.monotonic()
+
+
+    def use_replica(self, table_name : str) -> bool:
+        """
+        Decides whether a read of a table may run on the read replica.
+
+        Parameters
+        ----------
+        table_name : str
+            the table that is read
+
+        Returns
+        -------
+        bool
+            True, if the read may run on the replica |
+            False, if the read must run on the primary
+        """
+
+        if _read_your_writes.get():
+            self._pinned_reads += 1
+            return False
+
+        last_write = max(
+            self._last_writes.get(table_name, float('-inf')),
+            self._last_writes.get(None, float('-inf'))
+        )
+        if time.monotonic() - last_write < self.max_lag:
+            self._recent_write_reads += 1
+            return False
+
+        self._replica_reads += 1
+        return True
+
+
+    def record_fallback(self) -> None:
+        """
+        Records a read that failed on the replica and was run on the primary.
+        """
+
+        self._fallbacks += 1
+
+
+    @contextmanager
+    def read_your_writes(self) -> Iterator[None]:
+        """
+        Pins every read made inside the context, including in the tasks it
+        starts, to the primary.
+        """
+
+        token = _read_your_writes.set(True)
+        try:
+            yield
+        finally:
+            _read_your_writes.reset(token)
+
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Gets the statistics of the routed reads.
+
+        Returns
+        -------
+        dict[str, Any]
+            mapping of statistic names to their values
+        """
+
+        return {
+            'max_lag_s' : self.max_lag,
+            'replica_reads' : self._replica_reads,
+            'pinned_reads' : self._pinned_reads,
+            'recent_write_reads' : self._recent_write_reads,
+            'fallbacks' : self._fallbacks
+        }
@@ -0,0 +1,242 @@
+"""result_cache.py
+
+Contains a class that caches the results of database queries.
+"""
+from __future__ import annotations
+
+import sys
+import time
+from collections import OrderedDict
+
+from typing import Any, NamedTuple
+
+
+class CacheKey(NamedTuple):
+    table_name: str
+    guild_id: str | None
+    kind: str
+    params: tuple
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    expires_at: float
+    size: int
+
+
+
+class ResultCache:
+    """
+    Class that caches the results of read queries, keyed by the table and
+    guild that they read from, the kind of query, and its parameters.
+
+    Entries expire `ttl` seconds after they are cached, and once the cache
+    holds `max_entries` entries, the least recently used entry is evicted.
+    Entries should be invalidated whenever the rows that they were computed
+    from change, see `invalidate`.
+
+    Attributes
+    ----------
+    max_entries : int
+        the maximum number of entries that the cache holds
+    ttl : float
+        the number of seconds that an entry stays valid for
+    """
+
+    def __init__(self, max_entries : int, ttl : float):
+        """
+        Creates an instance of the ResultCache class.
+
+        Parameters
+        ----------
+        max_entries : int
+            the maximum number of entries that the cache holds
+        ttl : float
+            the number of seconds that an entry stays valid for
+        """
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        # ordered from least to most recently used
+        self._entries : OrderedDict[CacheKey, CacheEntry] = OrderedDict()
+        self._size : int = 0
+
+        self._hits : int = 0
+        self._misses : int = 0
+        self._evictions : int = 0
+        self._expirations : int = 0
+        self._invalidations : int = 0
+
+
+    def get(self, key : CacheKey) -> Any | None:
+        """
+        Gets the cached result of a query, if it is cached and has not expired.
+
+        Parameters
+        ----------
+        key : CacheKey
+            the key of the query
+
+        Returns
+        -------
+        Any
+            the cached result |
+            None, if the result is not cached
+        """
+
+        entry = self._entries.get(key)
+
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self._expirations += 1
+            entry = None
+
+        if entry is None:
+            self._misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return entry.value
+
+
+    def set(self, key : CacheKey, value : Any) -> None:
+        """
+        Caches the result of a query, evicting the least recently used entries
+        if the cache is full.
+
+        Parameters
+        ----------
+        key : CacheKey
+            the key of the query
+        value : Any
+            the result of the query, None results are not cached
+        """
+
+        if value is None or self.max_entries <= 0:
+            return
+
+        self._remove(key)
+
+        entry = CacheEntry(
+            value=value,
+            expires_at=time.monotonic() + self.ttl,
+            size=self._estimate_size(value)
+        )
+        self._entries[key] = entry
+        self._size += entry.size
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+
+
+    def invalidate(self, table_name : str = None, guild_id : Any = None) -> int:
+        """
+        Removes the cached results that were read from the given table and
+        guild. Results that were not read from a single guild are removed
+        along with those of any guild.
+
+        Parameters
+        ----------
+        table_name : str, default = None
+            the table to remove the results of, defaults to all tables
+        guild_id : Any, default = None
+            the guild to remove the results of, defaults to all guilds
+
+        Returns
+        -------
+        int
+            the number of removed results
+        """
+
+        if guild_id is not None:
+            guild_id = str(guild_id)
+
+        stale_keys = [
+            key
+            for key
+            in self._entries
+            if (table_name is None or key.table_name == table_name)
+            and (guild_id is None or key.guild_id in (guild_id, None))
+        ]
+
+        for key in stale_keys:
+            self._remove(key)
+
+        self._invalidations += len(stale_keys)
+        return len(stale_keys)
+
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Gets the statistics of the cache.
+
+        Returns
+        -------
+        dict[str, Any]
+            mapping of statistic names to their values
+        """
+
+        lookups = self._hits + self._misses
+
+        return {
+            'entries' : len(self._entries),
+            'max_entries' : self.max_entries,
+            'ttl_seconds' : self.ttl,
+            'hits' : self._hits,
+            'misses' : self._misses,
+            'hit_rate' : round(self._hits / lookups, 4) if lookups else 0.0,
+            'evictions' : self._evictions,
+            'expirations' : self._expirations,
+            'invalidations' : self._invalidations,
+            'approx_memory_bytes' : self._size
+        }
+
+
+    def _remove(self, key : CacheKey) -> None:
+        """
+        Removes an entry from the cache, if it is cached.
+
+        Parameters
+        ----------
+        key : CacheKey
+            the key of the entry to remove
+        """
+
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+
+    @staticmethod
+    def _estimate_size(value : Any) -> int:
+        """
+        Estimates the memory used by a cached result. Results that are lists
+        of rows include the size of each row and of each of its values.
+
+        Parameters
+        ----------
+        value : Any
+            the result to estimate the size of
+
+        Returns
+        -------
+        int
+            the approximate size of the result, in bytes
+        """
+
+        size = sys.getsizeof(value)
+
+        if isinstance(value, (list, tuple)):
+            for row in value:
+                size += sys.getsizeof(row)
+                if isinstance(row, (str, bytes)):
+                    continue
+                try:
+                    size += sum(sys.getsizeof(column) for column in row)
+                except TypeError:
+                    pass
+
+        return size
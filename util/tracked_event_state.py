@@ -0,0 +1,103 @@
+"""tracked_event_state.py
+
+Contains a class that holds the statistics of a tracked event.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from typing import Any
+
+
+
+class TrackedEventState:
+    """
+    Class that holds the statistics of a tracked event (e.g. kaeley's side
+    eyes) in a single guild, so that they can be read without querying the
+    full event history. The state is loaded from the database, and is loaded
+    again whenever new events are written.
+
+    Attributes
+    ----------
+    event_count : int
+        the number of events recorded
+    last_event_time : datetime | None
+        the time of the most recent event, None if there are no events
+    last_event_info : Any
+        information about the most recent event, e.g. where it happened
+    longest_gap : timedelta
+        the longest time between two consecutive events
+    """
+
+    def __init__(
+        self,
+        event_count : int = 0,
+        last_event_time : datetime | None = None,
+        last_event_info : Any = None,
+        longest_gap : timedelta | None = None
+    ):
+        """
+        Creates an instance of the TrackedEventState class.
+
+        Parameters
+        ----------
+        event_count : int, default = 0
+            the number of events recorded so far
+        last_event_time : datetime | None, default = None
+            the time of the most recent event
+        last_event_info : Any, default = None
+            information about the most recent event
+        longest_gap : timedelta | None, default = None
+            the longest time between two consecutive events so far
+        """
+
+        self.event_count = event_count
+        self.last_event_time = last_event_time
+        self.last_event_info = last_event_info
+        self.longest_gap = longest_gap or timedelta(seconds=0)
+
+
+    def current_gap(self, now : datetime) -> timedelta | None:
+        """
+        Gets the time since the most recent event.
+
+        Parameters
+        ----------
+        now : datetime
+            the current time
+
+        Returns
+        -------
+        timedelta
+            the time since the most recent event |
+            None, if there are no events
+        """
+
+        if self.last_event_time is None:
+            return None
+
+        return now - self.last_event_time
+
+
+    def longest_gap_until(self, now : datetime) -> timedelta:
+        """
+        Gets the longest time between two consecutive events, including the
+        time since the most recent event.
+
+        Parameters
+        ----------
+        now : datetime
+            the current time
+
+        Returns
+        -------
+        timedelta
+            the longest gap
+        """
+
+        current_gap = self.current_gap(now)
+
+        if current_gap is None:
+            return self.longest_gap
+
+        return max(self.longest_gap, current_gap)
@@ -0,0 +1,287 @@
+"""write_behind_buffer.py
+
+Contains a class that buffers rows and writes them to the database in batches.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+
+from util.printing import print_petrichor_msg, print_petrichor_error
+
+from typing import TYPE_CHECKING, Any
+if TYPE_CHECKING:
+    from util.db_connection_manager import DatabaseConnectionManager
+
+
+
+class WriteBehindBuffer:
+    """
+    Class that buffers rows for high-frequency event tables, and writes them
+    to the database in batches, rather than one insert per event.
+
+    A batch is flushed once `batch_size` rows are buffered, or once the oldest
+    buffered row is `max_age` seconds old, whichever comes first. Any rows
+    left in the buffer are flushed when the buffer is stopped. Rows whose
+    flush is cancelled are put back in the buffer, and rows whose insert
+    fails are dropped and counted as such.
+
+    This class should be started and stopped alongside the database connection:
+    ```
+    buffer = WriteBehindBuffer(db)
+    buffer.start()
+    ...
+    await buffer.stop()
+    ```
+
+    Attributes
+    ----------
+    batch_size : int
+        the number of buffered rows that triggers a flush
+    max_age : float
+        the maximum number of seconds that a row stays in the buffer
+    max_queued_rows : int
+        the maximum number of rows that can be buffered, rows that are
+        enqueued past this limit are dropped
+    """
+
+    def __init__(
+        self,
+        db : DatabaseConnectionManager,
+        batch_size : int,
+        max_age : float,
+        max_queued_rows : int
+    ):
+        """
+        Creates an instance of the WriteBehindBuffer class.
+
+        Parameters
+        ----------
+        db : DatabaseConnectionManager
+            the database connection to flush the rows to
+        batch_size : int
+            the number of buffered rows that triggers a flush
+        max_age : float
+            the maximum number of seconds that a row stays in the buffer
+        max_queued_rows : int
+            the maximum number of rows that can be buffered
+        """
+
+        self._db = db
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.max_queued_rows = max_queued_rows
+
+        # table name -> rows waiting to be inserted into the table
+        self._rows : dict[str, list[list]] = {}
+        self._queue_depth : int = 0
+        self._flush_needed = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task : asyncio.Task | None = None
+
+        self._rows_enqueued : int = 0
+        self._rows_flushed : int = 0
+        self._rows_dropped : int = 0
+        self._flushes : int = 0
+        self._last_flush_latency : float = 0.0
+        self._max_flush_latency : float = 0.0
+        self._total_flush_latency : float = 0.0
+
+
+    def start(self) -> None:
+        """
+        Starts the background task that flushes the buffer.
+        """
+
+        if self._flush_task is not None:
+            return
+
+        self._stopping.clear()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        print_petrichor_msg(
+            f'Write-behind buffer started | '
+            f'Batch size: {self.batch_size} | '
+            f'Max age: {self.max_age}s'
+        )
+
+
+    async def stop(self) -> None:
+        """
+        Stops the background flush task, and flushes all remaining rows.
+        A flush that is in progress is awaited rather than cancelled, so that
+        none of its rows are lost.
+        """
+
+        if self._flush_task is not None:
+            self._stopping.set()
+            self._flush_needed.set()
+            await self._flush_task
+            self._flush_task = None
+
+        await self.flush()
+        print_petrichor_msg('Write-behind buffer stopped')
+
+
+    def enqueue(self, table_name : str, record_info : list) -> bool:
+        """
+        Adds a row to the buffer, to be inserted into the given table on the
+        next flush. `record_info` follows the same format as in `insert_row`.
+
+        Parameters
+        ----------
+        table_name : str
+            the name of the table to insert the row into
+        record_info : list
+            the data to insert into the table
+
+        Returns
+        -------
+        bool
+            True, if the row was added to the buffer |
+            False, if the buffer is full and the row was dropped
+        """
+
+        if self._queue_depth >= self.max_queued_rows:
+            self._rows_dropped += 1
+            print_petrichor_error(
+                f'Write-behind buffer full, dropped row for {table_name}'
+            )
+            return False
+
+        self._rows.setdefault(table_name, []).append(record_info)
+        self._queue_depth += 1
+        self._rows_enqueued += 1
+
+        if self._queue_depth >= self.batch_size:
+            self._flush_needed.set()
+
+        return True
+
+
+    async def flush(self) -> None:
+        """
+        Inserts all buffered rows into their tables, one bulk insert per table.
+        Rows of a table whose insert failed are dropped. If the flush is
+        cancelled, the rows that were not inserted yet are put back in the
+        buffer.
+        """
+
+        async with self._flush_lock:
+
+            if not self._queue_depth:
+                return
+
+            rows, self._rows = self._rows, {}
+            self._queue_depth = 0
+
+            flush_start = time.perf_counter()
+
+            table_rows = list(rows.items())
+            for i, (table_name, records) in enumerate(table_rows):
+                try:
+                    inserted_successfully = await self._db.insert_rows(
+                        table_name=table_name,
+                        records=records
+                    )
+                except asyncio.CancelledError:
+                    self._requeue(dict(table_rows[i:]))
+                    raise
+                except Exception as e:
+                    print_petrichor_error(
+                        f'Error flushing rows for {table_name}: {e}'
+                    )
+                    inserted_successfully = False
+
+                if not inserted_successfully:
+                    self._rows_dropped += len(records)
+                    print_petrichor_error(
+                        f'Write-behind buffer dropped {len(records)} rows '
+                        f'for {table_name}'
+                    )
+                    continue
+
+                self._rows_flushed += len(records)
+
+            flush_latency = time.perf_counter() - flush_start
+            self._flushes += 1
+            self._last_flush_latency = flush_latency
+            self._max_flush_latency = max(self._max_flush_latency, flush_latency)
+            self._total_flush_latency += flush_latency
+
+
+    def _requeue(self, rows : dict[str, list[list]]) -> None:
+        """
+        Puts rows that were taken out of the buffer, but not inserted, back in
+        front of the rows that were enqueued since. Rows that no longer fit in
+        the buffer are dropped.
+
+        Parameters
+        ----------
+        rows : dict[str, list[list]]
+            mapping of table names to the rows to put back in the buffer
+        """
+
+        for table_name, records in rows.items():
+            kept_records = records[:max(self.max_queued_rows - self._queue_depth, 0)]
+
+            dropped_count = len(records) - len(kept_records)
+            if dropped_count:
+                self._rows_dropped += dropped_count
+                print_petrichor_error(
+                    f'Write-behind buffer full, dropped {dropped_count} rows '
+                    f'for {table_name}'
+                )
+
+            if not kept_records:
+                continue
+
+            self._rows[table_name] = kept_records + self._rows.get(table_name, [])
+            self._queue_depth += len(kept_records)
+
+
+    async def _flush_loop(self) -> None:
+        """
+        Flushes the buffer whenever it reaches the batch size, or every
+        `max_age` seconds otherwise, until the buffer is stopped.
+        """
+
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(
+                    self._flush_needed.wait(),
+                    timeout=self.max_age
+                )
+            except TimeoutError:
+                pass
+
+            self._flush_needed.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                print_petrichor_error(f'Error flushing write-behind buffer: {e}')
+
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Gets the statistics of the buffer.
+
+        Returns
+        -------
+        dict[str, Any]
+            mapping of statistic names to their values
+        """
+
+        return {
+            'queue_depth' : self._queue_depth,
+            'rows_enqueued' : self._rows_enqueued,
+            'rows_flushed' : self._rows_flushed,
+            'rows_dropped' : self._rows_dropped,
+            'flushes' : self._flushes,
+            'last_flush_latency_ms' : round(self._last_flush_latency * 1000, 2),
+            'max_flush_latency_ms' : round(self._max_flush_latency * 1000, 2),
+            'avg_flush_latency_ms' : round(
+                self._total_flush_latency / self._flushes * 1000, 2
+            ) if self._flushes else 0.0
+        }